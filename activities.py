@@ -0,0 +1,115 @@
+from market_data import DayData, MidIndex, PRICE_LEVELS
+import numpy as np
+
+
+def _strings(values: np.ndarray) -> np.ndarray:
+    # prices and volumes repeat a lot, every distinct value is formatted once
+    # (not for values where 0.0 and -0.0 could both occur)
+    distinct, inverse = np.unique(values, return_inverse=True)
+    strings = np.empty(len(distinct), dtype=object)
+    strings[:] = list(map(str, distinct.tolist()))
+    return strings[inverse]
+
+
+def _price_strings(prices: np.ndarray, present: np.ndarray, is_int: bool) -> np.ndarray:
+    values = np.where(present, prices, 0)
+    if is_int:
+        values = values.astype(np.int64)
+    return np.where(present, _strings(values), '')
+
+
+def _volume_strings(volumes: np.ndarray, present: np.ndarray, sign: int) -> np.ndarray:
+    values = np.where(present, np.nan_to_num(volumes), 0).astype(np.int64)
+    return np.where(present, _strings(sign * values), '')
+
+
+def _side_fields(prices: np.ndarray, volumes: np.ndarray, int_columns: list[bool], sign: int) -> np.ndarray:
+    """
+    The 6 price/volume fields of one side for every row of the prices file,
+    as they appear in the order depth: levels without a price are left out
+    and the remaining ones move to the front.
+    """
+    rows = len(prices)
+    # NaN > 0 is False, so missing levels are skipped
+    present = prices > 0
+    fields = np.empty((rows, 2 * PRICE_LEVELS), dtype=object)
+    for level in range(PRICE_LEVELS):
+        fields[:, 2 * level] = _price_strings(prices[:, level], present[:, level], int_columns[level])
+        fields[:, 2 * level + 1] = _volume_strings(volumes[:, level], present[:, level], sign)
+    gaps = (present[:, 1:] & ~present[:, :-1]).any(axis=1)
+    if gaps.any():
+        order = np.argsort(~present[gaps], axis=1, kind='stable')
+        columns = np.repeat(order, 2, axis=1) * 2 + np.tile([0, 1], PRICE_LEVELS)
+        fields[gaps] = np.take_along_axis(fields[gaps], columns, axis=1)
+
+    # Levels with the same price are one key of the order depth, the first
+    # level keeps its place and gets the volume of the last one. Rare, so
+    # these rows are redone one by one.
+    duplicate = np.zeros(rows, dtype=bool)
+    for a in range(PRICE_LEVELS):
+        for b in range(a + 1, PRICE_LEVELS):
+            duplicate |= present[:, a] & present[:, b] & (prices[:, a] == prices[:, b])
+    for r in np.flatnonzero(duplicate).tolist():
+        levels: dict[float, list[str]] = {}
+        for level in range(PRICE_LEVELS):
+            if not present[r, level]:
+                continue
+            price = _price_strings(prices[r:r + 1, level], present[r:r + 1, level], int_columns[level])[0]
+            volume = _volume_strings(volumes[r:r + 1, level], present[r:r + 1, level], sign)[0]
+            if prices[r, level] in levels:
+                levels[prices[r, level]][1] = volume
+            else:
+                levels[prices[r, level]] = [price, volume]
+        row = [field for level in levels.values() for field in level]
+        fields[r] = row + [''] * (2 * PRICE_LEVELS - len(row))
+    return fields
+
+
+def activity_lines(day_data: DayData, day: int, symbols: list[str], pnl_symbols: list[str], pnl: np.ndarray, start=0, end: int | None = None) -> list[str]:
+    """
+    The rows of the activities log of the ticks start to end - 1 (all of
+    the day without them): for every tick one row per symbol of `symbols`.
+    pnl holds profit + balance of these ticks for pnl_symbols.
+    Built column by column from the day data instead of the order depths,
+    callers go through long days a chunk of ticks at a time.
+    """
+    if end is None:
+        end = len(day_data)
+    n = end - start
+    first, last = int(day_data.row_start[start]), int(day_data.row_start[end])
+    rows = last - first
+    tick_of_row = np.repeat(np.arange(n), np.diff(day_data.row_start[start:end + 1]))
+    row_symbol = day_data.row_symbol[first:last]
+
+    bids = _side_fields(day_data.bid_prices[first:last], day_data.bid_volumes[first:last], day_data.int_columns['bid_price'], 1)
+    asks = _side_fields(day_data.ask_prices[first:last], day_data.ask_volumes[first:last], day_data.int_columns['ask_price'], -1)
+    depth = np.empty(rows + 1, dtype=object)
+    depth[:rows] = list(map(';'.join, np.concatenate([bids, asks], axis=1).tolist()))
+    depth[rows] = ';' * (4 * PRICE_LEVELS - 1)
+
+    # row of the prices file for every (tick, symbol), the empty last row if there is none
+    row_of = np.full((n, len(day_data.symbols) + 1), rows, dtype=np.int64)
+    row_of[tick_of_row, row_symbol] = np.arange(rows)
+    columns = [day_data.symbols.index(symbol) if symbol in day_data.symbols else len(day_data.symbols) for symbol in symbols]
+    out = row_of[:, columns].ravel()
+
+    # same mid as statistics.median of best bid and ask
+    mid_index = MidIndex(day_data, start, end)
+    valid = np.append(mid_index.valid[tick_of_row, row_symbol], False)[out]
+    observed = np.append(day_data.mid_prices[first:last], 0.0)
+    if day_data.int_columns['mid_price'][0]:
+        observed = np.nan_to_num(observed).astype(np.int64)
+    dolphins = (out < rows) & np.tile(np.array(symbols) == 'DOLPHIN_SIGHTINGS', n) & ~valid
+
+    profits = np.zeros((n, len(symbols)))
+    for j, symbol in enumerate(symbols):
+        if symbol in pnl_symbols:
+            profits[:, j] = pnl[:, pnl_symbols.index(symbol)]
+    tail = np.full(len(out), f'{0};{0.0}\n', dtype=object)
+    mids = np.append(mid_index.mid[tick_of_row, row_symbol], 0.0)[out[valid]]
+    tail[valid] = [f'{mid};{profit}\n' for mid, profit in zip(mids.tolist(), profits.ravel()[valid].tolist())]
+    tail[dolphins] = [f'{observation};{0.0}\n' for observation in observed[out[dolphins]].tolist()]
+
+    times = np.repeat(_strings(day_data.timestamps[start:end]), len(symbols))
+    names = np.tile(np.array(symbols, dtype=object), n)
+    return list(map(';'.join, zip([str(day)] * len(out), times.tolist(), names.tolist(), depth[out].tolist(), tail.tolist())))
@@ -1,14 +1,29 @@
-from dontlooseshells_algo import Trader
-
 from datamodel import *
+from market_data import CHUNK_TICKS, DayData, MidIndex, StreamingMids, TradeBook, cached_columns
+from activities import activity_lines
+from checkpoints import Checkpoints, resume
+from features import FeatureSet, FeatureTable, IncrementalFeatures
+from instrumentation import RunStats
+from ledger import Ledger, RunSeries
+from participants import ParticipantPnL
+from risk import RiskMetrics
+from matching import MATCH_EXACT, MATCH_HALFWAY, MATCH_TRADES, TRADE_SHARE, match_orders
+from collections.abc import Iterator, Mapping
 from typing import Any  #, Callable
 import numpy as np
-import pandas as pd
-import statistics
-import copy
 import uuid
 import random
 import os
+import gzip
+import shutil
+import tempfile
+import argparse
+import csv
+import importlib
+import itertools
+import re
+import sys
+import time
 from datetime import datetime
 
 # Timesteps used in training files
@@ -16,6 +31,20 @@ TIME_DELTA = 100
 # Please put all! the price and log files into
 # the same directory or adjust the code accordingly
 TRAINING_DATA_PREFIX = "./training"
+# Parsed training files are cached here as memory-mapped .npy columns,
+# set to None to always parse the csv files
+CACHE_DATA_PREFIX = os.path.join(TRAINING_DATA_PREFIX, ".cache")
+# States kept in memory by simulate_alternative(streaming=True)
+STREAMING_WINDOW = 4
+# Write buffer of log files and gzip level of compressed ones (compress_log=True)
+LOG_BUFFER_SIZE = 1 << 20
+LOG_COMPRESSLEVEL = 6
+# Day k of a session starts at timestamp k * DAY_LENGTH
+DAY_LENGTH = 1000000
+# Timestamps between two checkpoints of the interactive runs
+CHECKPOINT_EVERY = 100000
+# The trader used when none is given, module:Class or path/to/module.py:Class
+DEFAULT_TRADER = "dontlooseshells_algo:Trader"
 
 ALL_SYMBOLS = [
     'PEARLS',
@@ -70,67 +99,77 @@ SYMBOLS_BY_ROUND_POSITIONABLE = {
     5: fifth_round_pst,
 }
 
-def process_prices(df_prices, round, time_limit) -> dict[int, TradingState]:
-    states = {}
-    for _, row in df_prices.iterrows():
-        time: int = int(row["timestamp"])
-        if time > time_limit:
-            break
-        product: str = row["product"]
-        if states.get(time) == None:
-            position: Dict[Product, Position] = {}
-            own_trades: Dict[Symbol, List[Trade]] = {}
-            market_trades: Dict[Symbol, List[Trade]] = {}
-            observations: Dict[Product, Observation] = {}
-            listings = {}
-            depths = {}
-            states[time] = TradingState(time, listings, depths, own_trades, market_trades, position, observations)
-
-        if product not in states[time].position and product in SYMBOLS_BY_ROUND_POSITIONABLE[round]:
-            states[time].position[product] = 0
-            states[time].own_trades[product] = []
-            states[time].market_trades[product] = []
-
-        states[time].listings[product] = Listing(product, product, "1")
-
-        if product == "DOLPHIN_SIGHTINGS":
-            states[time].observations["DOLPHIN_SIGHTINGS"] = row['mid_price']
-            
-        depth = OrderDepth()
-        if row["bid_price_1"]> 0:
-            depth.buy_orders[row["bid_price_1"]] = int(row["bid_volume_1"])
-        if row["bid_price_2"]> 0:
-            depth.buy_orders[row["bid_price_2"]] = int(row["bid_volume_2"])
-        if row["bid_price_3"]> 0:
-            depth.buy_orders[row["bid_price_3"]] = int(row["bid_volume_3"])
-        if row["ask_price_1"]> 0:
-            depth.sell_orders[row["ask_price_1"]] = -int(row["ask_volume_1"])
-        if row["ask_price_2"]> 0:
-            depth.sell_orders[row["ask_price_2"]] = -int(row["ask_volume_2"])
-        if row["ask_price_3"]> 0:
-            depth.sell_orders[row["ask_price_3"]] = -int(row["ask_volume_3"])
-        states[time].order_depths[product] = depth
-
-    return states
-
-def process_trades(df_trades, states: dict[int, TradingState], time_limit, names=True):
-    for _, trade in df_trades.iterrows():
-        time: int = trade['timestamp']
-        if time > time_limit:
-            break
-        symbol = trade['symbol']
+def process_prices(df_prices, round, time_limit) -> Mapping[int, TradingState]:
+    day_data = DayData.from_frames(df_prices, None, SYMBOLS_BY_ROUND_POSITIONABLE[round], time_limit)
+    return day_data.states()
+
+def process_trades(df_trades, states: Mapping[int, TradingState], time_limit, names=True):
+    df_trades = df_trades[df_trades['timestamp'] <= time_limit]
+    for time, symbol, price, quantity, buyer, seller in zip(
+            df_trades['timestamp'].tolist(),
+            df_trades['symbol'].tolist(),
+            df_trades['price'].tolist(),
+            df_trades['quantity'].tolist(),
+            df_trades['buyer'].tolist(),
+            df_trades['seller'].tolist()):
         if symbol not in states[time].market_trades:
             states[time].market_trades[symbol] = []
-        t = Trade(
-                symbol, 
-                trade['price'], 
-                trade['quantity'], 
-                str(trade['buyer']), 
-                str(trade['seller']),
-                time)
+        t = Trade(symbol, price, quantity, str(buyer), str(seller), time)
         states[time].market_trades[symbol].append(t)
     return states
+
+def day_file_paths(round: int, day: int, names=True) -> tuple[str, str]:
+    prices_path = os.path.join(TRAINING_DATA_PREFIX, f'prices_round_{round}_day_{day}.csv')
+    trades_path = os.path.join(TRAINING_DATA_PREFIX, f'trades_round_{round}_day_{day}_wn.csv')
+    if not names:
+        trades_path = os.path.join(TRAINING_DATA_PREFIX, f'trades_round_{round}_day_{day}_nn.csv')
+    return prices_path, trades_path
+
+def load_day_data(round: int, day: int, names=True, time_limit=999900) -> DayData:
+    prices_path, trades_path = day_file_paths(round, day, names)
+    if CACHE_DATA_PREFIX is None:
+        return DayData.from_csv(prices_path, trades_path, SYMBOLS_BY_ROUND_POSITIONABLE[round], time_limit)
+    return DayData.from_cache(prices_path, trades_path, SYMBOLS_BY_ROUND_POSITIONABLE[round], time_limit, CACHE_DATA_PREFIX)
+
+# Converts every training file once, later runs only map the cache
+def build_training_cache():
+    for file_name in sorted(os.listdir(TRAINING_DATA_PREFIX)):
+        if not file_name.endswith('.csv'):
+            continue
+        kind = 'prices' if file_name.startswith('prices') else 'trades'
+        cached_columns(os.path.join(TRAINING_DATA_PREFIX, file_name), kind, CACHE_DATA_PREFIX)
        
+def load_trader_class(spec: str):
+    # module:Class or path/to/module.py:Class
+    module_name, _, class_name = spec.partition(':')
+    if module_name.endswith('.py'):
+        path = os.path.abspath(module_name)
+        module_name = os.path.splitext(os.path.basename(path))[0]
+        sys.path.insert(0, os.path.dirname(path))
+    module = importlib.import_module(module_name)
+    return getattr(module, class_name or 'Trader')
+
+
+# `from backtester import Trader` still gives the default trader, it's only
+# imported when asked for
+def __getattr__(name: str):
+    if name == 'Trader':
+        return load_trader_class(DEFAULT_TRADER)
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+def available_days(training_prefix=TRAINING_DATA_PREFIX) -> list[tuple[int, int]]:
+    days = []
+    for file_name in os.listdir(training_prefix):
+        match = re.fullmatch(r'prices_round_(\d+)_day_(-?\d+)\.csv', file_name)
+        if match:
+            days.append((int(match.group(1)), int(match.group(2))))
+    return sorted(days)
+
+
+def yes_no(value: str) -> bool:
+    return value.lower() in ['y', 'yes', 'true', '1']
+
 current_limits = {
     'PEARLS': 20,
     'BANANAS': 20,
@@ -144,27 +183,30 @@ current_limits = {
     'PICNIC_BASKET': 70,
 }
 
-def calc_mid(states: dict[int, TradingState], round: int, time: int, max_time: int) -> dict[str, float]:
-    medians_by_symbol = {}
-    non_empty_time = time
-    for psymbol in SYMBOLS_BY_ROUND_POSITIONABLE[round]:
-        hitted_zero = False
-        while len(states[non_empty_time].order_depths[psymbol].sell_orders.keys()) == 0 or len(states[non_empty_time].order_depths[psymbol].buy_orders.keys()) == 0:
-            # little hack
-            if time == 0 or hitted_zero and time != max_time:
-                hitted_zero = True
-                non_empty_time += TIME_DELTA
-            else:
-                non_empty_time -= TIME_DELTA
-        min_ask = min(states[non_empty_time].order_depths[psymbol].sell_orders.keys())
-        max_bid = max(states[non_empty_time].order_depths[psymbol].buy_orders.keys())
-        median_price = statistics.median([min_ask, max_bid])
-        medians_by_symbol[psymbol] = median_price
-    return medians_by_symbol
+# Mid price per positionable symbol at tick i, falls back to older ticks
+# (newer at timestamp 0) if a side of the book is empty, see MidIndex
+def calc_mid(mid_index: MidIndex | StreamingMids, round: int, i: int) -> dict[str, float]:
+    symbols = SYMBOLS_BY_ROUND_POSITIONABLE[round]
+    return dict(zip(symbols, mid_index.mids_at(symbols, i)))
 
 
 # Setting a high time_limit can be harder to visualize
 # print_position prints the position before! every Trader.run
+# streaming=True keeps only a few states and the current pnl values in memory
+# and writes the log file while simulating, after_last_round then only
+# receives the values of the last timestamp
+# write_log=False skips the log file, day_data can be passed in to reuse
+# already loaded data across runs, matching selects one of MATCHING_MODES
+# (overrides halfway), compress_log=True writes the log file gzipped,
+# run_stats measures every Trader.run call (see instrumentation.py),
+# checkpoint_every writes a checkpoint every that many timestamps and
+# start_time resumes from the latest checkpoint at or before it (see checkpoints.py),
+# the log file then starts there too, trade_share is the share of a crossing
+# market trade that fills a resting order with matching='trades',
+# features puts the values of a FeatureSet into state.features every tick
+# (see features.py), computed for the whole day up front or tick by tick when streaming,
+# series is filled with the pnl and position of every tick (see results_store.py),
+# risk keeps the risk metrics of the run and stops it early by its stop rules (see risk.py)
 def simulate_alternative(
         round: int, 
         day: int, 
@@ -173,69 +215,161 @@ def simulate_alternative(
         names=True, 
         halfway=False,
         monkeys=False,
-        monkey_names=['Caesar', 'Camilla', 'Peter']
+        monkey_names=['Caesar', 'Camilla', 'Peter'],
+        streaming=False,
+        write_log=True,
+        day_data: DayData | None = None,
+        matching: str | None = None,
+        compress_log=False,
+        run_stats: RunStats | None = None,
+        checkpoint_every: int | None = None,
+        start_time=0,
+        trade_share=TRADE_SHARE,
+        features: FeatureSet | None = None,
+        series: RunSeries | None = None,
+        risk: RiskMetrics | None = None,
     ):
-    prices_path = os.path.join(TRAINING_DATA_PREFIX, f'prices_round_{round}_day_{day}.csv')
-    trades_path = os.path.join(TRAINING_DATA_PREFIX, f'trades_round_{round}_day_{day}_wn.csv')
-    if not names:
-        trades_path = os.path.join(TRAINING_DATA_PREFIX, f'trades_round_{round}_day_{day}_nn.csv')
-    df_prices = pd.read_csv(prices_path, sep=';')
-    df_trades = pd.read_csv(trades_path, sep=';', dtype={ 'seller': str, 'buyer': str })
-
-    states = process_prices(df_prices, round, time_limit)
-    states = process_trades(df_trades, states, time_limit, names)
+    if matching is None:
+        matching = MATCH_HALFWAY if halfway else MATCH_EXACT
+    if day_data is None:
+        day_data = load_day_data(round, day, names, time_limit)
+    trade_book = day_data.trade_book() if matching == MATCH_TRADES else None
+    # states are built from the columnar day data once the loop reaches them
+    states = day_data.states(STREAMING_WINDOW if streaming else None)
     ref_symbols = list(states[0].position.keys())
-    max_time = max(list(states.keys()))
-
-    # handling these four is rather tricky 
-    profits_by_symbol: dict[int, dict[str, float]] = { 0: dict(zip(ref_symbols, [0.0]*len(ref_symbols))) }
-    balance_by_symbol: dict[int, dict[str, float]] = { 0: copy.deepcopy(profits_by_symbol[0]) }
-    credit_by_symbol: dict[int, dict[str, float]] = { 0: copy.deepcopy(profits_by_symbol[0]) }
-    unrealized_by_symbol: dict[int, dict[str, float]] = { 0: copy.deepcopy(profits_by_symbol[0]) }
-
-    states, trader, profits_by_symbol, balance_by_symbol = trades_position_pnl_run(states, max_time, profits_by_symbol, balance_by_symbol, credit_by_symbol, unrealized_by_symbol)
-    create_log_file(round, day, states, profits_by_symbol, balance_by_symbol, trader)
-    profit_balance_monkeys = {}
-    trades_monkeys = {}
+    max_time = int(day_data.timestamps[-1])
+
+    # handling these four is rather tricky, see Ledger
+    ledger = Ledger(ref_symbols, day_data.timestamps, keep_history=not streaming)
+    profits_by_symbol = ledger.series('profits')
+    balance_by_symbol = ledger.series('balance')
+
+    checkpoints = None
+    start = 0
+    if checkpoint_every is not None or start_time > 0:
+        checkpoints = Checkpoints(round, day, names, matching, checkpoint_every)
+    if start_time > 0:
+        checkpoint = checkpoints.load(start_time)
+        if checkpoint is None:
+            print(f'No checkpoint at or before {start_time} in {checkpoints.directory}, starting at 0')
+        else:
+            print(f"Resuming from the checkpoint at {checkpoint['time']}")
+            trader = resume(checkpoint, states, ledger)
+            start = checkpoint['index']
+
+    feature_rows = None
+    if features is not None:
+        feature_rows = features.incremental(day_data) if streaming else features.table(day_data)
+        # the running values of a resumed run need the ticks before it
+        if streaming:
+            for i in range(start):
+                feature_rows.row(i, day_data.state_at(i))
+
+    if series is not None:
+        series.begin(ledger, start)
+    if run_stats is not None:
+        run_stats.start()
+    if streaming:
+        ticks = iter_trades_position_pnl(states, max_time, ledger, day_data.streaming_mids(), trader, round, matching, run_stats, checkpoints, start, trade_book, trade_share, feature_rows, risk)
+        if series is not None:
+            ticks = series.recording(ticks, ledger)
+        if write_log:
+            with LogFileWriter(round, day, day_data, ref_symbols, trader, compress_log, run_stats, start) as log_writer:
+                for time, state in ticks:
+                    log_writer.write_tick(time, state, ledger.at(ledger.profits, time), ledger.at(ledger.balance, time))
+        else:
+            for _ in ticks:
+                pass
+    else:
+        states, trader, profits_by_symbol, balance_by_symbol = trades_position_pnl_run(states, max_time, ledger, day_data.mid_index(), trader, round, matching, run_stats, checkpoints, start, trade_book, trade_share, feature_rows, risk)
+        if series is not None:
+            series.record_all(ledger)
+        if write_log:
+            create_log_file(round, day, day_data, ledger, trader, compress_log, run_stats, start)
+    if run_stats is not None:
+        run_stats.stop()
+        print(run_stats.summary())
     if monkeys:
-        profit_balance_monkeys, trades_monkeys, profit_monkeys, balance_monkeys, monkey_positions_by_timestamp = monkey_positions(monkey_names, states, round)
+        participants = monkey_positions(monkey_names, day_data, round, ref_symbols)
         print("End of monkey simulation reached.")
-        print(f'PNL + BALANCE monkeys {profit_balance_monkeys[max_time]}')
-        print(f'Trades monkeys {trades_monkeys[max_time]}')
+        print(f'PNL + BALANCE monkeys {participants.final_pnl()}')
+        print(f'Trades monkeys {participants.trades_at(len(day_data) - 1)}')
     if hasattr(trader, 'after_last_round'):
         if callable(trader.after_last_round): #type: ignore
             trader.after_last_round(profits_by_symbol, balance_by_symbol) #type: ignore
+    # the last tick, before max_time if the run was stopped
+    last_time = int(day_data.timestamps[ledger.last])
+    return final_pnl(profits_by_symbol[last_time], balance_by_symbol[last_time])
+
+# profit_and_loss of the last timestamp per positionable symbol, same as in the log file
+def final_pnl(profits: dict[str, float], balance: dict[str, float]) -> dict[str, float]:
+    return { symbol: profits[symbol] + balance[symbol] for symbol in profits.keys() }
 
 
 def trades_position_pnl_run(
-        states: dict[int, TradingState],
-        max_time: int, 
-        profits_by_symbol: dict[int, dict[str, float]], 
-        balance_by_symbol: dict[int, dict[str, float]], 
-        credit_by_symbol: dict[int, dict[str, float]], 
-        unrealized_by_symbol: dict[int, dict[str, float]], 
+        states: Mapping[int, TradingState],
+        max_time: int | None, 
+        ledger: Ledger,
+        mid_index: MidIndex | StreamingMids,
+        trader,
+        round: int,
+        matching: str,
+        run_stats: RunStats | None = None,
+        checkpoints: Checkpoints | None = None,
+        start=0,
+        trade_book: TradeBook | None = None,
+        trade_share=TRADE_SHARE,
+        features: FeatureTable | IncrementalFeatures | None = None,
+        risk: RiskMetrics | None = None,
         ):
-        for time, state in states.items():
-            position = copy.deepcopy(state.position)
-            orders = trader.run(state)
-            trades = clear_order_book(orders, state.order_depths, time, halfway)
-            mids = calc_mid(states, round, time, max_time)
-            if profits_by_symbol.get(time + TIME_DELTA) == None and time != max_time:
-                profits_by_symbol[time + TIME_DELTA] = copy.deepcopy(profits_by_symbol[time])
-            if credit_by_symbol.get(time + TIME_DELTA) == None and time != max_time:
-                credit_by_symbol[time + TIME_DELTA] = copy.deepcopy(credit_by_symbol[time])
-            if balance_by_symbol.get(time + TIME_DELTA) == None and time != max_time:
-                balance_by_symbol[time + TIME_DELTA] = copy.deepcopy(balance_by_symbol[time])
-            if unrealized_by_symbol.get(time + TIME_DELTA) == None and time != max_time:
-                unrealized_by_symbol[time + TIME_DELTA] = copy.deepcopy(unrealized_by_symbol[time])
-                for psymbol in SYMBOLS_BY_ROUND_POSITIONABLE[round]:
-                    unrealized_by_symbol[time + TIME_DELTA][psymbol] = mids[psymbol]*position[psymbol]
+        for _ in iter_trades_position_pnl(states, max_time, ledger, mid_index, trader, round, matching, run_stats, checkpoints, start, trade_book, trade_share, features, risk):
+            pass
+        return states, trader, ledger.series('profits'), ledger.series('balance')
+
+# Yields every (time, state) once its values in the ledger are final,
+# starting at tick start. max_time is None if the session continues after
+# the last tick, nothing is liquidated then (see simulate_session).
+# The run ends early once risk breaks one of its stop rules.
+def iter_trades_position_pnl(
+        states: Mapping[int, TradingState],
+        max_time: int | None, 
+        ledger: Ledger,
+        mid_index: MidIndex | StreamingMids,
+        trader,
+        round: int,
+        matching: str,
+        run_stats: RunStats | None = None,
+        checkpoints: Checkpoints | None = None,
+        start=0,
+        trade_book: TradeBook | None = None,
+        trade_share=TRADE_SHARE,
+        features: FeatureTable | IncrementalFeatures | None = None,
+        risk: RiskMetrics | None = None,
+        ) -> Iterator[tuple[int, TradingState]]:
+        if risk is not None and risk.ticks == 0:
+            risk.begin(ledger.total(start))
+        for i, time in enumerate(itertools.islice(states, start, None), start):
+            state = states[time]
+            if checkpoints is not None:
+                checkpoints.save(i, time, state, ledger, trader)
+            position = dict(state.position)
+            if features is not None:
+                state.features = features.row(i, state)
+            if run_stats is None:
+                orders = trader.run(state)
+            else:
+                orders = run_stats.run(trader, state)
+            trades = match_orders(orders, state.order_depths, time, matching, trade_book, trade_share)
+            mids = calc_mid(mid_index, round, i)
+            ledger.open_tick(i, position, mids, time == max_time)
             valid_trades = []
             failed_symbol = []
             grouped_by_symbol = {}
+            rejected = 0
             if len(trades) > 0:
                 for trade in trades:
                     if trade.symbol in failed_symbol:
+                        rejected += 1
                         continue
                     n_position = position[trade.symbol] + trade.quantity
                     if abs(n_position) > current_limits[trade.symbol]:
@@ -249,192 +383,47 @@ def trades_position_pnl_run(
                             trades_str = ', '.join("%s: %s" % item for item in trade_vars.items())
                             print(trades_str)
                         failed_symbol.append(trade.symbol)
+                        rejected += 1
                     else:
                         valid_trades.append(trade) 
                         position[trade.symbol] += trade.quantity
             FLEX_TIME_DELTA = TIME_DELTA
+            target = i + 1
             if time == max_time:
                 FLEX_TIME_DELTA = 0
+                target = i
             for valid_trade in valid_trades:
                     if grouped_by_symbol.get(valid_trade.symbol) == None:
                         grouped_by_symbol[valid_trade.symbol] = []
                     grouped_by_symbol[valid_trade.symbol].append(valid_trade)
-                    credit_by_symbol[time + FLEX_TIME_DELTA][valid_trade.symbol] += -valid_trade.price * valid_trade.quantity
-            if states.get(time + FLEX_TIME_DELTA) != None:
-                states[time + FLEX_TIME_DELTA].own_trades = grouped_by_symbol
-                for psymbol in SYMBOLS_BY_ROUND_POSITIONABLE[round]:
-                    unrealized_by_symbol[time + FLEX_TIME_DELTA][psymbol] = mids[psymbol]*position[psymbol]
-                    if position[psymbol] == 0 and states[time].position[psymbol] != 0:
-                        profits_by_symbol[time + FLEX_TIME_DELTA][psymbol] += credit_by_symbol[time + FLEX_TIME_DELTA][psymbol] #+unrealized_by_symbol[time + FLEX_TIME_DELTA][psymbol]
-                        credit_by_symbol[time + FLEX_TIME_DELTA][psymbol] = 0
-                        balance_by_symbol[time + FLEX_TIME_DELTA][psymbol] = 0
-                    else:
-                        balance_by_symbol[time + FLEX_TIME_DELTA][psymbol] = credit_by_symbol[time + FLEX_TIME_DELTA][psymbol] + unrealized_by_symbol[time + FLEX_TIME_DELTA][psymbol]
-
+                    ledger.fill(target, valid_trade.symbol, valid_trade.price, valid_trade.quantity)
+            ledger.close_tick(i, target, position, mids, time == max_time)
             if time == max_time:
                 print("End of simulation reached. All positions left are liquidated")
-                # i have the feeling this already has been done, and only repeats the same values as before
-                for osymbol in position.keys():
-                    profits_by_symbol[time + FLEX_TIME_DELTA][osymbol] += credit_by_symbol[time + FLEX_TIME_DELTA][osymbol] + unrealized_by_symbol[time + FLEX_TIME_DELTA][osymbol]
-                    balance_by_symbol[time + FLEX_TIME_DELTA][osymbol] = 0
-            if states.get(time + FLEX_TIME_DELTA) != None:
-                states[time + FLEX_TIME_DELTA].position = copy.deepcopy(position)
-        return states, trader, profits_by_symbol, balance_by_symbol
-
-def monkey_positions(monkey_names: list[str], states: dict[int, TradingState], round):
-    profits_by_symbol: dict[int, dict[str, dict[str, float]]] = { 0: {} }
-    balance_by_symbol: dict[int, dict[str, dict[str, float]]] =  { 0: {} }
-    credit_by_symbol: dict[int, dict[str, dict[str, float]]] = { 0: {} }
-    unrealized_by_symbol: dict[int, dict[str, dict[str, float]]] = { 0: {} }
-    prev_monkey_positions: dict[str, dict[str, int]] = {}
-    monkey_positions: dict[str, dict[str, int]] = {}
-    trades_by_round: dict[int, dict[str, list[Trade]]]  = { 0: dict(zip(monkey_names,  [[] for x in range(len(monkey_names))])) }
-    profit_balance: dict[int, dict[str, dict[str, float]]] = { 0: {} }
-
-    monkey_positions_by_timestamp: dict[int, dict[str, dict[str, int]]] = {}
-
-    for monkey in monkey_names:
-        ref_symbols = list(states[0].position.keys())
-        profits_by_symbol[0][monkey] = dict(zip(ref_symbols, [0.0]*len(ref_symbols)))
-        balance_by_symbol[0][monkey] = copy.deepcopy(profits_by_symbol[0][monkey])
-        credit_by_symbol[0][monkey] = copy.deepcopy(profits_by_symbol[0][monkey])
-        unrealized_by_symbol[0][monkey] = copy.deepcopy(profits_by_symbol[0][monkey])
-        profit_balance[0][monkey] = copy.deepcopy(profits_by_symbol[0][monkey])
-        monkey_positions[monkey] = dict(zip(SYMBOLS_BY_ROUND_POSITIONABLE[round], [0]*len(SYMBOLS_BY_ROUND_POSITIONABLE[round])))
-        prev_monkey_positions[monkey] = copy.deepcopy(monkey_positions[monkey])
-
-    for time, state in states.items():
-        already_calculated = False
-        for monkey in monkey_names:
-            position = copy.deepcopy(monkey_positions[monkey])
-            mids = calc_mid(states, round, time, max_time)
-            if trades_by_round.get(time + TIME_DELTA) == None:
-                trades_by_round[time + TIME_DELTA] =  copy.deepcopy(trades_by_round[time])
-
-            for psymbol in POSITIONABLE_SYMBOLS:
-                if already_calculated:
-                    break
-                if state.market_trades.get(psymbol):
-                    for market_trade in state.market_trades[psymbol]:
-                        if trades_by_round[time].get(market_trade.buyer) != None:
-                            trades_by_round[time][market_trade.buyer].append(Trade(psymbol, market_trade.price, market_trade.quantity))
-                        if trades_by_round[time].get(market_trade.seller) != None:
-                            trades_by_round[time][market_trade.seller].append(Trade(psymbol, market_trade.price, -market_trade.quantity))
-            already_calculated = True
-
-            if profit_balance.get(time + TIME_DELTA) == None and time != max_time:
-                profit_balance[time + TIME_DELTA] = copy.deepcopy(profit_balance[time])
-            if profits_by_symbol.get(time + TIME_DELTA) == None and time != max_time:
-                profits_by_symbol[time + TIME_DELTA] = copy.deepcopy(profits_by_symbol[time])
-            if credit_by_symbol.get(time + TIME_DELTA) == None and time != max_time:
-                credit_by_symbol[time + TIME_DELTA] = copy.deepcopy(credit_by_symbol[time])
-            if balance_by_symbol.get(time + TIME_DELTA) == None and time != max_time:
-                balance_by_symbol[time + TIME_DELTA] = copy.deepcopy(balance_by_symbol[time])
-            if unrealized_by_symbol.get(time + TIME_DELTA) == None and time != max_time:
-                unrealized_by_symbol[time + TIME_DELTA] = copy.deepcopy(unrealized_by_symbol[time])
-                for psymbol in SYMBOLS_BY_ROUND_POSITIONABLE[round]:
-                    unrealized_by_symbol[time + TIME_DELTA][monkey][psymbol] = mids[psymbol]*position[psymbol]
-            valid_trades = []
-            if trades_by_round[time].get(monkey) != None:  
-                valid_trades = trades_by_round[time][monkey]
-            FLEX_TIME_DELTA = TIME_DELTA
-            if time == max_time:
-                FLEX_TIME_DELTA = 0
-            for valid_trade in valid_trades:
-                    position[valid_trade.symbol] += valid_trade.quantity
-                    credit_by_symbol[time + FLEX_TIME_DELTA][monkey][valid_trade.symbol] += -valid_trade.price * valid_trade.quantity
-            if states.get(time + FLEX_TIME_DELTA) != None:
-                for psymbol in SYMBOLS_BY_ROUND_POSITIONABLE[round]:
-                    unrealized_by_symbol[time + FLEX_TIME_DELTA][monkey][psymbol] = mids[psymbol]*position[psymbol]
-                    if position[psymbol] == 0 and prev_monkey_positions[monkey][psymbol] != 0:
-                        profits_by_symbol[time + FLEX_TIME_DELTA][monkey][psymbol] += credit_by_symbol[time + FLEX_TIME_DELTA][monkey][psymbol]
-                        credit_by_symbol[time + FLEX_TIME_DELTA][monkey][psymbol] = 0
-                        balance_by_symbol[time + FLEX_TIME_DELTA][monkey][psymbol] = 0
-                    else:
-                        balance_by_symbol[time + FLEX_TIME_DELTA][monkey][psymbol] = credit_by_symbol[time + FLEX_TIME_DELTA][monkey][psymbol] + unrealized_by_symbol[time + FLEX_TIME_DELTA][monkey][psymbol]
-                    profit_balance[time + FLEX_TIME_DELTA][monkey][psymbol] = profits_by_symbol[time + FLEX_TIME_DELTA][monkey][psymbol] + balance_by_symbol[time + FLEX_TIME_DELTA][monkey][psymbol]
-            prev_monkey_positions[monkey] = copy.deepcopy(monkey_positions[monkey])
-            monkey_positions[monkey] = position
-            if time == max_time:
-                # i have the feeling this already has been done, and only repeats the same values as before
-                for osymbol in position.keys():
-                    profits_by_symbol[time + FLEX_TIME_DELTA][monkey][osymbol] += credit_by_symbol[time + FLEX_TIME_DELTA][monkey][osymbol] + unrealized_by_symbol[time + FLEX_TIME_DELTA][monkey][osymbol]
-                    balance_by_symbol[time + FLEX_TIME_DELTA][monkey][osymbol] = 0
-        monkey_positions_by_timestamp[time] = copy.deepcopy(monkey_positions)
-    return profit_balance, trades_by_round, profits_by_symbol, balance_by_symbol, monkey_positions_by_timestamp
-
-
-def cleanup_order_volumes(org_orders: List[Order]) -> List[Order]:
-    orders = []
-    for order_1 in org_orders:
-        final_order = copy.copy(order_1)
-        for order_2 in org_orders:
-            if order_1.price == order_2.price and order_1.quantity == order_2.quantity:
-               continue 
-            if order_1.price == order_2.price:
-                final_order.quantity += order_2.quantity
-        orders.append(final_order)
-    return orders
-
-def clear_order_book(trader_orders: dict[str, List[Order]], order_depth: dict[str, OrderDepth], time: int, halfway: bool) -> list[Trade]:
-        trades = []
-        for symbol in trader_orders.keys():
-            if order_depth.get(symbol) != None:
-                symbol_order_depth = copy.deepcopy(order_depth[symbol])
-                t_orders = cleanup_order_volumes(trader_orders[symbol])
-                for order in t_orders:
-                    if order.quantity < 0:
-                        if halfway:
-                            bids = symbol_order_depth.buy_orders.keys()
-                            asks = symbol_order_depth.sell_orders.keys()
-                            max_bid = max(bids)
-                            min_ask = min(asks)
-                            if order.price <= statistics.median([max_bid, min_ask]):
-                                trades.append(Trade(symbol, order.price, order.quantity, "BOT", "YOU", time))
-                            else:
-                                print(f'No matches for order {order} at time {time}')
-                                print(f'Order depth is {order_depth[order.symbol].__dict__}')
-                        else:
-                            potential_matches = list(filter(lambda o: o[0] == order.price, symbol_order_depth.buy_orders.items()))
-                            if len(potential_matches) > 0:
-                                match = potential_matches[0]
-                                final_volume = 0
-                                if abs(match[1]) > abs(order.quantity):
-                                    final_volume = order.quantity
-                                else:
-                                    #this should be negative
-                                    final_volume = -match[1]
-                                trades.append(Trade(symbol, order.price, final_volume, "BOT", "YOU", time))
-                            else:
-                                print(f'No matches for order {order} at time {time}')
-                                print(f'Order depth is {order_depth[order.symbol].__dict__}')
-                    if order.quantity > 0:
-                        if halfway:
-                            bids = symbol_order_depth.buy_orders.keys()
-                            asks = symbol_order_depth.sell_orders.keys()
-                            max_bid = max(bids)
-                            min_ask = min(asks)
-                            if order.price >= statistics.median([max_bid, min_ask]):
-                                trades.append(Trade(symbol, order.price, order.quantity, "YOU", "BOT", time))
-                            else:
-                                print(f'No matches for order {order} at time {time}')
-                                print(f'Order depth is {order_depth[order.symbol].__dict__}')
-                        else:
-                            potential_matches = list(filter(lambda o: o[0] == order.price, symbol_order_depth.sell_orders.items()))
-                            if len(potential_matches) > 0:
-                                match = potential_matches[0]
-                                final_volume = 0
-                                #Match[1] will be negative so needs to be changed to work here
-                                if abs(match[1]) > abs(order.quantity):
-                                    final_volume = order.quantity
-                                else:
-                                    final_volume = abs(match[1])
-                                trades.append(Trade(symbol, order.price, final_volume, "YOU", "BOT", time))
-                            else:
-                                print(f'No matches for order {order} at time {time}')
-                                print(f'Order depth is {order_depth[order.symbol].__dict__}')
-        return trades
-                            
+            next_state = states.get(time + FLEX_TIME_DELTA)
+            if next_state != None:
+                next_state.own_trades = grouped_by_symbol
+                next_state.position = dict(position)
+            if risk is not None:
+                risk.update(time, ledger.total(i), position, current_limits, valid_trades, rejected)
+            yield time, state
+            if risk is not None and risk.stopped is not None:
+                print(f'Stopped at {time}: {risk.stopped[1]}')
+                return
+
+# Positions and pnl of the monkeys from the market trades, see ParticipantPnL
+def monkey_positions(monkey_names: list[str], day_data: DayData, round: int, symbols: list[str]) -> ParticipantPnL:
+    round_symbols = SYMBOLS_BY_ROUND_POSITIONABLE[round]
+    mids = day_data.mid_index().fallback_mids(round_symbols)[:, [round_symbols.index(symbol) for symbol in symbols]]
+    return ParticipantPnL(day_data, symbols, monkey_names, mids)
+
+
+# matching overrides halfway, see matching.py for the modes
+def clear_order_book(trader_orders: dict[str, List[Order]], order_depth: dict[str, OrderDepth], time: int, halfway: bool, matching: str | None = None) -> list[Trade]:
+        if matching is None:
+            matching = MATCH_HALFWAY if halfway else MATCH_EXACT
+        return match_orders(trader_orders, order_depth, time, matching)
+
 csv_header = "day;timestamp;product;bid_price_1;bid_volume_1;bid_price_2;bid_volume_2;bid_price_3;bid_volume_3;ask_price_1;ask_volume_1;ask_price_2;ask_volume_2;ask_price_3;ask_volume_3;mid_price;profit_and_loss\n"
 log_header = [
     'Sandbox logs:\n',
@@ -444,77 +433,214 @@ log_header = [
     'REPORT RequestId: 8ab36ff8-b4e6-42d4-b012-e6ad69c42085	Duration: 18.73 ms	Billed Duration: 19 ms	Memory Size: 128 MB	Max Memory Used: 94 MB	Init Duration: 1574.09 ms\n',
 ]
 
-def create_log_file(round: int, day: int, states: dict[int, TradingState], profits_by_symbol: dict[int, dict[str, float]], balance_by_symbol: dict[int, dict[str, float]], trader: Trader):
+def new_log_path(compress=False) -> str:
     file_name = uuid.uuid4()
     timest = datetime.timestamp(datetime.now())
-    max_time = max(list(states.keys()))
-    log_path = os.path.join('logs', f'{timest}_{file_name}.log')
-    with open(log_path, 'w', encoding="utf-8", newline='\n') as f:
+    return os.path.join('logs', f'{timest}_{file_name}.log' + ('.gz' if compress else ''))
+
+# Log files are written through a large buffer, compressed ones with gzip
+def open_log(path: str):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'wt', compresslevel=LOG_COMPRESSLEVEL, encoding="utf-8", newline='\n')
+    return open(path, 'w', buffering=LOG_BUFFER_SIZE, encoding="utf-8", newline='\n')
+
+def sandbox_log_line(time: int, trader) -> str:
+    if hasattr(trader, 'logger'):
+        if hasattr(trader.logger, 'local_logs') != None:
+            if trader.logger.local_logs.get(time) != None:
+                return f'{time} {trader.logger.local_logs[time]}\n'
+    if time != 0:
+        return f'{time}\n'
+    return ''
+
+def write_activities_header(f):
+    f.write(f'\n\n')
+    f.write('Submission logs:\n\n\n')
+    f.write('Activities log:\n')
+    f.write(csv_header)
+
+# pnl holds profit + balance of every tick for the symbols of the ledger,
+# the rows of the ticks before start and from end on (a stopped run) are left out
+def write_activities(f, round: int, day: int, day_data: DayData, symbols: list[str], pnl: np.ndarray, start=0, end: int | None = None):
+    if end is None:
+        end = len(day_data)
+    write_activities_header(f)
+    write_activity_rows(f, round, day, day_data, symbols, pnl[start:end], start)
+    print_final_profits(round, day_data, symbols, pnl[end - 1], end - 1)
+
+# The rows of the ticks start to start + len(pnl) - 1, CHUNK_TICKS ticks at a time
+def write_activity_rows(f, round: int, day: int, day_data: DayData, symbols: list[str], pnl: np.ndarray, start: int):
+    end = start + len(pnl)
+    for first in range(start, end, CHUNK_TICKS):
+        last = min(first + CHUNK_TICKS, end)
+        f.writelines(activity_lines(day_data, day, SYMBOLS_BY_ROUND[round], symbols, pnl[first - start:last - start], first, last))
+
+# pnl is the row of the last tick i
+def print_final_profits(round: int, day_data: DayData, symbols: list[str], pnl: np.ndarray, i: int):
+    mid_index = MidIndex(day_data, i, i + 1)
+    for symbol in SYMBOLS_BY_ROUND[round]:
+        if symbol in symbols and symbol in mid_index.column and mid_index.valid[0, mid_index.column[symbol]]:
+            print(f'Final profit for {symbol} = {pnl[symbols.index(symbol)]}')
+
+# run_stats replaces the example REPORT line with the measured one
+def write_log_header(f, run_stats: RunStats | None = None):
+    if run_stats is None:
         f.writelines(log_header)
+    else:
+        f.writelines(log_header[:-1])
+        f.write(run_stats.report_line('8ab36ff8-b4e6-42d4-b012-e6ad69c42085'))
+
+def create_log_file(round: int, day: int, day_data: DayData, ledger: Ledger, trader, compress=False, run_stats: RunStats | None = None, start=0) -> str:
+    max_time = int(day_data.timestamps[-1])
+    log_path = new_log_path(compress)
+    with open_log(log_path) as f:
+        write_log_header(f, run_stats)
         f.write('\n')
-        for time, state in states.items():
-            if hasattr(trader, 'logger'):
-                if hasattr(trader.logger, 'local_logs') != None:
-                    if trader.logger.local_logs.get(time) != None:
-                        f.write(f'{time} {trader.logger.local_logs[time]}\n')
-                        continue
-            if time != 0:
-                f.write(f'{time}\n')
-
-        f.write(f'\n\n')
-        f.write('Submission logs:\n\n\n')
-        f.write('Activities log:\n')
-        f.write(csv_header)
-        for time, state in states.items():
-            for symbol in SYMBOLS_BY_ROUND[round]:
-                f.write(f'{day};{time};{symbol};')
-                bids_length = len(state.order_depths[symbol].buy_orders)
-                bids = list(state.order_depths[symbol].buy_orders.items())
-                bids_prices = list(state.order_depths[symbol].buy_orders.keys())
-                bids_prices.sort()
-                asks_length = len(state.order_depths[symbol].sell_orders)
-                asks_prices = list(state.order_depths[symbol].sell_orders.keys())
-                asks_prices.sort()
-                asks = list(state.order_depths[symbol].sell_orders.items())
-                if bids_length >= 3:
-                    f.write(f'{bids[0][0]};{bids[0][1]};{bids[1][0]};{bids[1][1]};{bids[2][0]};{bids[2][1]};')
-                elif bids_length == 2:
-                    f.write(f'{bids[0][0]};{bids[0][1]};{bids[1][0]};{bids[1][1]};;;')
-                elif bids_length == 1:
-                    f.write(f'{bids[0][0]};{bids[0][1]};;;;;')
-                else:
-                    f.write(f';;;;;;')
-                if asks_length >= 3:
-                    f.write(f'{asks[0][0]};{asks[0][1]};{asks[1][0]};{asks[1][1]};{asks[2][0]};{asks[2][1]};')
-                elif asks_length == 2:
-                    f.write(f'{asks[0][0]};{asks[0][1]};{asks[1][0]};{asks[1][1]};;;')
-                elif asks_length == 1:
-                    f.write(f'{asks[0][0]};{asks[0][1]};;;;;')
-                else:
-                    f.write(f';;;;;;')
-                if len(asks_prices) == 0 or max(bids_prices) == 0:
-                    if symbol == 'DOLPHIN_SIGHTINGS':
-                        dolphin_sightings = state.observations['DOLPHIN_SIGHTINGS']
-                        f.write(f'{dolphin_sightings};{0.0}\n')
-                    else:
-                        f.write(f'{0};{0.0}\n')
-                else:
-                    actual_profit = 0.0
-                    if symbol in SYMBOLS_BY_ROUND_POSITIONABLE[round]:
-                            actual_profit = profits_by_symbol[time][symbol] + balance_by_symbol[time][symbol]
-                    min_ask = min(asks_prices)
-                    max_bid = max(bids_prices)
-                    median_price = statistics.median([min_ask, max_bid])
-                    f.write(f'{median_price};{actual_profit}\n')
-                    if time == max_time:
-                        if profits_by_symbol[time].get(symbol) != None:
-                            print(f'Final profit for {symbol} = {actual_profit}')
+        f.writelines(sandbox_log_line(time, trader) for time in day_data.timestamps[start:ledger.last + 1].tolist())
+        write_activities(f, round, day, day_data, ledger.symbols, (ledger.profits + ledger.balance)[:len(day_data)], start, ledger.last + 1)
         print(f"\nSimulation on round {round} day {day} for time {max_time} complete")
+    return log_path
+
+class LogFileWriter:
+    """
+    Writes the same log file as create_log_file, one timestamp at a time.
+    The activities section comes last in the file, its rows are formatted
+    every CHUNK_TICKS ticks and spooled to a temporary file until then, so
+    only the pnl of one chunk of ticks is kept. With run_stats the header
+    is only known at the end, the sandbox logs are spooled as well.
+    A resumed run starts at tick start.
+    """
+
+    def __init__(self, round: int, day: int, day_data: DayData, symbols: list[str], trader, compress=False, run_stats: RunStats | None = None, start=0):
+        self.round = round
+        self.day = day
+        self.day_data = day_data
+        self.symbols = symbols
+        self.max_time = int(day_data.timestamps[-1])
+        self.trader = trader
+        self.log_path = new_log_path(compress)
+        self.pnl = np.zeros((CHUNK_TICKS, len(symbols)))
+        # first tick of the chunk in pnl
+        self.chunk = start
+        self.ticks = start
+        self.run_stats = run_stats
+
+    def __enter__(self):
+        self.f = open_log(self.log_path)
+        if self.run_stats is None:
+            write_log_header(self.f)
+            self.f.write('\n')
+            self.sandbox = self.f
+        else:
+            self.sandbox = tempfile.TemporaryFile('w+', encoding="utf-8", newline='\n')
+        self.activities = tempfile.TemporaryFile('w+', encoding="utf-8", newline='\n')
+        return self
+
+    def write_tick(self, time: int, state: TradingState, profits: dict[str, float], balance: dict[str, float]):
+        self.sandbox.write(sandbox_log_line(time, self.trader))
+        self.pnl[self.ticks - self.chunk] = [profits[symbol] + balance[symbol] for symbol in self.symbols]
+        self.ticks += 1
+        if self.ticks - self.chunk == CHUNK_TICKS:
+            self._write_chunk()
+
+    def _write_chunk(self):
+        write_activity_rows(self.activities, self.round, self.day, self.day_data, self.symbols, self.pnl[:self.ticks - self.chunk], self.chunk)
+        # the last row stays for print_final_profits
+        self.pnl[0] = self.pnl[self.ticks - self.chunk - 1]
+        self.chunk = self.ticks
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.sandbox is not self.f:
+            write_log_header(self.f, self.run_stats)
+            self.f.write('\n')
+            self.sandbox.seek(0)
+            shutil.copyfileobj(self.sandbox, self.f, LOG_BUFFER_SIZE)
+            self.sandbox.close()
+        if exc_type is None:
+            if self.ticks > self.chunk:
+                self._write_chunk()
+            write_activities_header(self.f)
+            self.activities.seek(0)
+            shutil.copyfileobj(self.activities, self.f, LOG_BUFFER_SIZE)
+            print_final_profits(self.round, self.day_data, self.symbols, self.pnl[0], self.ticks - 1)
+        self.activities.close()
+        self.f.close()
+        if exc_type is None:
+            print(f"\nSimulation on round {self.round} day {self.day} for time {self.max_time} complete")
 
 
 # Adjust accordingly the round and day to your needs
-if __name__ == "__main__":
-    trader = Trader()
+def main(argv: list[str] | None = None):
+    from matching import MATCHING_MODES
+    from risk import STOP_RULES, parse_stop_rule
+
+    parser = argparse.ArgumentParser(description='Backtest a trader on training days without any prompts.')
+    parser.add_argument('--trader', default=DEFAULT_TRADER, help='path/to/module.py:Class or module:Class (default: %(default)s)')
+    parser.add_argument('--rounds', type=int, nargs='+', required=True, help='rounds to run')
+    parser.add_argument('--days', type=int, nargs='+', help='days to run (default: all of the rounds with training data)')
+    parser.add_argument('--names', type=yes_no, default=True, help='with bot names y/n (default: y)')
+    parser.add_argument('--matching', choices=MATCHING_MODES, default=MATCH_EXACT, help='matching mode (default: %(default)s)')
+    parser.add_argument('--trade-share', type=float, default=TRADE_SHARE, help='share of crossing market trades with --matching trades (default: %(default)s)')
+    parser.add_argument('--time-limit', type=int, default=999900, help='last timestamp of every day (default: %(default)s)')
+    parser.add_argument('--start-time', type=int, default=0, help='resume from the latest checkpoint at or before this timestamp')
+    parser.add_argument('--checkpoint-every', type=int, help='write a checkpoint every that many timestamps')
+    parser.add_argument('--features', action='store_true', help='put the default FeatureSet into state.features')
+    parser.add_argument('--streaming', action='store_true', help='keep only a few states in memory')
+    parser.add_argument('--no-log', action='store_true', help="don't write log files")
+    parser.add_argument('--compress-logs', action='store_true', help='write the log files gzipped')
+    parser.add_argument('--out', help='write the final pnl of every day to this csv file')
+    parser.add_argument('--db', help='add every run to this results store (see results_store.py)')
+    parser.add_argument('--stop', type=parse_stop_rule, action='append', default=[], help=f'name=value, stops a day early when broken, name is one of {", ".join(STOP_RULES)}')
+    args = parser.parse_args(argv)
+
+    trader_class = load_trader_class(args.trader)
+    days = [(round, day) for round, day in available_days() if round in args.rounds and (args.days is None or day in args.days)]
+    if not days:
+        parser.error('no training data for these rounds/days')
+    store = None
+    if args.db:
+        from results_store import ResultsStore, sandbox_logs, trader_identity
+        store = ResultsStore(args.db)
+    rows = []
+    for round, day in days:
+        print(f"Running simulation on round {round} day {day} for time {args.time_limit}")
+        trader = trader_class()
+        series = RunSeries() if store is not None else None
+        risk = RiskMetrics(dict(args.stop))
+        start = time.perf_counter()
+        pnl = simulate_alternative(
+            round, day, trader, args.time_limit, args.names,
+            streaming=args.streaming,
+            write_log=not args.no_log,
+            matching=args.matching,
+            compress_log=args.compress_logs,
+            checkpoint_every=args.checkpoint_every,
+            start_time=args.start_time,
+            trade_share=args.trade_share,
+            features=FeatureSet() if args.features else None,
+            series=series,
+            risk=risk,
+        )
+        metrics = risk.summary()
+        if store is not None:
+            store.add_run(
+                round, day, pnl, trader_identity(trader), { 'trade_share': args.trade_share, 'features': args.features },
+                args.names, args.matching, args.time_limit, time.perf_counter() - start, series, sandbox_logs(trader, series), metrics['stopped'])
+        rows.append({ 'round': round, 'day': day, **pnl, 'total': sum(pnl.values()), **metrics })
+        print(f'Round {round} day {day}: pnl {rows[-1]["total"]}, ' + ', '.join(f'{name} {value}' for name, value in metrics.items() if value is not None))
+    if args.out:
+        fields = ['round', 'day'] + [symbol for symbol in ALL_SYMBOLS if any(symbol in row for row in rows)] + ['total'] + list(RiskMetrics().summary())
+        with open(args.out, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fields)
+            writer.writeheader()
+            writer.writerows(rows)
+    if store is not None:
+        store.close()
+
+
+# Asks for the parameters of a single run, see main for the command line
+def interactive():
+    trader = load_trader_class(DEFAULT_TRADER)()
     max_time = int(input("Max timestamp (1-9)->(1-9)(00_000) or exact number): ") or 999000)
     if max_time < 10:
         max_time *= 100000
@@ -528,6 +654,14 @@ if __name__ == "__main__":
     halfway = False 
     if 'y' in halfway_in:
         halfway = True
+    start_time = int(input("Start timestamp, resumes from the latest checkpoint before it (blank for 0): ") or 0)
     print(f"Running simulation on round {round} day {day} for time {max_time}")
-    print("Remember to change the trader import")
-    simulate_alternative(round, day, trader, max_time, names, halfway, False)
+    print("Remember to change DEFAULT_TRADER or use --trader")
+    simulate_alternative(round, day, trader, max_time, names, halfway, False, checkpoint_every=CHECKPOINT_EVERY, start_time=start_time)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        main()
+    else:
+        interactive()
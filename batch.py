@@ -0,0 +1,154 @@
+from backtester import TRAINING_DATA_PREFIX, Trader, available_days, simulate_alternative, yes_no
+from instrumentation import RunStats
+from matching import MATCHING_MODES
+from trader_process import TraderProcess
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Callable
+import pandas as pd
+import argparse
+import contextlib
+import functools
+import itertools
+import os
+import time
+
+
+class BatchJob:
+    def __init__(self, round: int, day: int, names=True, halfway=False, time_limit=999900, matching: str | None = None) -> None:
+        self.round = round
+        self.day = day
+        self.names = names
+        self.halfway = halfway
+        self.time_limit = time_limit
+        self.matching = matching
+
+    def __repr__(self) -> str:
+        return f'BatchJob(round={self.round}, day={self.day}, names={self.names}, halfway={self.halfway}, time_limit={self.time_limit}, matching={self.matching})'
+
+
+def job_matrix(
+        rounds: list[int] | None = None,
+        days: list[int] | None = None,
+        names: list[bool] = [True],
+        halfway: list[bool] = [False],
+        time_limits: list[int] = [999900],
+        matching: list[str | None] = [None],
+    ) -> list[BatchJob]:
+    # only combinations that have a prices file become jobs
+    jobs = []
+    for (round, day), n, h, t, m in itertools.product(available_days(), names, halfway, time_limits, matching):
+        if rounds is not None and round not in rounds:
+            continue
+        if days is not None and day not in days:
+            continue
+        jobs.append(BatchJob(round, day, n, h, t, m))
+    return jobs
+
+
+# Trader worker processes of the current batch worker, reused by its jobs
+_trader_processes: dict[Any, TraderProcess] = {}
+
+def _isolated_trader(trader_factory: Callable[[], Any]) -> TraderProcess:
+    trader = _trader_processes.get(trader_factory)
+    if trader is None:
+        trader = _trader_processes[trader_factory] = TraderProcess(trader_factory)
+        trader.start()
+    else:
+        trader.reset()
+    return trader
+
+
+# isolated runs the trader in a TraderProcess with the limits of the platform
+def run_job(job: BatchJob, trader_factory: Callable[[], Any], quiet=True, compress_log=False, isolated=False) -> dict[str, Any]:
+    run_stats = RunStats()
+    trader = run_stats.create(functools.partial(_isolated_trader, trader_factory) if isolated else trader_factory)
+    start = time.perf_counter()
+    with open(os.devnull, 'w') as devnull:
+        with contextlib.redirect_stdout(devnull) if quiet else contextlib.nullcontext():
+            pnl = simulate_alternative(job.round, job.day, trader, job.time_limit, job.names, job.halfway, matching=job.matching, compress_log=compress_log, run_stats=run_stats)
+    latency = run_stats.percentiles()
+    return {
+        'round': job.round,
+        'day': job.day,
+        'names': job.names,
+        'halfway': job.halfway,
+        'time_limit': job.time_limit,
+        'matching': job.matching,
+        'seconds': time.perf_counter() - start,
+        'run_p99_ms': latency.get('p99'),
+        'run_max_ms': latency.get('max'),
+        'over_budget': len(run_stats.over_budget),
+        'pnl': pnl,
+    }
+
+
+# Runs every job in its own worker process with a fresh trader from trader_factory.
+# trader_factory has to be picklable, e.g. the Trader class itself.
+def run_batch(jobs: list[BatchJob], trader_factory: Callable[[], Any] = Trader, max_workers: int | None = None, quiet=True, compress_log=False, isolated=False) -> list[dict[str, Any]]:
+    results = []
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = { executor.submit(run_job, job, trader_factory, quiet, compress_log, isolated): job for job in jobs }
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                results.append(future.result())
+            except Exception as e:
+                print(f'{job} failed: {e!r}')
+                results.append({
+                    'round': job.round,
+                    'day': job.day,
+                    'names': job.names,
+                    'halfway': job.halfway,
+                    'time_limit': job.time_limit,
+                    'matching': job.matching,
+                    'error': repr(e),
+                    'pnl': {},
+                })
+    return results
+
+
+# One row per job, one column per symbol plus the total
+def summary_table(results: list[dict[str, Any]]) -> pd.DataFrame:
+    rows = []
+    for result in results:
+        row = { key: value for key, value in result.items() if key != 'pnl' }
+        row.update(result['pnl'])
+        row['total'] = sum(result['pnl'].values())
+        rows.append(row)
+    df = pd.DataFrame(rows)
+    if len(df) == 0:
+        return df
+    total = df.pop('total')
+    df['total'] = total
+    return df.sort_values(['round', 'day', 'names', 'halfway', 'time_limit']).reset_index(drop=True)
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description='Run the backtester on many rounds/days in parallel.')
+    parser.add_argument('--rounds', type=int, nargs='+', help='rounds to run (default: all with training data)')
+    parser.add_argument('--days', type=int, nargs='+', help='days to run (default: all with training data)')
+    parser.add_argument('--names', type=yes_no, nargs='+', default=[True], help='with bot names y/n (default: y)')
+    parser.add_argument('--halfway', type=yes_no, nargs='+', default=[False], help='match orders halfway y/n (default: n)')
+    parser.add_argument('--time-limit', type=int, nargs='+', default=[999900], help='max timestamps (default: 999900)')
+    parser.add_argument('--matching', choices=MATCHING_MODES, nargs='+', default=[None], help='matching modes, override --halfway')
+    parser.add_argument('--workers', type=int, help='worker processes (default: number of cores)')
+    parser.add_argument('--out', help='write the summary table as csv to this path')
+    parser.add_argument('--verbose', action='store_true', help='show the output of the simulations')
+    parser.add_argument('--compress-logs', action='store_true', help='write the log files gzipped')
+    parser.add_argument('--isolated', action='store_true', help='run the trader in a worker process with the time and memory limits of the platform')
+    args = parser.parse_args(argv)
+
+    jobs = job_matrix(args.rounds, args.days, args.names, args.halfway, args.time_limit, args.matching)
+    if len(jobs) == 0:
+        print(f'No training data found in {TRAINING_DATA_PREFIX} for these rounds/days')
+        return
+    print(f'Running {len(jobs)} jobs')
+    results = run_batch(jobs, Trader, args.workers, not args.verbose, args.compress_logs, args.isolated)
+    summary = summary_table(results)
+    print(summary.to_string())
+    if args.out:
+        summary.to_csv(args.out, index=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+from backtester import (
+    SYMBOLS_BY_ROUND_POSITIONABLE, available_days, clear_order_book, create_log_file, current_limits, day_file_paths,
+    load_day_data, monkey_positions, process_prices, process_trades, trades_position_pnl_run,
+)
+from datamodel import Order, TradingState
+from ledger import Ledger
+from market_data import read_prices_csv, read_trades_csv
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable
+import multiprocessing
+import pandas as pd
+import argparse
+import contextlib
+import json
+import os
+import platform
+import resource
+import sys
+import time
+
+BENCH_ROUNDS = [1, 2, 3, 4]
+# fail when ticks/s drops or peak RSS grows by more than this fraction
+REGRESSION_THRESHOLD = 0.2
+
+
+class NoopTrader:
+    def run(self, state: TradingState) -> dict[str, list[Order]]:
+        return {}
+
+
+class BusyTrader:
+    """
+    Trades every symbol on every tick: buys at the best ask until the
+    position limit is reached, then sells at the best bid back to zero.
+    Keeps matching, the ledger and the log busy.
+    """
+
+    def run(self, state: TradingState) -> dict[str, list[Order]]:
+        orders = {}
+        for symbol, depth in state.order_depths.items():
+            if symbol not in current_limits or not depth.buy_orders or not depth.sell_orders:
+                continue
+            position = state.position.get(symbol, 0)
+            limit = current_limits[symbol]
+            if position < limit:
+                orders[symbol] = [Order(symbol, min(depth.sell_orders), min(5, limit - position))]
+            else:
+                orders[symbol] = [Order(symbol, max(depth.buy_orders), -position)]
+        return orders
+
+
+TRADERS: dict[str, Callable[[], Any]] = { 'noop': NoopTrader, 'busy': BusyTrader }
+
+
+# Every stage returns (ticks, seconds), only the work of the stage itself is timed
+def stage_load(round: int, day: int, trader) -> tuple[int, float]:
+    prices_path, trades_path = day_file_paths(round, day)
+    start = time.perf_counter()
+    states = process_prices(read_prices_csv(prices_path), round, 999900)
+    states = process_trades(read_trades_csv(trades_path), states, 999900)
+    for state in states.values():
+        pass
+    return len(states), time.perf_counter() - start
+
+
+def stage_matching(round: int, day: int, trader) -> tuple[int, float]:
+    states = load_day_data(round, day).states()
+    orders = { timestamp: trader.run(state) for timestamp, state in states.items() }
+    start = time.perf_counter()
+    for timestamp, state in states.items():
+        clear_order_book(orders[timestamp], state.order_depths, timestamp, False)
+    return len(states), time.perf_counter() - start
+
+
+def _run_day(round: int, day: int, trader) -> tuple[Any, Ledger, float]:
+    day_data = load_day_data(round, day)
+    states = day_data.states()
+    ledger = Ledger(list(states[0].position.keys()), day_data.timestamps)
+    mid_index = day_data.mid_index()
+    start = time.perf_counter()
+    trades_position_pnl_run(states, int(day_data.timestamps[-1]), ledger, mid_index, trader, round, 'exact')
+    return day_data, ledger, time.perf_counter() - start
+
+
+def stage_pnl(round: int, day: int, trader) -> tuple[int, float]:
+    # the whole engine loop: Trader.run, matching and the ledger
+    day_data, _, seconds = _run_day(round, day, trader)
+    return len(day_data), seconds
+
+
+def stage_monkeys(round: int, day: int, trader) -> tuple[int, float]:
+    day_data = load_day_data(round, day)
+    names = [name for name in day_data.names if name != 'nan']
+    day_data.mid_index()
+    start = time.perf_counter()
+    monkey_positions(names, day_data, round, SYMBOLS_BY_ROUND_POSITIONABLE[round])
+    return len(day_data), time.perf_counter() - start
+
+
+def stage_log(round: int, day: int, trader) -> tuple[int, float]:
+    day_data, ledger, _ = _run_day(round, day, trader)
+    start = time.perf_counter()
+    log_path = create_log_file(round, day, day_data, ledger, trader)
+    seconds = time.perf_counter() - start
+    os.remove(log_path)
+    return len(day_data), seconds
+
+
+# stage -> (function, depends on the trader)
+STAGES: dict[str, tuple[Callable[[int, int, Any], tuple[int, float]], bool]] = {
+    'load': (stage_load, False),
+    'matching': (stage_matching, True),
+    'pnl': (stage_pnl, True),
+    'monkeys': (stage_monkeys, False),
+    'log': (stage_log, True),
+}
+
+
+def run_stage(stage: str, round: int, day: int, trader_name: str | None, repeat: int) -> dict[str, Any]:
+    # runs in a fresh process, so the peak RSS belongs to this stage alone
+    function, _ = STAGES[stage]
+    best = float('inf')
+    ticks = 0
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for _ in range(repeat):
+            trader = TRADERS[trader_name]() if trader_name is not None else None
+            ticks, seconds = function(round, day, trader)
+            best = min(best, seconds)
+    return {
+        'stage': stage,
+        'round': round,
+        'day': day,
+        'trader': trader_name or '-',
+        'ticks': ticks,
+        'seconds': best,
+        'ticks_per_second': ticks / best if best > 0 else float('inf'),
+        # ru_maxrss is in KB on linux
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def bench_jobs(stages: list[str], days: list[tuple[int, int]], traders: list[str]) -> list[tuple[str, int, int, str | None]]:
+    jobs = []
+    for round, day in days:
+        for stage in stages:
+            if STAGES[stage][1]:
+                jobs.extend((stage, round, day, trader) for trader in traders)
+            else:
+                jobs.append((stage, round, day, None))
+    return jobs
+
+
+def run_benchmarks(jobs: list[tuple[str, int, int, str | None]], repeat=3) -> list[dict[str, Any]]:
+    # one job at a time so they don't compete for cores, every job in a new process
+    results = []
+    context = multiprocessing.get_context('spawn')
+    for job in jobs:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            result = executor.submit(run_stage, *job, repeat).result()
+        print(f"{result['stage']:>8} round {result['round']} day {result['day']:>2} {result['trader']:>4}: "
+              f"{result['ticks_per_second']:>12.0f} ticks/s {result['peak_rss_mb']:>7.1f} MB")
+        results.append(result)
+    return results
+
+
+def result_key(result: dict[str, Any]) -> str:
+    return f"{result['stage']}/{result['round']}/{result['day']}/{result['trader']}"
+
+
+def compare(results: list[dict[str, Any]], baseline: list[dict[str, Any]], threshold=REGRESSION_THRESHOLD) -> pd.DataFrame:
+    """
+    One row per result with its change against the baseline, `regressed`
+    is set when ticks/s fell or the peak RSS grew by more than threshold.
+    """
+    previous = { result_key(result): result for result in baseline }
+    rows = []
+    for result in results:
+        row = { key: result[key] for key in ['stage', 'round', 'day', 'trader', 'ticks_per_second', 'peak_rss_mb'] }
+        old = previous.get(result_key(result))
+        if old is None:
+            row.update({ 'speed_change': None, 'rss_change': None, 'regressed': False })
+        else:
+            row['speed_change'] = result['ticks_per_second'] / old['ticks_per_second'] - 1
+            row['rss_change'] = result['peak_rss_mb'] / old['peak_rss_mb'] - 1
+            row['regressed'] = row['speed_change'] < -threshold or row['rss_change'] > threshold
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description='Benchmark the stages of the backtester on the training data.')
+    parser.add_argument('--rounds', type=int, nargs='+', default=BENCH_ROUNDS, help=f'rounds to run (default: {BENCH_ROUNDS})')
+    parser.add_argument('--days', type=int, nargs='+', help='days to run (default: all with training data)')
+    parser.add_argument('--stages', choices=list(STAGES), nargs='+', default=list(STAGES), help='stages to run (default: all)')
+    parser.add_argument('--traders', choices=list(TRADERS), nargs='+', default=list(TRADERS), help='traders to run (default: all)')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per stage, the fastest counts (default: 3)')
+    parser.add_argument('--out', default='bench_results.json', help='write the results as json to this path (default: bench_results.json)')
+    parser.add_argument('--baseline', help='compare against the results in this json file, exit with 1 on a regression')
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD, help=f'allowed regression as fraction (default: {REGRESSION_THRESHOLD})')
+    args = parser.parse_args(argv)
+
+    days = [
+        (round, day) for round, day in available_days()
+        if round in args.rounds and (args.days is None or day in args.days)
+    ]
+    jobs = bench_jobs(args.stages, days, args.traders)
+    print(f'Running {len(jobs)} benchmarks')
+    results = run_benchmarks(jobs, args.repeat)
+    with open(args.out, 'w') as f:
+        json.dump({ 'python': platform.python_version(), 'machine': platform.machine(), 'results': results }, f, indent=2)
+    print(f'Results written to {args.out}')
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+        table = compare(results, baseline, args.threshold)
+        print(table.to_string())
+        regressed = table[table['regressed']]
+        if len(regressed) > 0:
+            print(f'{len(regressed)} stages regressed by more than {args.threshold:.0%}')
+            sys.exit(1)
+        print('No regressions')
+
+
+if __name__ == "__main__":
+    main()
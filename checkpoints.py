@@ -0,0 +1,81 @@
+from datamodel import TradingState
+from ledger import Ledger
+from typing import Any
+import os
+import pickle
+
+# Checkpoints of every simulated day go into their own directory here
+CHECKPOINT_PREFIX = "./checkpoints"
+# Bump when the content of a checkpoint changes
+CHECKPOINT_VERSION = 1
+
+
+class Checkpoints:
+    """
+    Checkpoints of one simulated day, written every `every` timestamps
+    before the trader runs. A checkpoint holds everything the engine needs
+    to continue from that tick: the position, the own trades of the
+    previous tick, the ledger values and the pickled trader with its logger.
+
+    Days with other names/matching settings get their own directory. A
+    checkpoint doesn't know which trader code wrote it, resuming with
+    changed code is the point (as long as the pickle still loads).
+    """
+
+    def __init__(self, round: int, day: int, names: bool, matching: str, every: int | None = None, prefix=CHECKPOINT_PREFIX):
+        self.every = every
+        self.directory = os.path.join(prefix, f'round_{round}_day_{day}_{"wn" if names else "nn"}_{matching}')
+
+    def path(self, time: int) -> str:
+        return os.path.join(self.directory, f'{time}.pkl')
+
+    def times(self) -> list[int]:
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(int(file_name[:-len('.pkl')]) for file_name in os.listdir(self.directory) if file_name.endswith('.pkl'))
+
+    def save(self, i: int, time: int, state: TradingState, ledger: Ledger, trader):
+        # the tick a run resumed at already has its checkpoint
+        if self.every is None or time % self.every != 0 or (i == ledger.first and i > 0):
+            return
+        checkpoint = {
+            'version': CHECKPOINT_VERSION,
+            'time': time,
+            'index': i,
+            'position': dict(state.position),
+            'own_trades': state.own_trades,
+            'ledger': ledger.snapshot(i),
+            # the logger is usually a class attribute, it wouldn't be pickled with the trader
+            'trader': (trader, getattr(trader, 'logger', None)),
+        }
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(time)
+        with open(path + '.tmp', 'wb') as f:
+            pickle.dump(checkpoint, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path + '.tmp', path)
+
+    def load(self, start_time: int) -> dict[str, Any] | None:
+        # the latest checkpoint at or before start_time
+        times = [time for time in self.times() if time <= start_time]
+        if not times:
+            return None
+        with open(self.path(times[-1]), 'rb') as f:
+            checkpoint = pickle.load(f)
+        if checkpoint.get('version') != CHECKPOINT_VERSION:
+            return None
+        return checkpoint
+
+
+def resume(checkpoint: dict[str, Any], states, ledger: Ledger):
+    """
+    Puts the engine state of the checkpoint into states and ledger and
+    returns the restored trader, the run continues at checkpoint['index'].
+    """
+    state = states[checkpoint['time']]
+    state.position = dict(checkpoint['position'])
+    state.own_trades = checkpoint['own_trades']
+    ledger.restore(checkpoint['index'], checkpoint['ledger'])
+    trader, logger = checkpoint['trader']
+    if logger is not None:
+        trader.logger = logger
+    return trader
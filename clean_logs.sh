@@ -1 +1 @@
-rm logs/*.log
+rm -f logs/*.log logs/*.log.gz
@@ -9,13 +9,27 @@ Position = int
 UserId = str
 Observation = int
 
-class Listing:
+class _Fields:
+    # __slots__ keep the many small objects of a day compact, __dict__
+    # still lists their fields for ProsperityEncoder, vars() and toJSON
+    __slots__ = ()
+    _fields: tuple[str, ...] = ()
+
+    @property
+    def __dict__(self):
+        return { name: getattr(self, name) for name in self._fields }
+
+class Listing(_Fields):
+    __slots__ = _fields = ('symbol', 'product', 'denomination')
+
     def __init__(self, symbol: Symbol, product: Product, denomination: Product):
         self.symbol = symbol
         self.product = product
         self.denomination = denomination
 
-class Order:
+class Order(_Fields):
+    __slots__ = _fields = ('symbol', 'price', 'quantity')
+
     def __init__(self, symbol: Symbol, price: int, quantity: int) -> None:
         self.symbol = symbol
         self.price = price
@@ -28,12 +42,16 @@ class Order:
         return "(" + self.symbol + ", " + str(self.price) + ", " + str(self.quantity) + ")"
     
 
-class OrderDepth:
+class OrderDepth(_Fields):
+    __slots__ = _fields = ('buy_orders', 'sell_orders')
+
     def __init__(self):
         self.buy_orders: Dict[int, int] = {}
         self.sell_orders: Dict[int, int] = {}
 
-class Trade:
+class Trade(_Fields):
+    __slots__ = _fields = ('symbol', 'price', 'quantity', 'buyer', 'seller', 'timestamp')
+
     def __init__(self, symbol: Symbol, price: int, quantity: int, buyer: UserId = None, seller: UserId = None, timestamp: int = 0) -> None:
         self.symbol = symbol
         self.price: int = price
@@ -42,7 +60,11 @@ class Trade:
         self.seller = seller
         self.timestamp = timestamp
 
-class TradingState(object):
+class TradingState(_Fields):
+    _fields = ('timestamp', 'listings', 'order_depths', 'own_trades', 'market_trades', 'position', 'observations')
+    # features (see features.py) only exist in the backtester, they aren't a field of the platform state
+    __slots__ = _fields + ('features',)
+
     def __init__(self,
                  timestamp: Time,
                  listings: Dict[Symbol, Listing],
@@ -58,6 +80,7 @@ class TradingState(object):
         self.market_trades = market_trades
         self.position = position
         self.observations = observations
+        self.features = None
         
     def toJSON(self):
         return json.dumps(self, default=lambda o: o.__dict__, sort_keys=True)
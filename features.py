@@ -0,0 +1,216 @@
+from datamodel import TradingState
+from market_data import DayData
+from collections import deque
+import itertools
+import numpy as np
+
+# Per symbol: best_bid, best_ask, mid, spread (ask - bid), imbalance
+# ((bid volume - ask volume) / total volume over all levels), vwap_<n>
+# (market trades of the last n ticks) and ema_<n> (of the mid, span n)
+DEFAULT_FEATURES = ['best_bid', 'best_ask', 'mid', 'spread', 'imbalance', 'vwap_20', 'ema_10', 'ema_50']
+# Weighted sums of mids, positive legs minus their fair value in the others
+DEFAULT_SPREADS = {
+    'PINA_COLADAS/COCONUTS': { 'PINA_COLADAS': 1.0, 'COCONUTS': -15 / 8 },
+    'PICNIC_BASKET/components': { 'PICNIC_BASKET': 1.0, 'BAGUETTE': -2.0, 'DIP': -4.0, 'UKULELE': -1.0 },
+}
+NAN = float('nan')
+
+
+class FeatureSet:
+    """
+    The features every state gets in `state.features`, as
+    `{symbol: {name: value}}` plus `{spread name: {'spread': value}}`.
+    Only values up to the tick itself are used, NaN where there is none
+    (e.g. an empty side of the book or no trades in the window yet).
+    Spreads are only computed if all their symbols are traded that day.
+    """
+
+    def __init__(self, features: list[str] = DEFAULT_FEATURES, spreads: dict[str, dict[str, float]] = DEFAULT_SPREADS):
+        for name in features:
+            if name not in ['best_bid', 'best_ask', 'mid', 'spread', 'imbalance'] and _window(name) is None:
+                raise ValueError(f'Unknown feature {name}')
+        self.features = features
+        self.spreads = spreads
+
+    def columns(self, symbols: list[str]) -> list[tuple[str, str]]:
+        columns = [(symbol, name) for symbol in symbols for name in self.features]
+        for spread, legs in self.spreads.items():
+            if all(symbol in symbols for symbol in legs):
+                columns.append((spread, 'spread'))
+        return columns
+
+    def table(self, day_data: DayData) -> 'FeatureTable':
+        return FeatureTable(self, day_data)
+
+    def incremental(self, day_data: DayData) -> 'IncrementalFeatures':
+        return IncrementalFeatures(self, day_data.symbols)
+
+
+def _window(name: str) -> int | None:
+    prefix, _, window = name.rpartition('_')
+    if prefix in ['vwap', 'ema'] and window.isdigit() and int(window) > 0:
+        return int(window)
+    return None
+
+
+def _ema_step(alpha: float):
+    # NaN mids keep the last value, the first mid starts the average.
+    # Both implementations use this function, so their values are identical.
+    def step(ema: float, mid: float) -> float:
+        if mid != mid:
+            return ema
+        if ema != ema:
+            return mid
+        return ema + alpha * (mid - ema)
+    return step
+
+
+def _rows(columns: list[tuple[str, str]], values: list[float]) -> dict[str, dict[str, float]]:
+    row: dict[str, dict[str, float]] = {}
+    for (group, name), value in zip(columns, values):
+        if group not in row:
+            row[group] = {}
+        row[group][name] = value
+    return row
+
+
+class FeatureTable:
+    """
+    All features of a day, computed once from the columnar arrays.
+    row(i, state) is the row of tick i, state is not used.
+    """
+
+    def __init__(self, feature_set: FeatureSet, day_data: DayData):
+        n = len(day_data)
+        symbols = day_data.symbols
+        self.columns = feature_set.columns(symbols)
+        mid_index = day_data.mid_index()
+
+        rows = int(day_data.row_start[-1])
+        tick_of_row = np.repeat(np.arange(n), np.diff(day_data.row_start))
+        bid_volumes = np.zeros((n, len(symbols)))
+        ask_volumes = np.zeros((n, len(symbols)))
+        bid_volumes[tick_of_row, day_data.row_symbol[:rows]] = np.where(day_data.bid_prices[:rows] > 0, day_data.bid_volumes[:rows], 0).sum(axis=1)
+        ask_volumes[tick_of_row, day_data.row_symbol[:rows]] = np.where(day_data.ask_prices[:rows] > 0, day_data.ask_volumes[:rows], 0).sum(axis=1)
+
+        # value and volume of the market trades per tick, integer sums are exact
+        trades = int(day_data.trade_start[-1])
+        tick_of_trade = np.repeat(np.arange(n), np.diff(day_data.trade_start))
+        flat = tick_of_trade * len(symbols) + day_data.trade_symbol[:trades]
+        quantity = day_data.trade_quantity[:trades].astype(np.float64)
+        shape = (n, len(symbols))
+        trade_value = np.bincount(flat, day_data.trade_price[:trades] * quantity, n * len(symbols)).reshape(shape)
+        trade_volume = np.bincount(flat, quantity, n * len(symbols)).reshape(shape)
+        cumulative_value = np.vstack([np.zeros(len(symbols)), np.cumsum(trade_value, axis=0)])
+        cumulative_volume = np.vstack([np.zeros(len(symbols)), np.cumsum(trade_volume, axis=0)])
+
+        values = {}
+        for name in feature_set.features:
+            if name == 'best_bid':
+                values[name] = mid_index.best_bid
+            elif name == 'best_ask':
+                values[name] = mid_index.best_ask
+            elif name == 'mid':
+                values[name] = mid_index.mid
+            elif name == 'spread':
+                values[name] = mid_index.best_ask - mid_index.best_bid
+            elif name == 'imbalance':
+                with np.errstate(invalid='ignore'):
+                    values[name] = (bid_volumes - ask_volumes) / (bid_volumes + ask_volumes)
+            elif name.startswith('vwap_'):
+                start = np.maximum(np.arange(1, n + 1) - _window(name), 0)
+                value = cumulative_value[1:] - cumulative_value[start]
+                volume = cumulative_volume[1:] - cumulative_volume[start]
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    values[name] = np.where(volume > 0, value / volume, np.nan)
+            else:
+                # every value depends on the one before, so the ticks are
+                # gone through in turn, one column of plain floats at a time
+                step = _ema_step(2 / (_window(name) + 1))
+                values[name] = np.empty((n, len(symbols)))
+                for column, mids in enumerate(mid_index.mid.T.tolist()):
+                    values[name][:, column] = list(itertools.accumulate(mids, step, initial=NAN))[1:]
+
+        self.values = np.empty((n, len(self.columns)))
+        for k, (group, name) in enumerate(self.columns):
+            if group in feature_set.spreads:
+                spread = np.zeros(n)
+                for symbol, weight in feature_set.spreads[group].items():
+                    spread = spread + weight * mid_index.mid[:, mid_index.column[symbol]]
+                self.values[:, k] = spread
+            else:
+                self.values[:, k] = values[name][:, mid_index.column[group]]
+
+    def row(self, i: int, state: TradingState) -> dict[str, dict[str, float]]:
+        return _rows(self.columns, self.values[i].tolist())
+
+
+class IncrementalFeatures:
+    """
+    The same values as FeatureTable, updated from every state in turn with
+    O(1) work per tick (streaming mode). row has to be called for every tick
+    in order.
+    """
+
+    def __init__(self, feature_set: FeatureSet, symbols: list[str]):
+        self.feature_set = feature_set
+        self.columns = feature_set.columns(symbols)
+        self.windows = { name: _window(name) for name in feature_set.features if name.startswith('vwap_') }
+        self.steps = { name: _ema_step(2 / (_window(name) + 1)) for name in feature_set.features if name.startswith('ema_') }
+        self.trades = { symbol: deque() for symbol in symbols }
+        self.sums = { (symbol, name): [0.0, 0.0] for symbol in symbols for name in self.windows }
+        self.emas = { (symbol, name): NAN for symbol in symbols for name in self.steps }
+        self.longest = max(self.windows.values(), default=0)
+
+    def row(self, i: int, state: TradingState) -> dict[str, dict[str, float]]:
+        book: dict[str, dict[str, float]] = {}
+        for symbol in {group for group, _ in self.columns if group not in self.feature_set.spreads}:
+            depth = state.order_depths.get(symbol)
+            best_bid = float(max(depth.buy_orders)) if depth is not None and depth.buy_orders else NAN
+            best_ask = float(min(depth.sell_orders)) if depth is not None and depth.sell_orders else NAN
+            bid_volume = float(sum(depth.buy_orders.values())) if depth is not None else 0.0
+            ask_volume = -float(sum(depth.sell_orders.values())) if depth is not None else 0.0
+            mid = (best_bid + best_ask) / 2
+            total = bid_volume + ask_volume
+            book[symbol] = {
+                'best_bid': best_bid,
+                'best_ask': best_ask,
+                'mid': mid,
+                'spread': best_ask - best_bid,
+                'imbalance': (bid_volume - ask_volume) / total if total != 0 else NAN,
+            }
+            self._add_trades(symbol, state.market_trades.get(symbol, []))
+            for name, window in self.windows.items():
+                value, volume = self.sums[(symbol, name)]
+                book[symbol][name] = value / volume if volume > 0 else NAN
+            for name, step in self.steps.items():
+                self.emas[(symbol, name)] = step(self.emas[(symbol, name)], mid)
+                book[symbol][name] = self.emas[(symbol, name)]
+
+        values = []
+        for group, name in self.columns:
+            if group in self.feature_set.spreads:
+                spread = 0.0
+                for symbol, weight in self.feature_set.spreads[group].items():
+                    spread = spread + weight * book[symbol]['mid']
+                values.append(spread)
+            else:
+                values.append(book[group][name])
+        return _rows(self.columns, values)
+
+    def _add_trades(self, symbol: str, trades: list):
+        # value and volume of this tick, the sums of every window drop the tick that fell out of it
+        value = float(sum(trade.price * trade.quantity for trade in trades))
+        volume = float(sum(trade.quantity for trade in trades))
+        ticks = self.trades[symbol]
+        ticks.append((value, volume))
+        for name, window in self.windows.items():
+            sums = self.sums[(symbol, name)]
+            sums[0] += value
+            sums[1] += volume
+            if len(ticks) > window:
+                old_value, old_volume = ticks[-window - 1]
+                sums[0] -= old_value
+                sums[1] -= old_volume
+        if len(ticks) > self.longest:
+            ticks.popleft()
@@ -0,0 +1,141 @@
+import cProfile
+import heapq
+import math
+import pstats
+import time
+import tracemalloc
+from typing import Any, Callable
+import numpy as np
+
+# Time a single Trader.run may take before the platform kills it
+RUN_BUDGET_MS = 900.0
+
+
+class RunStats:
+    """
+    Measures every Trader.run call of one simulation, pass it as
+    simulate_alternative(..., run_stats=RunStats()) and read it afterwards.
+
+    * latency_ms: duration of every call
+    * memory_mb: peak memory allocated during every call (trace_memory=True)
+    * over_budget: indices of the calls that took longer than budget_ms
+    * init_ms: time it took to create the trader, if it was made by create
+
+    The REPORT line of the log gets the memory of the trader, not of the
+    backtester: the peak RSS of its worker process when it runs in a
+    TraderProcess, else the largest allocation of a call (trace_memory=True).
+    Values that weren't measured are left out of it.
+
+    profile_worst=k profiles every call and keeps the k slowest, dump_profile
+    writes them as one pstats file (snakeviz, flameprof, gprof2dot, ...).
+    Profiling slows down every call, compare latencies only without it.
+    """
+
+    def __init__(self, budget_ms: float = RUN_BUDGET_MS, trace_memory=False, profile_worst=0):
+        self.budget_ms = budget_ms
+        self.trace_memory = trace_memory
+        self.profile_worst = profile_worst
+        self.timestamps: list[int] = []
+        self.latency_ms: list[float] = []
+        self.memory_mb: list[float] = []
+        # (latency, tick, profile) of the slowest calls, smallest first
+        self.worst: list[tuple[float, int, cProfile.Profile]] = []
+        self.started_tracing = False
+        self.init_ms: float | None = None
+        self.worker_rss_mb: float | None = None
+
+    def create(self, trader_factory: Callable[[], Any]) -> Any:
+        start = time.perf_counter()
+        trader = trader_factory()
+        self.init_ms = (time.perf_counter() - start) * 1000
+        return trader
+
+    def start(self):
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started_tracing = True
+
+    def stop(self):
+        if self.started_tracing:
+            tracemalloc.stop()
+            self.started_tracing = False
+
+    def run(self, trader, state):
+        profile = cProfile.Profile() if self.profile_worst > 0 else None
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        if profile is not None:
+            profile.enable()
+        start = time.perf_counter()
+        orders = trader.run(state)
+        elapsed = (time.perf_counter() - start) * 1000
+        if profile is not None:
+            profile.disable()
+            entry = (elapsed, len(self.latency_ms), profile)
+            if len(self.worst) < self.profile_worst:
+                heapq.heappush(self.worst, entry)
+            elif elapsed > self.worst[0][0]:
+                heapq.heapreplace(self.worst, entry)
+        if self.trace_memory:
+            self.memory_mb.append((tracemalloc.get_traced_memory()[1] - base) / 1e6)
+        # TraderProcess keeps the peak RSS of its worker
+        self.worker_rss_mb = getattr(trader, 'peak_rss_mb', None)
+        self.timestamps.append(state.timestamp)
+        self.latency_ms.append(elapsed)
+        return orders
+
+    @property
+    def over_budget(self) -> list[int]:
+        return [i for i, latency in enumerate(self.latency_ms) if latency > self.budget_ms]
+
+    def percentiles(self) -> dict[str, float]:
+        if len(self.latency_ms) == 0:
+            return {}
+        p50, p95, p99 = np.percentile(self.latency_ms, [50, 95, 99]).tolist()
+        return { 'p50': p50, 'p95': p95, 'p99': p99, 'max': max(self.latency_ms) }
+
+    def max_memory_mb(self) -> float | None:
+        # of the trader, None if it wasn't measured
+        if self.worker_rss_mb is not None:
+            return self.worker_rss_mb
+        if self.memory_mb:
+            return max(self.memory_mb)
+        return None
+
+    def report_line(self, request_id: str) -> str:
+        # like the REPORT line of the platform, with the measured values
+        stats = self.percentiles()
+        duration = stats.get('max', 0.0)
+        fields = [f'REPORT RequestId: {request_id}', f'Duration: {duration:.2f} ms', f'Billed Duration: {math.ceil(duration)} ms', 'Memory Size: 128 MB']
+        memory_mb = self.max_memory_mb()
+        if memory_mb is not None:
+            fields.append(f'Max Memory Used: {math.ceil(memory_mb)} MB')
+        if self.init_ms is not None:
+            fields.append(f'Init Duration: {self.init_ms:.2f} ms')
+        return '\t'.join(fields) + '\n'
+
+    def summary(self) -> str:
+        stats = self.percentiles()
+        if not stats:
+            return 'Trader.run was not called'
+        worst = int(np.argmax(self.latency_ms))
+        lines = [
+            f"Trader.run latency over {len(self.latency_ms)} calls: p50 {stats['p50']:.3f} ms, p95 {stats['p95']:.3f} ms, "
+            f"p99 {stats['p99']:.3f} ms, max {stats['max']:.3f} ms at timestamp {self.timestamps[worst]}"
+        ]
+        if self.memory_mb:
+            lines.append(f'Trader.run peak memory: {max(self.memory_mb):.3f} MB')
+        over = self.over_budget
+        if over:
+            shown = ', '.join(f'{self.timestamps[i]} ({self.latency_ms[i]:.1f} ms)' for i in over[:10])
+            lines.append(f'{len(over)} calls over the budget of {self.budget_ms} ms: {shown}' + (' ...' if len(over) > 10 else ''))
+        return '\n'.join(lines)
+
+    def dump_profile(self, path: str):
+        if not self.worst:
+            return
+        stats = pstats.Stats(self.worst[0][2])
+        for _, _, profile in self.worst[1:]:
+            stats.add(profile)
+        stats.dump_stats(path)
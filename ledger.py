@@ -0,0 +1,178 @@
+from collections.abc import Iterator, Mapping
+from typing import Any
+import numpy as np
+
+
+class Ledger:
+    """
+    Per symbol PnL accounting of one simulated day in preallocated arrays,
+    one row per tick and one column per symbol. The four series have the
+    same meaning as before (see README):
+
+    * profits: realized pnl, updated when a position is closed
+    * balance: credit + unrealized
+    * credit: cash spent/received for the open position
+    * unrealized: value of the position at the mid price
+
+    positions holds the position every tick started with.
+    Without keep_history only two rows are kept (the finished tick and
+    the one being filled), so memory doesn't grow with the day.
+    With carry the day continues (sessions): the last tick isn't liquidated
+    and its trades are booked on one more row, the start of the next day.
+    """
+
+    def __init__(self, symbols: list[str], timestamps: np.ndarray, keep_history=True, carry=False):
+        self.symbols = symbols
+        self.timestamps = timestamps
+        self.keep_history = keep_history
+        rows = len(timestamps) + carry if keep_history else 2
+        shape = (rows, len(symbols))
+        self.profits = np.zeros(shape)
+        self.balance = np.zeros(shape)
+        self.credit = np.zeros(shape)
+        self.unrealized = np.zeros(shape)
+        self.positions = np.zeros(shape, dtype=np.int64)
+        self.column = { symbol: j for j, symbol in enumerate(symbols) }
+        # first tick of the run (later when resumed) and last tick whose values are final
+        self.first = 0
+        self.last = -1
+
+    def row(self, i: int) -> int:
+        if self.keep_history:
+            return i
+        return i % 2
+
+    def row_of(self, time: int) -> int:
+        return self.row(int(np.searchsorted(self.timestamps, time)))
+
+    def vector(self, values: dict[str, float]) -> np.ndarray:
+        return np.array([values[symbol] for symbol in self.symbols], dtype=np.float64)
+
+    def open_tick(self, i: int, position: dict[str, int], mids: dict[str, float], last: bool):
+        # the next tick starts with the values of this one
+        row = self.row(i)
+        self.positions[row] = [position[symbol] for symbol in self.symbols]
+        if not last:
+            next_row = self.row(i + 1)
+            self.profits[next_row] = self.profits[row]
+            self.credit[next_row] = self.credit[row]
+            self.balance[next_row] = self.balance[row]
+            self.unrealized[next_row] = self.vector(mids) * self.positions[row]
+
+    def fill(self, i: int, symbol: str, price: float, quantity: int):
+        self.credit[self.row(i), self.column[symbol]] += -price * quantity
+
+    def close_tick(self, i: int, target: int, position: dict[str, int], mids: dict[str, float], last: bool):
+        # i is the tick that was traded, target the row the result is booked on
+        row = self.row(target)
+        new_position = np.array([position[symbol] for symbol in self.symbols], dtype=np.int64)
+        self.unrealized[row] = self.vector(mids) * new_position
+        closed = (new_position == 0) & (self.positions[self.row(i)] != 0)
+        self.profits[row] = np.where(closed, self.profits[row] + self.credit[row], self.profits[row])
+        self.credit[row] = np.where(closed, 0.0, self.credit[row])
+        self.balance[row] = np.where(closed, 0.0, self.credit[row] + self.unrealized[row])
+        if last:
+            # all positions left are liquidated at the mid price
+            self.profits[row] += self.credit[row] + self.unrealized[row]
+            self.balance[row] = 0.0
+        self.last = i
+
+    def total(self, i: int) -> float:
+        # profit_and_loss of tick i summed over the symbols
+        row = self.row(i)
+        return float(self.profits[row].sum() + self.balance[row].sum())
+
+    def snapshot(self, i: int) -> dict[str, np.ndarray]:
+        # values tick i starts with, enough to resume from there
+        row = self.row(i)
+        return { name: getattr(self, name)[row].copy() for name in ['profits', 'balance', 'credit', 'unrealized'] }
+
+    def restore(self, i: int, snapshot: dict[str, np.ndarray]):
+        row = self.row(i)
+        for name, values in snapshot.items():
+            getattr(self, name)[row] = values
+        self.first = i
+        self.last = i - 1
+
+    def at(self, series: np.ndarray, time: int) -> dict[str, float]:
+        return dict(zip(self.symbols, series[self.row_of(time)].tolist()))
+
+    def series(self, name: str) -> 'LedgerSeries':
+        return LedgerSeries(self, getattr(self, name))
+
+
+class LedgerSeries(Mapping):
+    """
+    `dict[int, dict[str, float]]` view of one ledger series, like the
+    dicts handed to `after_last_round` before. The raw values are in `array`.
+    """
+
+    def __init__(self, ledger: Ledger, array: np.ndarray):
+        self.ledger = ledger
+        self.array = array
+
+    def times(self) -> list[int]:
+        if self.ledger.last < self.ledger.first:
+            return []
+        if self.ledger.keep_history:
+            return self.ledger.timestamps[self.ledger.first:self.ledger.last + 1].tolist()
+        return [int(self.ledger.timestamps[self.ledger.last])]
+
+    def __getitem__(self, time: int) -> dict[str, float]:
+        i = int(np.searchsorted(self.ledger.timestamps, time))
+        if i < self.ledger.first or i > self.ledger.last or self.ledger.timestamps[i] != time:
+            raise KeyError(time)
+        if not self.ledger.keep_history and i != self.ledger.last:
+            raise KeyError(time)
+        return self.ledger.at(self.array, time)
+
+    def __iter__(self):
+        return iter(self.times())
+
+    def __len__(self) -> int:
+        return len(self.times())
+
+
+class RunSeries:
+    """
+    Per tick pnl (profit + balance, the profit_and_loss of the log file)
+    and the position every tick started with, filled by
+    `simulate_alternative(..., series=...)` in both modes (see results_store.py).
+    The ticks before a resumed run keep the values it started with, the run
+    covers the ticks start to end (before the last tick if it was stopped).
+    """
+
+    def __init__(self):
+        self.symbols: list[str] = []
+        self.timestamps = np.zeros(0, dtype=np.int64)
+        self.pnl = np.zeros((0, 0))
+        self.positions = np.zeros((0, 0), dtype=np.int64)
+        self.start = 0
+        self.end = 0
+
+    def begin(self, ledger: Ledger, start=0):
+        shape = (len(ledger.timestamps), len(ledger.symbols))
+        self.symbols = list(ledger.symbols)
+        self.timestamps = ledger.timestamps
+        self.pnl = np.zeros(shape)
+        self.positions = np.zeros(shape, dtype=np.int64)
+        self.start = start
+        self.end = start
+
+    def record(self, ledger: Ledger):
+        # the tick the ledger just finished
+        i = ledger.last
+        row = ledger.row(i)
+        self.pnl[i] = ledger.profits[row] + ledger.balance[row]
+        self.positions[i] = ledger.positions[row]
+        self.end = i + 1
+
+    def record_all(self, ledger: Ledger):
+        self.end = ledger.last + 1
+        self.pnl[:self.end] = (ledger.profits + ledger.balance)[:self.end]
+        self.positions[:self.end] = ledger.positions[:self.end]
+
+    def recording(self, ticks: Iterator[tuple[int, Any]], ledger: Ledger) -> Iterator[tuple[int, Any]]:
+        for time, state in ticks:
+            self.record(ledger)
+            yield time, state
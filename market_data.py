@@ -0,0 +1,718 @@
+from datamodel import *
+from collections import OrderedDict
+from collections.abc import Mapping
+from typing import TYPE_CHECKING, Any
+import numpy as np
+import copy
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+# pandas is only needed to parse csv files, runs from the cache never import it
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Number of bid/ask levels in the prices files
+PRICE_LEVELS = 3
+# Ticks the streaming code (mids, timestamps, activities log) handles in one go
+CHUNK_TICKS = 4096
+
+BID_PRICE_COLUMNS = [f'bid_price_{level}' for level in range(1, PRICE_LEVELS + 1)]
+BID_VOLUME_COLUMNS = [f'bid_volume_{level}' for level in range(1, PRICE_LEVELS + 1)]
+ASK_PRICE_COLUMNS = [f'ask_price_{level}' for level in range(1, PRICE_LEVELS + 1)]
+ASK_VOLUME_COLUMNS = [f'ask_volume_{level}' for level in range(1, PRICE_LEVELS + 1)]
+
+
+def _int_columns(df: 'pd.DataFrame', columns: list[str]) -> list[bool]:
+    # pandas reads a column without gaps as int64 and iterrows handed out
+    # python ints for those, floats otherwise. The order depth keys depend on it.
+    import pandas as pd
+    return [pd.api.types.is_integer_dtype(df[column].dtype) for column in columns]
+
+
+def _as_type(value: float, is_int: bool):
+    if is_int:
+        return int(value)
+    return value
+
+
+def read_prices_csv(path: str) -> 'pd.DataFrame':
+    import pandas as pd
+    return pd.read_csv(path, sep=';')
+
+
+def read_trades_csv(path: str) -> 'pd.DataFrame':
+    import pandas as pd
+    return pd.read_csv(path, sep=';', dtype={ 'seller': str, 'buyer': str })
+
+
+def price_columns(df_prices: 'pd.DataFrame') -> tuple[dict[str, np.ndarray], dict[str, Any]]:
+    import pandas as pd
+    row_times = df_prices['timestamp'].to_numpy(dtype=np.int64)
+    order = np.argsort(row_times, kind='stable')
+    row_times = row_times[order]
+    timestamps, row_start = np.unique(row_times, return_index=True)
+    symbol_codes, symbols = pd.factorize(df_prices['product'].to_numpy()[order])
+    columns = lambda cols: df_prices[cols].to_numpy(dtype=np.float64)[order]
+    arrays = {
+        'timestamps': timestamps.astype(np.int64),
+        'row_start': np.append(row_start, len(row_times)).astype(np.int64),
+        'row_symbol': symbol_codes.astype(np.int32),
+        'bid_prices': columns(BID_PRICE_COLUMNS),
+        'bid_volumes': columns(BID_VOLUME_COLUMNS),
+        'ask_prices': columns(ASK_PRICE_COLUMNS),
+        'ask_volumes': columns(ASK_VOLUME_COLUMNS),
+        'mid_prices': df_prices['mid_price'].to_numpy(dtype=np.float64)[order],
+    }
+    meta = {
+        'symbols': [str(s) for s in symbols],
+        'int_columns': {
+            'bid_price': _int_columns(df_prices, BID_PRICE_COLUMNS),
+            'ask_price': _int_columns(df_prices, ASK_PRICE_COLUMNS),
+            'mid_price': _int_columns(df_prices, ['mid_price']),
+        },
+    }
+    return arrays, meta
+
+
+def trade_columns(df_trades: 'pd.DataFrame') -> tuple[dict[str, np.ndarray], dict[str, Any]]:
+    import pandas as pd
+    trade_times = df_trades['timestamp'].to_numpy(dtype=np.int64)
+    order = np.argsort(trade_times, kind='stable')
+    symbol_codes, symbols = pd.factorize(df_trades['symbol'].to_numpy()[order])
+    # buyer and seller share one dictionary, missing names are 'nan' like str(NaN)
+    participants = np.concatenate([
+        df_trades['buyer'].to_numpy(dtype=object)[order],
+        df_trades['seller'].to_numpy(dtype=object)[order],
+    ])
+    codes, uniques = pd.factorize(participants)
+    names = [str(u) for u in uniques] + ['nan']
+    codes = np.where(codes < 0, len(names) - 1, codes).astype(np.int32)
+    arrays = {
+        'timestamps': trade_times[order],
+        'symbol': symbol_codes.astype(np.int32),
+        'price': df_trades['price'].to_numpy(dtype=np.float64)[order],
+        'quantity': df_trades['quantity'].to_numpy(dtype=np.int64)[order],
+        'buyer': codes[:len(trade_times)],
+        'seller': codes[len(trade_times):],
+    }
+    meta = {
+        'symbols': [str(s) for s in symbols],
+        'names': names,
+        'int_columns': {
+            'trade_price': _int_columns(df_trades, ['price']),
+        },
+    }
+    return arrays, meta
+
+
+class DayData:
+    """
+    Columnar representation of one prices file plus its trades file.
+    Rows of the prices file are kept in file order and grouped by timestamp
+    through `row_start`, trades are grouped the same way through `trade_start`.
+    TradingStates are only built on request, see `state_at`.
+    """
+
+    def __init__(
+            self,
+            symbols: list[str],
+            positionable: list[str],
+            timestamps: np.ndarray,
+            row_start: np.ndarray,
+            row_symbol: np.ndarray,
+            bid_prices: np.ndarray,
+            bid_volumes: np.ndarray,
+            ask_prices: np.ndarray,
+            ask_volumes: np.ndarray,
+            mid_prices: np.ndarray,
+            int_columns: dict[str, list[bool]],
+            names: list[str],
+            trade_start: np.ndarray,
+            trade_symbol: np.ndarray,
+            trade_price: np.ndarray,
+            trade_quantity: np.ndarray,
+            trade_buyer: np.ndarray,
+            trade_seller: np.ndarray,
+        ):
+        self.symbols = symbols
+        self.positionable = positionable
+        self.timestamps = timestamps
+        self.row_start = row_start
+        self.row_symbol = row_symbol
+        self.bid_prices = bid_prices
+        self.bid_volumes = bid_volumes
+        self.ask_prices = ask_prices
+        self.ask_volumes = ask_volumes
+        self.mid_prices = mid_prices
+        self.int_columns = int_columns
+        self.names = names
+        self.trade_start = trade_start
+        self.trade_symbol = trade_symbol
+        self.trade_price = trade_price
+        self.trade_quantity = trade_quantity
+        self.trade_buyer = trade_buyer
+        self.trade_seller = trade_seller
+        # listings never change, all states share them
+        self.listings = { symbol: Listing(symbol, symbol, "1") for symbol in symbols }
+        # timestamp of the start of the day, see shifted
+        self.offset = 0
+        self._mid_index = None
+        self._trade_book = None
+
+    @classmethod
+    def from_columns(
+            cls,
+            prices: dict[str, np.ndarray],
+            prices_meta: dict[str, Any],
+            trades: dict[str, np.ndarray] | None,
+            trades_meta: dict[str, Any] | None,
+            positionable: list[str],
+            time_limit: int,
+        ):
+        # columns are sorted by timestamp, so time_limit only cuts off their
+        # tails and memory-mapped columns stay views into the cache
+        n = int(np.searchsorted(prices['timestamps'], time_limit, side='right'))
+        timestamps = prices['timestamps'][:n]
+        row_start = prices['row_start'][:n + 1]
+        rows = int(row_start[-1])
+        symbols = list(prices_meta['symbols'])
+        int_columns = dict(prices_meta['int_columns'])
+
+        names = []
+        trade_start = np.zeros(n + 1, dtype=np.int64)
+        trade_symbol = np.zeros(0, dtype=np.int32)
+        trade_price = np.zeros(0, dtype=np.float64)
+        trade_quantity = np.zeros(0, dtype=np.int64)
+        trade_buyer = np.zeros(0, dtype=np.int32)
+        trade_seller = np.zeros(0, dtype=np.int32)
+        if trades is not None and trades_meta is not None:
+            m = int(np.searchsorted(trades['timestamps'], time_limit, side='right'))
+            trade_times = trades['timestamps'][:m]
+            codes = trades['symbol'][:m]
+            trade_price = trades['price'][:m]
+            trade_quantity = trades['quantity'][:m]
+            trade_buyer = trades['buyer'][:m]
+            trade_seller = trades['seller'][:m]
+            # trades at timestamps without prices have no state to be attached to
+            known = np.isin(trade_times, timestamps)
+            if not known.all():
+                trade_times = trade_times[known]
+                codes = codes[known]
+                trade_price = trade_price[known]
+                trade_quantity = trade_quantity[known]
+                trade_buyer = trade_buyer[known]
+                trade_seller = trade_seller[known]
+            trade_start = np.searchsorted(trade_times, timestamps, side='left')
+            trade_start = np.append(trade_start, len(trade_times)).astype(np.int64)
+
+            for trade_symbol_name in trades_meta['symbols']:
+                if trade_symbol_name not in symbols:
+                    symbols.append(trade_symbol_name)
+            symbol_lookup = np.array([symbols.index(s) for s in trades_meta['symbols']], dtype=np.int32)
+            trade_symbol = symbol_lookup[codes]
+            names = trades_meta['names']
+            int_columns.update(trades_meta['int_columns'])
+
+        return cls(
+            symbols,
+            positionable,
+            timestamps,
+            row_start,
+            prices['row_symbol'][:rows],
+            prices['bid_prices'][:rows],
+            prices['bid_volumes'][:rows],
+            prices['ask_prices'][:rows],
+            prices['ask_volumes'][:rows],
+            prices['mid_prices'][:rows],
+            int_columns,
+            names,
+            trade_start,
+            trade_symbol,
+            trade_price,
+            trade_quantity,
+            trade_buyer,
+            trade_seller,
+        )
+
+    @classmethod
+    def from_frames(cls, df_prices: 'pd.DataFrame', df_trades: 'pd.DataFrame | None', positionable: list[str], time_limit: int):
+        prices, prices_meta = price_columns(df_prices)
+        trades, trades_meta = None, None
+        if df_trades is not None:
+            trades, trades_meta = trade_columns(df_trades)
+        return cls.from_columns(prices, prices_meta, trades, trades_meta, positionable, time_limit)
+
+    @classmethod
+    def from_csv(cls, prices_path: str, trades_path: str | None, positionable: list[str], time_limit: int):
+        df_prices = read_prices_csv(prices_path)
+        df_trades = None
+        if trades_path is not None:
+            df_trades = read_trades_csv(trades_path)
+        return cls.from_frames(df_prices, df_trades, positionable, time_limit)
+
+    @classmethod
+    def from_cache(cls, prices_path: str, trades_path: str | None, positionable: list[str], time_limit: int, cache_dir: str):
+        prices, prices_meta = cached_columns(prices_path, 'prices', cache_dir)
+        trades, trades_meta = None, None
+        if trades_path is not None:
+            trades, trades_meta = cached_columns(trades_path, 'trades', cache_dir)
+        return cls.from_columns(prices, prices_meta, trades, trades_meta, positionable, time_limit)
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def index_of(self, time: int) -> int:
+        i = int(np.searchsorted(self.timestamps, time))
+        if i >= len(self.timestamps) or self.timestamps[i] != time:
+            raise KeyError(time)
+        return i
+
+    def state_at(self, i: int) -> TradingState:
+        time = int(self.timestamps[i])
+        position: Dict[Product, Position] = {}
+        own_trades: Dict[Symbol, List[Trade]] = {}
+        market_trades: Dict[Symbol, List[Trade]] = {}
+        observations: Dict[Product, Observation] = {}
+        listings = {}
+        depths = {}
+
+        start, end = self.row_start[i], self.row_start[i + 1]
+        mid_int = self.int_columns['mid_price'][0]
+        for row, symbol_index in enumerate(self.row_symbol[start:end].tolist(), start):
+            product = self.symbols[symbol_index]
+            if product not in position and product in self.positionable:
+                position[product] = 0
+                own_trades[product] = []
+                market_trades[product] = []
+
+            listings[product] = self.listings[product]
+
+            if product == "DOLPHIN_SIGHTINGS":
+                observations["DOLPHIN_SIGHTINGS"] = _as_type(float(self.mid_prices[row]), mid_int)
+
+            depths[product] = RowOrderDepth(self, row)
+
+        self.add_market_trades(i, market_trades)
+        return TradingState(time, listings, depths, own_trades, market_trades, position, observations)
+
+    def buy_orders(self, row: int) -> Dict[int, int]:
+        return self._levels(self.bid_prices[row].tolist(), self.bid_volumes[row].tolist(), self.int_columns['bid_price'], 1)
+
+    def sell_orders(self, row: int) -> Dict[int, int]:
+        return self._levels(self.ask_prices[row].tolist(), self.ask_volumes[row].tolist(), self.int_columns['ask_price'], -1)
+
+    def _levels(self, prices: list[float], volumes: list[float], int_columns: list[bool], sign: int) -> Dict[int, int]:
+        orders = {}
+        # NaN > 0 is False, so missing levels are skipped
+        for level in range(PRICE_LEVELS):
+            if prices[level] > 0:
+                orders[_as_type(prices[level], int_columns[level])] = sign * int(volumes[level])
+        return orders
+
+    def add_market_trades(self, i: int, market_trades: Dict[Symbol, List[Trade]]):
+        start, end = self.trade_start[i], self.trade_start[i + 1]
+        if start == end:
+            return market_trades
+        time = int(self.timestamps[i])
+        price_int = self.int_columns['trade_price'][0]
+        for symbol_index, price, quantity, buyer, seller in zip(
+                self.trade_symbol[start:end].tolist(),
+                self.trade_price[start:end].tolist(),
+                self.trade_quantity[start:end].tolist(),
+                self.trade_buyer[start:end].tolist(),
+                self.trade_seller[start:end].tolist()):
+            symbol = self.symbols[symbol_index]
+            if symbol not in market_trades:
+                market_trades[symbol] = []
+            market_trades[symbol].append(Trade(
+                symbol,
+                _as_type(price, price_int),
+                quantity,
+                self.names[buyer],
+                self.names[seller],
+                time))
+        return market_trades
+
+    def shifted(self, offset: int) -> 'DayData':
+        """
+        The same day with offset added to every timestamp (and so to the
+        states and trades), e.g. for later days of a session. Shares all
+        arrays, mids are still looked up on the original timestamps.
+        """
+        day_data = copy.copy(self)
+        day_data._mid_index = self.mid_index()
+        day_data._trade_book = None
+        day_data.timestamps = self.timestamps + offset
+        day_data.offset = self.offset + offset
+        return day_data
+
+    def states(self, window: int | None = None) -> 'DayStates':
+        return DayStates(self, window)
+
+    def mid_index(self) -> 'MidIndex':
+        if self._mid_index is None:
+            self._mid_index = MidIndex(self)
+        return self._mid_index
+
+    def streaming_mids(self) -> 'StreamingMids':
+        return StreamingMids(self)
+
+    def trade_book(self) -> 'TradeBook':
+        if self._trade_book is None:
+            self._trade_book = TradeBook(self)
+        return self._trade_book
+
+
+class RowOrderDepth(OrderDepth):
+    """
+    OrderDepth of one row of a DayData. buy_orders and sell_orders are plain
+    dicts, but only built from the price columns once they are used, most
+    order depths of a day are never looked at. Pickles as a plain OrderDepth.
+    """
+
+    __slots__ = ('day_data', 'row', '_buy_orders', '_sell_orders')
+
+    def __init__(self, day_data: DayData, row: int):
+        self.day_data = day_data
+        self.row = row
+        self._buy_orders: Dict[int, int] | None = None
+        self._sell_orders: Dict[int, int] | None = None
+
+    @property
+    def buy_orders(self) -> Dict[int, int]:
+        if self._buy_orders is None:
+            self._buy_orders = self.day_data.buy_orders(self.row)
+        return self._buy_orders
+
+    @buy_orders.setter
+    def buy_orders(self, orders: Dict[int, int]):
+        self._buy_orders = orders
+
+    @property
+    def sell_orders(self) -> Dict[int, int]:
+        if self._sell_orders is None:
+            self._sell_orders = self.day_data.sell_orders(self.row)
+        return self._sell_orders
+
+    @sell_orders.setter
+    def sell_orders(self, orders: Dict[int, int]):
+        self._sell_orders = orders
+
+    def __reduce__(self):
+        return (_order_depth, (self.buy_orders, self.sell_orders))
+
+
+def _order_depth(buy_orders: Dict[int, int], sell_orders: Dict[int, int]) -> OrderDepth:
+    depth = OrderDepth()
+    depth.buy_orders = buy_orders
+    depth.sell_orders = sell_orders
+    return depth
+
+
+class MidIndex:
+    """
+    Best bid/ask and mid price per tick and symbol of a DayData, computed
+    once with array operations. A mid only exists (valid) if both sides
+    of the book have at least one level. last_valid/next_valid hold the
+    closest tick at or before/after with a valid mid (-1/len if none).
+    With start/end only the ticks start to end - 1 are covered, row k of
+    every array is tick start + k.
+    """
+
+    def __init__(self, day_data: DayData, start=0, end: int | None = None):
+        if end is None:
+            end = len(day_data)
+        n = end - start
+        self.start = start
+        self.symbols = day_data.symbols
+        self.column = { symbol: j for j, symbol in enumerate(self.symbols) }
+        shape = (n, len(self.symbols))
+
+        first, last = int(day_data.row_start[start]), int(day_data.row_start[end])
+        tick_of_row = np.repeat(np.arange(n), np.diff(day_data.row_start[start:end + 1]))
+        row_symbol = day_data.row_symbol[first:last]
+        # like the order depths, levels with a price <= 0 or no price don't exist
+        bid_prices = np.where(day_data.bid_prices[first:last] > 0, day_data.bid_prices[first:last], np.nan)
+        ask_prices = np.where(day_data.ask_prices[first:last] > 0, day_data.ask_prices[first:last], np.nan)
+        self.best_bid = np.full(shape, np.nan)
+        self.best_ask = np.full(shape, np.nan)
+        self.best_bid[tick_of_row, row_symbol] = np.fmax.reduce(bid_prices, axis=1)
+        self.best_ask[tick_of_row, row_symbol] = np.fmin.reduce(ask_prices, axis=1)
+        self.valid = ~np.isnan(self.best_bid) & ~np.isnan(self.best_ask)
+        self.mid = (self.best_bid + self.best_ask) / 2
+
+        ticks = np.arange(n)[:, None]
+        self.last_valid = np.maximum.accumulate(np.where(self.valid, ticks, -1), axis=0)
+        self.next_valid = np.minimum.accumulate(np.where(self.valid, ticks, n)[::-1], axis=0)[::-1]
+        self.timestamps = day_data.timestamps[start:end]
+        self.day_start = day_data.offset
+        self._fallback: dict[tuple[str, ...], tuple[np.ndarray, np.ndarray]] = {}
+
+    def fallback_mids(self, symbols: list[str]) -> np.ndarray:
+        """
+        Mid prices the way the backtester always looked them up: if the book
+        of a symbol has an empty side, the search continues from the tick the
+        previous symbol ended on, backwards (forwards at timestamp 0) until a
+        valid mid is found. So after one fallback the following symbols use
+        mids of that tick as long as theirs are valid there.
+        NaN where no valid mid exists in that direction.
+        """
+        return self._fallback_table(symbols)[0]
+
+    def mids_at(self, symbols: list[str], i: int) -> list[float]:
+        return self.fallback_mids(symbols)[i - self.start].tolist()
+
+    def _fallback_table(self, symbols: list[str]) -> tuple[np.ndarray, np.ndarray]:
+        # the table and the ticks whose search left the covered ticks
+        key = tuple(symbols)
+        if key not in self._fallback:
+            n = len(self.timestamps)
+            table = np.full((n, len(symbols)), np.nan)
+            current = np.arange(n)
+            look_forward = self.timestamps == self.day_start
+            for k, symbol in enumerate(symbols):
+                j = self.column.get(symbol)
+                if j is None:
+                    continue
+                found = np.where(
+                    look_forward,
+                    self.next_valid[np.clip(current, 0, n - 1), j],
+                    self.last_valid[np.clip(current, 0, n - 1), j])
+                found = np.where((current >= 0) & (current < n), found, current)
+                exists = (found >= 0) & (found < n)
+                table[exists, k] = self.mid[found[exists], j]
+                current = found
+            self._fallback[key] = (table, (current < 0) | (current >= n))
+        return self._fallback[key]
+
+
+class StreamingMids:
+    """
+    The fallback mids of MidIndex for one tick after the other with memory
+    independent of the length of the day (streaming mode): a MidIndex covers
+    the next window ticks, the few ticks whose search leaves it go back
+    through the day's columns tick by tick, like the original calc_mid.
+    """
+
+    def __init__(self, day_data: DayData, window=CHUNK_TICKS):
+        self.day_data = day_data
+        self.window = window
+        self.index: MidIndex | None = None
+
+    def mids_at(self, symbols: list[str], i: int) -> list[float]:
+        index = self.index
+        if index is None or not index.start <= i < index.start + len(index.timestamps):
+            # the old window is dropped before the next one is computed
+            index = self.index = None
+            index = self.index = MidIndex(self.day_data, i, min(i + self.window, len(self.day_data)))
+        table, left = index._fallback_table(symbols)
+        if left[i - index.start]:
+            return self._search(symbols, i)
+        return table[i - index.start].tolist()
+
+    def _search(self, symbols: list[str], i: int) -> list[float]:
+        day_data = self.day_data
+        n = len(day_data)
+        step = 1 if day_data.timestamps[i] == day_data.offset else -1
+        current = i
+        mids = []
+        for symbol in symbols:
+            if symbol not in day_data.symbols:
+                mids.append(np.nan)
+                continue
+            j = day_data.symbols.index(symbol)
+            mid = None
+            while 0 <= current < n:
+                mid = self._mid(current, j)
+                if mid is not None:
+                    break
+                current += step
+            mids.append(np.nan if mid is None else mid)
+        return mids
+
+    def _mid(self, i: int, j: int) -> float | None:
+        day_data = self.day_data
+        for row in range(int(day_data.row_start[i]), int(day_data.row_start[i + 1])):
+            if day_data.row_symbol[row] == j:
+                bids = [price for price in day_data.bid_prices[row].tolist() if price > 0]
+                asks = [price for price in day_data.ask_prices[row].tolist() if price > 0]
+                if bids and asks:
+                    return (max(bids) + min(asks)) / 2
+                return None
+        return None
+
+
+class TradeBook:
+    """
+    Volume of the market trades of a DayData per (timestamp, symbol, price),
+    indexed once, so finding the trades of a tick that cross an order is a
+    dict lookup. Prices have the same type as in the states.
+    """
+
+    def __init__(self, day_data: DayData):
+        end = int(day_data.trade_start[-1])
+        ticks = np.repeat(np.arange(len(day_data)), np.diff(day_data.trade_start))
+        price_int = day_data.int_columns['trade_price'][0]
+        self.volumes: dict[tuple[int, str], dict[int | float, int]] = {}
+        for time, symbol_index, price, quantity in zip(
+                day_data.timestamps[ticks].tolist(),
+                day_data.trade_symbol[:end].tolist(),
+                day_data.trade_price[:end].tolist(),
+                day_data.trade_quantity[:end].tolist()):
+            levels = self.volumes.setdefault((time, day_data.symbols[symbol_index]), {})
+            price = _as_type(price, price_int)
+            levels[price] = levels.get(price, 0) + abs(quantity)
+        timestamps = day_data.timestamps.tolist()
+        self.next_time = dict(zip(timestamps[:-1], timestamps[1:]))
+
+    def at(self, time: int, symbol: Symbol) -> dict[int | float, int]:
+        return self.volumes.get((time, symbol), {})
+
+    def following(self, time: int, symbol: Symbol) -> dict[int | float, int]:
+        # trades of the tick after time, none after the last tick
+        next_time = self.next_time.get(time)
+        if next_time is None:
+            return {}
+        return self.at(next_time, symbol)
+
+
+class DayStates(Mapping):
+    """
+    Read-only `dict[int, TradingState]` over a DayData. A state is built
+    the first time its timestamp is accessed and kept afterwards, so
+    changes the engine makes to it (own_trades, position) stick.
+    With a `window` only the most recently accessed states are kept,
+    older ones are dropped and rebuilt from the arrays if accessed again.
+    """
+
+    def __init__(self, day_data: DayData, window: int | None = None):
+        self.day_data = day_data
+        self.window = window
+        self.built: OrderedDict[int, TradingState] = OrderedDict()
+
+    def __getitem__(self, time: int) -> TradingState:
+        state = self.built.get(time)
+        if state is None:
+            state = self.day_data.state_at(self.day_data.index_of(time))
+            self.built[time] = state
+            if self.window is not None and len(self.built) > self.window:
+                self.built.popitem(last=False)
+        elif self.window is not None:
+            self.built.move_to_end(time)
+        return state
+
+    def __iter__(self):
+        # a window of timestamps at a time, a list of the whole day would grow with it
+        timestamps = self.day_data.timestamps
+        for start in range(0, len(timestamps), CHUNK_TICKS):
+            yield from timestamps[start:start + CHUNK_TICKS].tolist()
+
+    def __len__(self) -> int:
+        return len(self.day_data)
+
+    def __contains__(self, time) -> bool:
+        try:
+            self.day_data.index_of(time)
+        except KeyError:
+            return False
+        return True
+
+
+# Bump when the layout of cached columns changes
+CACHE_VERSION = 1
+
+
+def _file_key(path: str) -> dict[str, int]:
+    stat = os.stat(path)
+    return { 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns }
+
+
+def _file_hash(path: str) -> str:
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _load_array(path: str) -> np.ndarray:
+    try:
+        # plain ndarray view, still backed by the mapping, but indexing
+        # it doesn't go through np.memmap.__getitem__
+        return np.asarray(np.load(path, mmap_mode='r'))
+    except ValueError:
+        # empty arrays can't be memory-mapped
+        return np.load(path)
+
+
+def _read_cache_meta(entry: str) -> dict[str, Any] | None:
+    try:
+        with open(os.path.join(entry, 'meta.json'), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_cache_meta(entry: str, meta: dict[str, Any]):
+    tmp_path = os.path.join(entry, f'meta.json.{os.getpid()}')
+    with open(tmp_path, 'w', encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, os.path.join(entry, 'meta.json'))
+
+
+def _write_cache_entry(entry: str, arrays: dict[str, np.ndarray], meta: dict[str, Any]):
+    cache_dir = os.path.dirname(entry)
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_entry = tempfile.mkdtemp(prefix='.tmp_', dir=cache_dir)
+    try:
+        for name, array in arrays.items():
+            np.save(os.path.join(tmp_entry, f'{name}.npy'), np.ascontiguousarray(array))
+        _write_cache_meta(tmp_entry, meta)
+        if os.path.isdir(entry):
+            shutil.rmtree(entry, ignore_errors=True)
+        os.rename(tmp_entry, entry)
+    except OSError:
+        # another process might have won the race, its entry is as good as ours
+        shutil.rmtree(tmp_entry, ignore_errors=True)
+
+
+def cached_columns(path: str, kind: str, cache_dir: str) -> tuple[dict[str, np.ndarray], dict[str, Any]]:
+    """
+    Columns of a prices (kind='prices') or trades (kind='trades') csv,
+    memory-mapped from `cache_dir`. The cache entry is rebuilt whenever
+    the size/mtime of the csv changed and its content hash doesn't match.
+    """
+    entry = os.path.join(cache_dir, os.path.splitext(os.path.basename(path))[0])
+    key = _file_key(path)
+    meta = _read_cache_meta(entry)
+    if meta is not None and meta['version'] == CACHE_VERSION and meta['kind'] == kind:
+        valid = meta['key'] == key
+        if not valid and meta['key']['size'] == key['size'] and meta['sha1'] == _file_hash(path):
+            # touched or copied, but same content
+            meta['key'] = key
+            try:
+                _write_cache_meta(entry, meta)
+            except OSError:
+                pass
+            valid = True
+        if valid:
+            arrays = { name: _load_array(os.path.join(entry, f'{name}.npy')) for name in meta['arrays'] }
+            return arrays, meta['columns']
+
+    if kind == 'prices':
+        arrays, columns_meta = price_columns(read_prices_csv(path))
+    else:
+        arrays, columns_meta = trade_columns(read_trades_csv(path))
+    meta = {
+        'version': CACHE_VERSION,
+        'kind': kind,
+        'key': key,
+        'sha1': _file_hash(path),
+        'arrays': list(arrays.keys()),
+        'columns': columns_meta,
+    }
+    _write_cache_entry(entry, arrays, meta)
+    return arrays, columns_meta
@@ -0,0 +1,199 @@
+from datamodel import *
+from market_data import TradeBook
+import copy
+import statistics
+
+# Orders only match a level with exactly their price, see README
+MATCH_EXACT = 'exact'
+# Orders match any volume on their side of the mid price
+MATCH_HALFWAY = 'halfway'
+# Orders walk the book level by level up to their limit price and use up
+# the volume they fill, so later orders only get what is left
+MATCH_DEPTH = 'depth'
+# Orders match like depth, what is left rests until the next tick and is
+# filled by the market trades of that tick that cross it
+MATCH_TRADES = 'trades'
+
+MATCHING_MODES = [MATCH_EXACT, MATCH_HALFWAY, MATCH_DEPTH, MATCH_TRADES]
+
+# Share of the volume of a crossing market trade that goes to our order
+TRADE_SHARE = 0.5
+
+
+def cleanup_order_volumes(org_orders: List[Order]) -> List[Order]:
+    # Every order gets the volume of all orders at its price added, except
+    # for orders with the same price and quantity (itself included).
+    # Same result as comparing every pair of orders, without doing so.
+    volume_by_price: dict[int, int] = {}
+    count_by_order: dict[tuple[int, int], int] = {}
+    for order in org_orders:
+        volume_by_price[order.price] = volume_by_price.get(order.price, 0) + order.quantity
+        count_by_order[(order.price, order.quantity)] = count_by_order.get((order.price, order.quantity), 0) + 1
+    orders = []
+    for order in org_orders:
+        final_order = copy.copy(order)
+        same_orders = count_by_order[(order.price, order.quantity)]
+        final_order.quantity = volume_by_price[order.price] - order.quantity * same_orders + order.quantity
+        orders.append(final_order)
+    return orders
+
+
+def print_no_match(order: Order, time: int, order_depth: dict[str, OrderDepth]):
+    print(f'No matches for order {order} at time {time}')
+    print(f'Order depth is {order_depth[order.symbol].__dict__}')
+
+
+def match_exact(symbol: Symbol, orders: List[Order], order_depth: dict[str, OrderDepth], time: int) -> list[Trade]:
+    trades = []
+    symbol_order_depth = order_depth[symbol]
+    for order in cleanup_order_volumes(orders):
+        if order.quantity < 0:
+            volume = symbol_order_depth.buy_orders.get(order.price)
+            if volume is not None:
+                if abs(volume) > abs(order.quantity):
+                    final_volume = order.quantity
+                else:
+                    # this should be negative
+                    final_volume = -volume
+                trades.append(Trade(symbol, order.price, final_volume, "BOT", "YOU", time))
+            else:
+                print_no_match(order, time, order_depth)
+        if order.quantity > 0:
+            volume = symbol_order_depth.sell_orders.get(order.price)
+            if volume is not None:
+                # volume is negative for sell orders
+                if abs(volume) > abs(order.quantity):
+                    final_volume = order.quantity
+                else:
+                    final_volume = abs(volume)
+                trades.append(Trade(symbol, order.price, final_volume, "YOU", "BOT", time))
+            else:
+                print_no_match(order, time, order_depth)
+    return trades
+
+
+def match_halfway(symbol: Symbol, orders: List[Order], order_depth: dict[str, OrderDepth], time: int) -> list[Trade]:
+    trades = []
+    symbol_order_depth = order_depth[symbol]
+    mid = None
+    for order in cleanup_order_volumes(orders):
+        if order.quantity == 0:
+            continue
+        if mid is None:
+            max_bid = max(symbol_order_depth.buy_orders.keys())
+            min_ask = min(symbol_order_depth.sell_orders.keys())
+            mid = statistics.median([max_bid, min_ask])
+        if order.quantity < 0:
+            if order.price <= mid:
+                trades.append(Trade(symbol, order.price, order.quantity, "BOT", "YOU", time))
+            else:
+                print_no_match(order, time, order_depth)
+        else:
+            if order.price >= mid:
+                trades.append(Trade(symbol, order.price, order.quantity, "YOU", "BOT", time))
+            else:
+                print_no_match(order, time, order_depth)
+    return trades
+
+
+def walk_book(symbol: Symbol, orders: List[Order], order_depth: dict[str, OrderDepth], time: int) -> tuple[list[Trade], list[int]]:
+    # the trades of depth matching and the volume left of every order
+    # price levels as [price, volume left], best first
+    bids = [[price, volume] for price, volume in sorted(order_depth[symbol].buy_orders.items(), reverse=True)]
+    asks = [[price, -volume] for price, volume in sorted(order_depth[symbol].sell_orders.items())]
+    # index of the best level that still has volume
+    best_bid = 0
+    best_ask = 0
+    trades = []
+    remaining_volumes = []
+    for order in orders:
+        remaining = abs(order.quantity)
+        if order.quantity > 0:
+            while remaining > 0 and best_ask < len(asks) and asks[best_ask][0] <= order.price:
+                fill = min(remaining, asks[best_ask][1])
+                if fill > 0:
+                    trades.append(Trade(symbol, asks[best_ask][0], fill, "YOU", "BOT", time))
+                    asks[best_ask][1] -= fill
+                    remaining -= fill
+                if asks[best_ask][1] <= 0:
+                    best_ask += 1
+        elif order.quantity < 0:
+            while remaining > 0 and best_bid < len(bids) and bids[best_bid][0] >= order.price:
+                fill = min(remaining, bids[best_bid][1])
+                if fill > 0:
+                    trades.append(Trade(symbol, bids[best_bid][0], -fill, "BOT", "YOU", time))
+                    bids[best_bid][1] -= fill
+                    remaining -= fill
+                if bids[best_bid][1] <= 0:
+                    best_bid += 1
+        remaining_volumes.append(remaining)
+    return trades, remaining_volumes
+
+
+def match_depth(symbol: Symbol, orders: List[Order], order_depth: dict[str, OrderDepth], time: int) -> list[Trade]:
+    trades, remaining_volumes = walk_book(symbol, orders, order_depth, time)
+    for order, remaining in zip(orders, remaining_volumes):
+        if order.quantity != 0 and remaining == abs(order.quantity):
+            print_no_match(order, time, order_depth)
+    return trades
+
+
+def match_trades(symbol: Symbol, orders: List[Order], order_depth: dict[str, OrderDepth], time: int, trade_book: TradeBook, share=TRADE_SHARE) -> list[Trade]:
+    """
+    Depth matching, then the volume left of every order rests until the next
+    tick. The market trades of that tick at or below a buy (at or above a
+    sell) price fill it with share of their volume, at the price of the
+    order and with the timestamp of that tick. Orders use up the volume
+    in turn, like the book levels, a buy from the lowest trade price up and
+    a sell from the highest down.
+    """
+    trades, remaining_volumes = walk_book(symbol, orders, order_depth, time)
+    levels = trade_book.following(time, symbol)
+    # our part of the trades at every price
+    left = { price: int(volume * share + 0.5) for price, volume in levels.items() }
+    ascending = sorted(left)
+    descending = ascending[::-1]
+    next_time = trade_book.next_time.get(time)
+    for order, remaining in zip(orders, remaining_volumes):
+        resting = remaining
+        for price in ascending if order.quantity > 0 else descending:
+            if resting == 0:
+                break
+            crosses = price <= order.price if order.quantity > 0 else price >= order.price
+            if crosses and left[price] > 0:
+                fill = min(resting, left[price])
+                left[price] -= fill
+                resting -= fill
+                if order.quantity > 0:
+                    trades.append(Trade(symbol, order.price, fill, "YOU", "BOT", next_time))
+                else:
+                    trades.append(Trade(symbol, order.price, -fill, "BOT", "YOU", next_time))
+        if order.quantity != 0 and resting == abs(order.quantity):
+            print_no_match(order, time, order_depth)
+    return trades
+
+
+MATCHERS = {
+    MATCH_EXACT: match_exact,
+    MATCH_HALFWAY: match_halfway,
+    MATCH_DEPTH: match_depth,
+}
+
+
+# trade_book is only needed (and used) by MATCH_TRADES
+def match_orders(
+        trader_orders: dict[str, List[Order]],
+        order_depth: dict[str, OrderDepth],
+        time: int,
+        matching: str,
+        trade_book: TradeBook | None = None,
+        trade_share=TRADE_SHARE,
+    ) -> list[Trade]:
+    trades = []
+    for symbol, orders in trader_orders.items():
+        if order_depth.get(symbol) != None:
+            if matching == MATCH_TRADES:
+                trades.extend(match_trades(symbol, orders, order_depth, time, trade_book, trade_share))
+            else:
+                trades.extend(MATCHERS[matching](symbol, orders, order_depth, time))
+    return trades
@@ -0,0 +1,244 @@
+from backtester import SYMBOLS_BY_ROUND_POSITIONABLE, Trader, current_limits, load_day_data, load_trader_class, simulate_alternative, yes_no
+from market_data import PRICE_LEVELS, DayData
+from matching import MATCH_EXACT, MATCHING_MODES, TRADE_SHARE
+import numpy as np
+import pandas as pd
+import argparse
+
+# Chance that an order resting at the touch (our best bid/ask) is filled
+# within one tick, it shrinks by DISTANCE_DECAY per price unit further away
+QUEUE_FILL = 0.2
+DISTANCE_DECAY = 0.5
+QUANTILES = [0.05, 0.25, 0.5, 0.75, 0.95]
+# Seeds drawn at once, bounds the memory of the fill arrays
+SEED_BATCH = 1000
+
+
+class OrderRecorder:
+    # stands in for the trader and keeps every order it sends, in the order
+    # the engine matches them
+    def __init__(self, trader):
+        self.trader = trader
+        self.times: list[int] = []
+        self.symbols: list[str] = []
+        self.prices: list[float] = []
+        self.quantities: list[int] = []
+
+    def run(self, state):
+        orders = self.trader.run(state)
+        for symbol, symbol_orders in orders.items():
+            for order in symbol_orders:
+                self.times.append(state.timestamp)
+                self.symbols.append(symbol)
+                self.prices.append(order.price)
+                self.quantities.append(order.quantity)
+        return orders
+
+    def __getattr__(self, name):
+        return getattr(self.trader, name)
+
+
+def fill_probabilities(
+        day_data: DayData,
+        recorder: OrderRecorder,
+        queue_fill=QUEUE_FILL,
+        distance_decay=DISTANCE_DECAY,
+        trade_share=TRADE_SHARE,
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Per recorded order its tick, the volume that is filled for sure and the
+    probability that the rest of it is filled.
+    Volume the book offers up to the limit price is filled for sure, at the
+    price of the order like in exact/halfway mode (every order sees the
+    whole book). The rest is filled with the chance of a resting order at
+    its distance from the touch, or by the market trades of the next tick
+    at exactly its price, whichever comes first.
+    """
+    n = len(day_data)
+    ticks = np.searchsorted(day_data.timestamps, np.array(recorder.times, dtype=np.int64))
+    column = { symbol: j for j, symbol in enumerate(day_data.symbols) }
+    symbol_index = np.array([column.get(symbol, -1) for symbol in recorder.symbols], dtype=np.int64)
+    prices = np.array(recorder.prices, dtype=np.float64)
+    quantities = np.array(recorder.quantities, dtype=np.int64)
+    buy = quantities > 0
+
+    # prices file row of every order, -1 if its symbol has no book that tick
+    rows = int(day_data.row_start[-1])
+    row_of = np.full((n, len(day_data.symbols)), -1, dtype=np.int64)
+    row_of[np.repeat(np.arange(n), np.diff(day_data.row_start)), day_data.row_symbol[:rows]] = np.arange(rows)
+    order_rows = np.where(symbol_index >= 0, row_of[ticks, np.maximum(symbol_index, 0)], -1)
+    has_book = order_rows >= 0
+    book_rows = np.maximum(order_rows, 0)
+
+    ask_prices = day_data.ask_prices[book_rows, :PRICE_LEVELS]
+    bid_prices = day_data.bid_prices[book_rows, :PRICE_LEVELS]
+    # NaN compares False, missing levels don't count
+    crossing = np.where(
+        buy[:, None],
+        (ask_prices > 0) & (ask_prices <= prices[:, None]),
+        (bid_prices > 0) & (bid_prices >= prices[:, None]))
+    volumes = np.where(buy[:, None], day_data.ask_volumes[book_rows, :PRICE_LEVELS], day_data.bid_volumes[book_rows, :PRICE_LEVELS])
+    available = np.where(crossing, np.nan_to_num(volumes), 0).sum(axis=1).astype(np.int64)
+    certain = np.where(has_book, np.minimum(np.abs(quantities), available), 0)
+    remaining = np.where(has_book, np.abs(quantities) - certain, 0)
+
+    mid_index = day_data.mid_index()
+    safe_index = np.maximum(symbol_index, 0)
+    distance = np.where(buy, mid_index.best_bid[ticks, safe_index] - prices, prices - mid_index.best_ask[ticks, safe_index])
+    resting = has_book & (available == 0) & ~np.isnan(distance)
+    book_probability = np.where(resting, np.minimum(queue_fill * distance_decay ** np.nan_to_num(distance), 1.0), 0.0)
+
+    trade_book = day_data.trade_book()
+    next_volume = np.array([
+        trade_book.following(time, symbol).get(price, 0)
+        for time, symbol, price in zip(recorder.times, recorder.symbols, recorder.prices)
+    ], dtype=np.float64)
+    trade_probability = np.minimum(trade_share * next_volume / np.maximum(remaining, 1), 1.0)
+
+    probability = np.where(has_book, 1 - (1 - book_probability) * (1 - trade_probability), 0.0)
+    return ticks, certain, np.where(remaining > 0, probability, 0.0)
+
+
+def _within_limits(fills: np.ndarray, ticks: np.ndarray, limit: int) -> np.ndarray:
+    """
+    The fills (orders of one symbol x seeds) the engine would accept: a fill
+    that would take the position past the limit is dropped together with
+    all following fills of the symbol in that tick.
+    """
+    positions = np.cumsum(fills, axis=0, dtype=fills.dtype)
+    exceeded = (np.abs(positions) > limit).any(axis=1)
+    if not exceeded.any():
+        return fills
+    # everything before the first order that exceeds the limit in any seed stays
+    first = int(exceeded.argmax())
+    accepted = fills.copy()
+    position = positions[first - 1].copy() if first > 0 else np.zeros(fills.shape[1], dtype=fills.dtype)
+    failed = np.zeros(fills.shape[1], dtype=bool)
+    ticks = ticks.tolist()
+    tick = ticks[first]
+    for j in range(first, len(fills)):
+        if ticks[j] != tick:
+            tick = ticks[j]
+            failed[:] = False
+        fill = fills[j]
+        ok = np.abs(position + fill) <= limit
+        ok &= ~failed
+        fill = fill * ok
+        failed |= fills[j] != fill
+        accepted[j] = fill
+        position += fill
+    return accepted
+
+
+def monte_carlo_pnl(
+        day_data: DayData,
+        round: int,
+        recorder: OrderRecorder,
+        seeds=1000,
+        seed: int | None = None,
+        queue_fill=QUEUE_FILL,
+        distance_decay=DISTANCE_DECAY,
+        trade_share=TRADE_SHARE,
+    ) -> dict[str, np.ndarray]:
+    """
+    Draws the fills of the recorded orders for all seeds at once (one
+    uniform number per order and seed, the uncertain volume of an order is
+    filled completely or not at all) and returns per symbol the pnl of every
+    seed. Positions left are liquidated at the mid price of the last tick
+    like in the backtester.
+    """
+    rng = np.random.default_rng(seed)
+    ticks, certain, probability = fill_probabilities(day_data, recorder, queue_fill, distance_decay, trade_share)
+    quantities = np.array(recorder.quantities, dtype=np.int32)
+    signs = np.sign(quantities)
+    prices = np.array(recorder.prices, dtype=np.float64)
+    order_symbols = np.array(recorder.symbols, dtype=object)
+
+    round_symbols = SYMBOLS_BY_ROUND_POSITIONABLE[round]
+    last_mids = day_data.mid_index().fallback_mids(round_symbols)[-1]
+    pnl: dict[str, np.ndarray] = {}
+    for k, symbol in enumerate(round_symbols):
+        if symbol not in day_data.positionable:
+            continue
+        pnl[symbol] = np.zeros(seeds)
+        columns = np.flatnonzero(order_symbols == symbol)
+        if len(columns) == 0:
+            continue
+        # orders x seeds, so the limit check walks over contiguous rows
+        full = quantities[columns, None]
+        sure = (certain[columns] * signs[columns]).astype(np.int32)[:, None]
+        order_probability = probability[columns, None].astype(np.float32)
+        values = last_mids[k] - prices[columns]
+        for start in range(0, seeds, SEED_BATCH):
+            batch = min(SEED_BATCH, seeds - start)
+            filled = rng.random((len(columns), batch), dtype=np.float32) < order_probability
+            fills = _within_limits(np.where(filled, full, sure), ticks[columns], current_limits[symbol])
+            pnl[symbol][start:start + batch] = values @ fills
+    return pnl
+
+
+def simulate_monte_carlo(
+        round: int,
+        day: int,
+        trader,
+        seeds=1000,
+        seed: int | None = None,
+        time_limit=999900,
+        names=True,
+        matching=MATCH_EXACT,
+        day_data: DayData | None = None,
+        queue_fill=QUEUE_FILL,
+        distance_decay=DISTANCE_DECAY,
+        trade_share=TRADE_SHARE,
+    ) -> dict[str, np.ndarray]:
+    """
+    Runs the trader once with the given matching mode and records its
+    orders, then fills that same order stream with the probabilistic fill
+    model for every seed (see fill_probabilities). The trader doesn't see
+    the random fills, its orders are those of the recorded run.
+    Returns per symbol the pnl of every seed, see pnl_distribution.
+    """
+    if day_data is None:
+        day_data = load_day_data(round, day, names, time_limit)
+    recorder = OrderRecorder(trader)
+    recorded_pnl = simulate_alternative(round, day, recorder, time_limit, names, write_log=False, day_data=day_data, matching=matching)
+    print(f'{len(recorder.quantities)} orders, pnl with {matching} matching {sum(recorded_pnl.values())}')
+    return monte_carlo_pnl(day_data, round, recorder, seeds, seed, queue_fill, distance_decay, trade_share)
+
+
+# One row per symbol and the total with mean, std and quantiles of the pnl over the seeds
+def pnl_distribution(pnl: dict[str, np.ndarray], quantiles: list[float] = QUANTILES) -> pd.DataFrame:
+    rows = dict(pnl)
+    rows['total'] = np.sum(list(pnl.values()), axis=0)
+    table = {}
+    for symbol, values in rows.items():
+        row = { 'mean': values.mean(), 'std': values.std() }
+        row.update({ f'q{q * 100:g}': value for q, value in zip(quantiles, np.quantile(values, quantiles).tolist()) })
+        table[symbol] = row
+    return pd.DataFrame.from_dict(table, orient='index')
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description='PnL distribution of a trader under a probabilistic fill model.')
+    parser.add_argument('--round', type=int, required=True)
+    parser.add_argument('--day', type=int, required=True)
+    parser.add_argument('--trader', help='module:Class or path/to/module.py:Class (default: the Trader imported by backtester.py)')
+    parser.add_argument('--seeds', type=int, default=1000, help='number of simulated fill sequences (default: 1000)')
+    parser.add_argument('--seed', type=int, help='seed of the first draw, random if not given')
+    parser.add_argument('--names', type=yes_no, default=True, help='with bot names y/n (default: y)')
+    parser.add_argument('--time-limit', type=int, default=999900, help='max timestamp (default: 999900)')
+    parser.add_argument('--matching', choices=MATCHING_MODES, default=MATCH_EXACT, help='matching of the run that records the orders (default: exact)')
+    parser.add_argument('--queue-fill', type=float, default=QUEUE_FILL, help=f'fill chance per tick at the touch (default: {QUEUE_FILL})')
+    parser.add_argument('--distance-decay', type=float, default=DISTANCE_DECAY, help=f'factor per price unit from the touch (default: {DISTANCE_DECAY})')
+    parser.add_argument('--trade-share', type=float, default=TRADE_SHARE, help=f'share of market trades at the order price (default: {TRADE_SHARE})')
+    args = parser.parse_args(argv)
+
+    trader_class = load_trader_class(args.trader) if args.trader else Trader
+    pnl = simulate_monte_carlo(
+        args.round, args.day, trader_class(), args.seeds, args.seed, args.time_limit, args.names, args.matching,
+        queue_fill=args.queue_fill, distance_decay=args.distance_decay, trade_share=args.trade_share)
+    print(pnl_distribution(pnl).to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+from datamodel import Trade
+from market_data import DayData
+import numpy as np
+
+
+class ParticipantPnL:
+    """
+    Positions and PnL of every named participant of a trades file (the
+    monkeys) with the same accounting as the trader, see README.
+    All arrays have the shape (participant, tick, symbol) and hold the
+    values after the trades of that tick:
+
+    * positions: position of the participant
+    * profits: realized pnl, at the last tick everything left is liquidated
+    * balance: credit + unrealized, 0 at the last tick
+    * credit: cash spent/received for the open position
+    * unrealized: value of the position at the mid price
+    * pnl: profits + balance (before liquidating)
+    """
+
+    def __init__(self, day_data: DayData, symbols: list[str], names: list[str] | None = None, mids: np.ndarray | None = None):
+        if names is None:
+            names = [name for name in day_data.names if name != 'nan']
+        if mids is None:
+            mids = day_data.mid_index().fallback_mids(symbols)
+        self.names = names
+        self.symbols = symbols
+        self.timestamps = day_data.timestamps
+        self.day_data = day_data
+        n = len(day_data)
+        shape = (len(names), n, len(symbols))
+
+        # symbol/participant codes of the day data -> columns here, -1 if not tracked
+        symbol_column = np.array([symbols.index(s) if s in symbols else -1 for s in day_data.symbols], dtype=np.int64)
+        name_row = np.array([names.index(name) if name in names else -1 for name in day_data.names], dtype=np.int64)
+        trades = int(day_data.trade_start[-1])
+        tick = np.repeat(np.arange(n), np.diff(day_data.trade_start))
+        column = symbol_column[day_data.trade_symbol[:trades]]
+        quantity = day_data.trade_quantity[:trades]
+        cash = -day_data.trade_price[:trades] * quantity
+
+        traded = np.zeros(n * len(symbols) * len(names), dtype=np.int64)
+        cash_flow = np.zeros(traded.shape)
+        # buyers get the quantity and pay for it, sellers the other way round
+        for side, sign in [(day_data.trade_buyer, 1), (day_data.trade_seller, -1)]:
+            row = name_row[side[:trades]]
+            keep = (row >= 0) & (column >= 0)
+            flat = np.ravel_multi_index((row[keep], tick[keep], column[keep]), shape)
+            traded += sign * np.bincount(flat, weights=quantity[keep], minlength=traded.size).astype(np.int64)
+            cash_flow += sign * np.bincount(flat, weights=cash[keep], minlength=cash_flow.size)
+        self.positions = np.cumsum(traded.reshape(shape), axis=1)
+        total_cash = np.cumsum(cash_flow.reshape(shape), axis=1)
+        self.unrealized = mids[None, :, :] * self.positions
+
+        # A position counts as closed like in the old per monkey loop: it is
+        # compared with the position two ticks back, not the previous one.
+        before = np.zeros(shape, dtype=np.int64)
+        before[:, 2:] = self.positions[:, :-2]
+        closed = (self.positions == 0) & (before != 0)
+        # every close moves the credit since the last close into profits,
+        # so profits are the total cash up to the last close
+        ticks = np.arange(n)[None, :, None]
+        last_close = np.maximum.accumulate(np.where(closed, ticks, -1), axis=1)
+        self.profits = np.where(last_close >= 0, np.take_along_axis(total_cash, np.maximum(last_close, 0), axis=1), 0.0)
+        self.credit = total_cash - self.profits
+        self.balance = np.where(closed, 0.0, self.credit + self.unrealized)
+        self.pnl = self.profits + self.balance
+        if n > 0:
+            self.profits[:, -1] += self.credit[:, -1] + self.unrealized[:, -1]
+            self.balance[:, -1] = 0.0
+
+    def at(self, series: np.ndarray, i: int) -> dict[str, dict[str, float]]:
+        return { name: dict(zip(self.symbols, series[p, i].tolist())) for p, name in enumerate(self.names) }
+
+    def final_pnl(self) -> dict[str, dict[str, float]]:
+        return self.at(self.pnl, len(self.timestamps) - 1)
+
+    def trades_at(self, i: int) -> dict[str, list[Trade]]:
+        # market trades of one tick by participant, sells have a negative quantity
+        trades: dict[str, list[Trade]] = { name: [] for name in self.names }
+        day_data = self.day_data
+        start, end = day_data.trade_start[i], day_data.trade_start[i + 1]
+        for symbol in self.symbols:
+            for k in range(start, end):
+                if day_data.symbols[day_data.trade_symbol[k]] != symbol:
+                    continue
+                price = float(day_data.trade_price[k])
+                quantity = int(day_data.trade_quantity[k])
+                buyer = day_data.names[day_data.trade_buyer[k]]
+                seller = day_data.names[day_data.trade_seller[k]]
+                if buyer in trades:
+                    trades[buyer].append(Trade(symbol, price, quantity))
+                if seller in trades:
+                    trades[seller].append(Trade(symbol, price, -quantity))
+        return trades
+
+
+def main(argv: list[str] | None = None):
+    import argparse
+    from backtester import SYMBOLS_BY_ROUND_POSITIONABLE, load_day_data
+    from backtester import available_days
+    import pandas as pd
+
+    parser = argparse.ArgumentParser(description='Final PnL of every named participant in the trades files.')
+    parser.add_argument('--rounds', type=int, nargs='+', help='rounds to run (default: all with training data)')
+    parser.add_argument('--days', type=int, nargs='+', help='days to run (default: all with training data)')
+    parser.add_argument('--out', help='write the table as csv to this path')
+    args = parser.parse_args(argv)
+
+    rows = []
+    for round, day in available_days():
+        if (args.rounds is not None and round not in args.rounds) or (args.days is not None and day not in args.days):
+            continue
+        symbols = SYMBOLS_BY_ROUND_POSITIONABLE[round]
+        participants = ParticipantPnL(load_day_data(round, day, True), symbols)
+        last = len(participants.timestamps) - 1
+        for p, name in enumerate(participants.names):
+            row = { 'round': round, 'day': day, 'name': name }
+            row.update(zip(symbols, participants.pnl[p, last].tolist()))
+            row['traded'] = int(np.abs(np.diff(participants.positions[p], axis=0, prepend=0)).sum())
+            rows.append(row)
+    df = pd.DataFrame(rows)
+    print(df.to_string())
+    if args.out:
+        df.to_csv(args.out, index=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+from backtester import load_day_data, new_log_path, open_log, sandbox_log_line, write_activities, write_log_header
+from ledger import RunSeries
+from matching import MATCH_EXACT
+from typing import Any
+import numpy as np
+import argparse
+import functools
+import hashlib
+import inspect
+import json
+import sqlite3
+import sys
+import time
+import zlib
+
+RESULTS_DB = 'results.db'
+SERIES_COMPRESSLEVEL = 6
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    created REAL NOT NULL,
+    trader TEXT NOT NULL,
+    trader_hash TEXT NOT NULL,
+    params TEXT NOT NULL,
+    config TEXT NOT NULL,
+    round INTEGER NOT NULL,
+    day INTEGER NOT NULL,
+    names INTEGER NOT NULL,
+    matching TEXT NOT NULL,
+    time_limit INTEGER NOT NULL,
+    seconds REAL,
+    total REAL NOT NULL,
+    stopped TEXT,
+    latest INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_round ON runs (round, day);
+CREATE INDEX IF NOT EXISTS runs_config ON runs (config, round, day);
+CREATE INDEX IF NOT EXISTS runs_latest ON runs (round, config, total) WHERE latest = 1 AND stopped IS NULL;
+CREATE TABLE IF NOT EXISTS pnl (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    symbol TEXT NOT NULL,
+    pnl REAL NOT NULL,
+    PRIMARY KEY (run_id, symbol)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS pnl_symbol ON pnl (symbol, run_id, pnl);
+CREATE TABLE IF NOT EXISTS series (
+    run_id INTEGER PRIMARY KEY REFERENCES runs (id) ON DELETE CASCADE,
+    symbols TEXT NOT NULL,
+    start INTEGER NOT NULL,
+    end INTEGER NOT NULL,
+    timestamps BLOB NOT NULL,
+    pnl BLOB NOT NULL,
+    positions BLOB NOT NULL,
+    sandbox BLOB
+);
+"""
+
+
+# module:Class of the trader and a hash of its module source, changes with every edit
+@functools.cache
+def _class_identity(trader_class: type) -> tuple[str, str]:
+    name = f'{trader_class.__module__}:{trader_class.__qualname__}'
+    try:
+        source = inspect.getsource(sys.modules[trader_class.__module__])
+    except (KeyError, OSError, TypeError):
+        source = name
+    return name, hashlib.sha256(source.encode()).hexdigest()[:16]
+
+def trader_identity(trader) -> tuple[str, str]:
+    return _class_identity(trader if isinstance(trader, type) else type(trader))
+
+
+# The sandbox logs of the trader's logger, None without one (the export writes the timestamps only then)
+def sandbox_logs(trader, series: RunSeries) -> str | None:
+    if not hasattr(trader, 'logger'):
+        return None
+    return ''.join(sandbox_log_line(time, trader) for time in series.timestamps[series.start:series.end].tolist())
+
+
+def _pack(array: np.ndarray) -> bytes:
+    return zlib.compress(np.ascontiguousarray(array).tobytes(), SERIES_COMPRESSLEVEL)
+
+def _unpack(blob: bytes, dtype, shape: tuple[int, ...]) -> np.ndarray:
+    return np.frombuffer(zlib.decompress(blob), dtype=dtype).reshape(shape)
+
+
+class ResultsStore:
+    """
+    Runs in a SQLite file: the metadata of every run (trader and the hash of
+    its source, params, round, day, matching, seconds), the final pnl per
+    symbol in the indexed pnl table and optionally the per tick series
+    (RunSeries) as compressed blobs, which export_log turns back into a
+    log file.
+    A config is a trader version (hash) with its params, matching mode,
+    names and time limit, best ranks configs by their mean pnl per day (the
+    latest run of a day counts), so configs run on more days don't win by
+    having more days.
+    """
+
+    def __init__(self, path=RESULTS_DB):
+        self.path = path
+        self.connection = sqlite3.connect(path, timeout=30)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA foreign_keys=ON')
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def add_run(
+            self,
+            round: int,
+            day: int,
+            pnl: dict[str, float],
+            trader: tuple[str, str],
+            params: dict[str, Any] | None = None,
+            names=True,
+            matching=MATCH_EXACT,
+            time_limit=999900,
+            seconds: float | None = None,
+            series: RunSeries | None = None,
+            sandbox: str | None = None,
+            stopped: str | None = None,
+        ) -> int:
+        # trader is (name, hash) from trader_identity, stopped the reason a run
+        # was stopped early (RiskMetrics.summary), returns the id of the run
+        name, trader_hash = trader
+        params_json = json.dumps(params or {}, sort_keys=True, default=repr)
+        config = hashlib.sha256(json.dumps([trader_hash, params_json, int(names), matching, time_limit]).encode()).hexdigest()[:16]
+        with self.connection:
+            # only the latest run of a config on a day counts in best
+            self.connection.execute('UPDATE runs SET latest = 0 WHERE config = ? AND round = ? AND day = ? AND latest = 1', (config, round, day))
+            cursor = self.connection.execute(
+                'INSERT INTO runs (created, trader, trader_hash, params, config, round, day, names, matching, time_limit, seconds, total, stopped, latest) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1)',
+                (time.time(), name, trader_hash, params_json, config, round, day, int(names), matching, time_limit, seconds, sum(pnl.values()), stopped))
+            run_id = cursor.lastrowid
+            self.connection.executemany('INSERT INTO pnl (run_id, symbol, pnl) VALUES (?, ?, ?)', [(run_id, symbol, value) for symbol, value in pnl.items()])
+            if series is not None:
+                self.connection.execute(
+                    'INSERT INTO series (run_id, symbols, start, end, timestamps, pnl, positions, sandbox) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                    (run_id, json.dumps(series.symbols), series.start, series.end, _pack(series.timestamps.astype(np.int64)), _pack(series.pnl.astype(np.float64)),
+                     _pack(series.positions.astype(np.int32)), None if sandbox is None else zlib.compress(sandbox.encode(), SERIES_COMPRESSLEVEL)))
+        return run_id
+
+    def best(self, round: int | None = None, symbol: str | None = None, limit=20, trader: str | None = None) -> list[dict[str, Any]]:
+        """
+        The limit best configs by pnl of symbol (total pnl without one) per
+        day, the mean over their days of round (all rounds without one).
+        Every row has the number of days, the mean (mean_pnl) and the sum
+        (pnl), compare the days when they differ. Stopped runs don't count.
+        trader only keeps runs of that module:Class.
+        """
+        where = ['runs.latest = 1', 'runs.stopped IS NULL']
+        values: list[Any] = []
+        if symbol is None:
+            source = 'runs'
+            pnl = 'runs.total'
+        else:
+            source = 'pnl JOIN runs ON runs.id = pnl.run_id'
+            pnl = 'pnl.pnl'
+            where.append('pnl.symbol = ?')
+            values.append(symbol)
+        if round is not None:
+            where.append('runs.round = ?')
+            values.append(round)
+        if trader is not None:
+            where.append('runs.trader = ?')
+            values.append(trader)
+        # ranked on the indexes alone, the metadata is only read for the configs returned
+        rows = self.connection.execute(
+            'SELECT runs.config, runs.trader, runs.trader_hash, runs.params, runs.matching, runs.names, runs.time_limit, best.days, best.mean_pnl, best.pnl FROM ('
+            f'SELECT COUNT(*) AS days, AVG({pnl}) AS mean_pnl, SUM({pnl}) AS pnl, MAX(runs.id) AS id FROM {source} WHERE ' + ' AND '.join(where) +
+            ' GROUP BY runs.config ORDER BY mean_pnl DESC LIMIT ?) AS best JOIN runs ON runs.id = best.id ORDER BY best.mean_pnl DESC',
+            values + [limit])
+        return [dict(row) for row in rows]
+
+    def runs(self, round: int | None = None, day: int | None = None, trader_hash: str | None = None, config: str | None = None, limit=100) -> list[dict[str, Any]]:
+        # newest first, with the final pnl of every symbol
+        where = []
+        values: list[Any] = []
+        for column, value in [('round', round), ('day', day), ('trader_hash', trader_hash), ('config', config)]:
+            if value is not None:
+                where.append(f'{column} = ?')
+                values.append(value)
+        rows = [dict(row) for row in self.connection.execute(
+            'SELECT * FROM runs' + (' WHERE ' + ' AND '.join(where) if where else '') + ' ORDER BY id DESC LIMIT ?', values + [limit])]
+        for row in rows:
+            for symbol, value in self.connection.execute('SELECT symbol, pnl FROM pnl WHERE run_id = ? ORDER BY symbol', (row['id'],)):
+                row[symbol] = value
+        return rows
+
+    def run(self, run_id: int) -> dict[str, Any]:
+        row = self.connection.execute('SELECT * FROM runs WHERE id = ?', (run_id,)).fetchone()
+        if row is None:
+            raise KeyError(run_id)
+        return dict(row)
+
+    def series(self, run_id: int) -> RunSeries:
+        row = self.connection.execute('SELECT * FROM series WHERE run_id = ?', (run_id,)).fetchone()
+        if row is None:
+            raise KeyError(f'Run {run_id} has no stored series')
+        series = RunSeries()
+        series.symbols = json.loads(row['symbols'])
+        series.start = row['start']
+        series.end = row['end']
+        series.timestamps = _unpack(row['timestamps'], np.int64, (-1,))
+        shape = (len(series.timestamps), len(series.symbols))
+        series.pnl = _unpack(row['pnl'], np.float64, shape)
+        series.positions = _unpack(row['positions'], np.int32, shape).astype(np.int64)
+        return series
+
+    def export_log(self, run_id: int, compress=False) -> str:
+        """
+        Writes the log file of a run with stored series, like the
+        backtester would have (the day is loaded again for the order books).
+        Returns its path.
+        """
+        run = self.run(run_id)
+        series = self.series(run_id)
+        sandbox = self.connection.execute('SELECT sandbox FROM series WHERE run_id = ?', (run_id,)).fetchone()['sandbox']
+        day_data = load_day_data(run['round'], run['day'], bool(run['names']), run['time_limit'])
+        log_path = new_log_path(compress)
+        with open_log(log_path) as f:
+            write_log_header(f)
+            f.write('\n')
+            if sandbox is None:
+                f.writelines(sandbox_log_line(time, None) for time in series.timestamps[series.start:series.end].tolist())
+            else:
+                f.write(zlib.decompress(sandbox).decode())
+            write_activities(f, run['round'], run['day'], day_data, series.symbols, series.pnl, series.start, series.end)
+        return log_path
+
+
+def _print_rows(rows: list[dict[str, Any]]):
+    import pandas as pd
+
+    print(pd.DataFrame(rows).to_string(index=False) if rows else 'No runs')
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description='Query the stored backtest runs.')
+    parser.add_argument('--db', default=RESULTS_DB, help='results file (default: %(default)s)')
+    commands = parser.add_subparsers(dest='command', required=True)
+    best = commands.add_parser('best', help='best configs by mean pnl per day')
+    best.add_argument('--round', type=int)
+    best.add_argument('--symbol', help='rank by the pnl of this symbol (default: total)')
+    best.add_argument('--trader', help='only runs of this module:Class')
+    best.add_argument('--limit', type=int, default=20)
+    runs = commands.add_parser('runs', help='latest runs')
+    runs.add_argument('--round', type=int)
+    runs.add_argument('--day', type=int)
+    runs.add_argument('--trader-hash')
+    runs.add_argument('--config', help='only runs of this config (see best)')
+    runs.add_argument('--limit', type=int, default=20)
+    export = commands.add_parser('export', help='write the log file of a run')
+    export.add_argument('run_id', type=int)
+    export.add_argument('--compress', action='store_true', help='write the log file gzipped')
+    args = parser.parse_args(argv)
+
+    with ResultsStore(args.db) as store:
+        if args.command == 'best':
+            _print_rows(store.best(args.round, args.symbol, args.limit, args.trader))
+        elif args.command == 'runs':
+            _print_rows(store.runs(args.round, args.day, args.trader_hash, args.config, args.limit))
+        else:
+            print(store.export_log(args.run_id, args.compress))
+
+
+if __name__ == "__main__":
+    main()
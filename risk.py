@@ -0,0 +1,123 @@
+from collections import deque
+from typing import Any
+import math
+
+# Ticks of the rolling sharpe ratio, the ratio rules only apply once that many ticks ran
+SHARPE_WINDOW = 100
+# A run stops as soon as one of its rules is broken:
+# max_drawdown above, pnl below, sharpe (rolling, per tick) below,
+# rejected (fills over the position limit) above, at_limit (share of ticks
+# ending with a position at its limit) above
+STOP_RULES = ['max_drawdown', 'pnl', 'sharpe', 'rejected', 'at_limit']
+
+
+class RiskMetrics:
+    """
+    Risk of one simulation, updated with O(1) work per tick, pass it as
+    simulate_alternative(..., risk=RiskMetrics({'max_drawdown': 5000})) and
+    read it afterwards.
+
+    * pnl: total pnl of the last tick, as in the log file
+    * max_drawdown: largest fall of pnl from its high so far
+    * sharpe: mean / std of the pnl changes of the last window ticks
+    * volume, turnover: traded quantity and value
+    * ticks_at_limit: ticks that ended with a position at its limit
+    * rejected: fills dropped because of the position limit (the failing one and all after it)
+
+    With stop_rules the run ends after the first tick that breaks one of them,
+    stopped is then (timestamp, reason). The pnl of a stopped run is that
+    of its last tick, nothing is liquidated. A resumed run starts from the
+    pnl of its checkpoint, the ticks before it are not counted.
+    """
+
+    def __init__(self, stop_rules: dict[str, float] | None = None, window=SHARPE_WINDOW):
+        for name in stop_rules or {}:
+            if name not in STOP_RULES:
+                raise ValueError(f'Unknown stop rule {name}, use one of {STOP_RULES}')
+        self.stop_rules = stop_rules or {}
+        self.window = window
+        self.ticks = 0
+        self.pnl = 0.0
+        self.peak = 0.0
+        self.max_drawdown = 0.0
+        self.changes: deque[float] = deque()
+        self.change_sum = 0.0
+        self.change_squares = 0.0
+        self.volume = 0
+        self.turnover = 0.0
+        self.ticks_at_limit = 0
+        self.rejected = 0
+        self.stopped: tuple[int, str] | None = None
+
+    def begin(self, pnl: float):
+        # pnl the run starts with (that of its checkpoint when resumed), the first change and the drawdown count from it
+        self.pnl = pnl
+        self.peak = pnl
+
+    @property
+    def sharpe(self) -> float:
+        n = len(self.changes)
+        if n < self.window:
+            return math.nan
+        mean = self.change_sum / n
+        variance = self.change_squares / n - mean * mean
+        return mean / math.sqrt(variance) if variance > 1e-12 else math.nan
+
+    def update(self, time: int, pnl: float, position: dict[str, int], limits: dict[str, int], trades: list, rejected: int):
+        # trades are the fills of the tick, position the one after them
+        self.ticks += 1
+        change = pnl - self.pnl
+        self.pnl = pnl
+        self.peak = max(self.peak, pnl)
+        self.max_drawdown = max(self.max_drawdown, self.peak - pnl)
+        self.changes.append(change)
+        self.change_sum += change
+        self.change_squares += change * change
+        if len(self.changes) > self.window:
+            old = self.changes.popleft()
+            self.change_sum -= old
+            self.change_squares -= old * old
+        for trade in trades:
+            self.volume += abs(trade.quantity)
+            self.turnover += abs(trade.price * trade.quantity)
+        if any(abs(quantity) >= limits[symbol] for symbol, quantity in position.items() if symbol in limits):
+            self.ticks_at_limit += 1
+        self.rejected += rejected
+        if self.stop_rules and self.stopped is None:
+            reason = self.broken_rule()
+            if reason is not None:
+                self.stopped = (time, reason)
+
+    def broken_rule(self) -> str | None:
+        rules = self.stop_rules
+        if 'max_drawdown' in rules and self.max_drawdown > rules['max_drawdown']:
+            return f"max_drawdown {self.max_drawdown:g} > {rules['max_drawdown']:g}"
+        if 'pnl' in rules and self.pnl < rules['pnl']:
+            return f"pnl {self.pnl:g} < {rules['pnl']:g}"
+        if 'rejected' in rules and self.rejected > rules['rejected']:
+            return f"rejected {self.rejected} > {rules['rejected']:g}"
+        if self.ticks >= self.window:
+            if 'sharpe' in rules and self.sharpe < rules['sharpe']:
+                return f"sharpe {self.sharpe:.3f} < {rules['sharpe']:g}"
+            if 'at_limit' in rules and self.ticks_at_limit / self.ticks > rules['at_limit']:
+                return f"at_limit {self.ticks_at_limit / self.ticks:.2f} > {rules['at_limit']:g}"
+        return None
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            'max_drawdown': self.max_drawdown,
+            'sharpe': self.sharpe,
+            'volume': self.volume,
+            'turnover': self.turnover,
+            'ticks_at_limit': self.ticks_at_limit,
+            'rejected': self.rejected,
+            'stopped': None if self.stopped is None else f'{self.stopped[1]} at {self.stopped[0]}',
+        }
+
+
+def parse_stop_rule(text: str) -> tuple[str, float]:
+    # name=value, e.g. max_drawdown=5000
+    name, _, value = text.partition('=')
+    if name not in STOP_RULES:
+        raise ValueError(f'Unknown stop rule {name}, use one of {STOP_RULES}')
+    return name, float(value)
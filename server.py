@@ -0,0 +1,235 @@
+from backtester import DEFAULT_TRADER, available_days, load_day_data, load_trader_class, simulate_alternative, yes_no
+from market_data import DayData
+from matching import MATCH_EXACT, MATCH_TRADES, MATCHING_MODES, TRADE_SHARE
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+import argparse
+import contextlib
+import importlib
+import importlib.util
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+import traceback
+
+SERVER_PORT = 8765
+# Seconds between two checks of the trader file
+POLL_INTERVAL = 0.5
+
+# The server whose runs the forked workers do, they inherit its loaded days
+_server: 'BacktestServer | None' = None
+
+
+def _run_day(job: tuple[int, int]) -> dict[str, Any]:
+    round, day = job
+    server = _server
+    start = time.perf_counter()
+    try:
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            pnl = simulate_alternative(
+                round, day, server.trader_class(), server.time_limit, server.names,
+                write_log=False, day_data=server.days[job], matching=server.matching, trade_share=server.trade_share)
+        error = None
+    except Exception:
+        pnl = {}
+        error = traceback.format_exc()
+    return { 'round': round, 'day': day, 'pnl': pnl, 'total': sum(pnl.values()), 'seconds': time.perf_counter() - start, 'error': error }
+
+
+class BacktestServer:
+    """
+    Keeps the days of the jobs loaded and runs them again whenever the
+    trader file changes (watch) or a run is requested over HTTP (serve).
+    Every run re-imports the trader module and runs the days in forked
+    workers, which share the loaded data with the server, so a rerun only
+    costs the simulation. Without fork (Windows) the days run one after the
+    other in the server process.
+    """
+
+    def __init__(
+            self,
+            trader: str,
+            jobs: list[tuple[int, int]],
+            names=True,
+            matching=MATCH_EXACT,
+            time_limit=999900,
+            trade_share=TRADE_SHARE,
+            workers: int | None = None,
+        ):
+        self.trader = trader
+        self.jobs = jobs
+        self.names = names
+        self.matching = matching
+        self.time_limit = time_limit
+        self.trade_share = trade_share
+        self.workers = workers or os.cpu_count() or 1
+        self.days: dict[tuple[int, int], DayData] = {}
+        self.module = None
+        self.trader_class = None
+        self.results: list[dict[str, Any]] = []
+        self.lock = threading.Lock()
+        # trader file and its mtime at the last check
+        self.path: str | None = None
+        self.mtime: int | None = None
+
+    def load(self):
+        start = time.perf_counter()
+        for round, day in self.jobs:
+            day_data = load_day_data(round, day, self.names, self.time_limit)
+            # built once here instead of in every run
+            day_data.mid_index()
+            if self.matching == MATCH_TRADES:
+                day_data.trade_book()
+            self.days[(round, day)] = day_data
+        print(f'Loaded {len(self.jobs)} days in {time.perf_counter() - start:.2f}s')
+
+    def reload_trader(self):
+        if self.module is None:
+            self.trader_class = load_trader_class(self.trader)
+            self.module = sys.modules[self.trader_class.__module__]
+        else:
+            self.module = importlib.reload(self.module)
+            self.trader_class = getattr(self.module, self.trader.partition(':')[2] or 'Trader')
+
+    def trader_path(self) -> str | None:
+        # from the spec, so it is known even if the trader never imported
+        module_name = self.trader.partition(':')[0]
+        if module_name.endswith('.py'):
+            return os.path.abspath(module_name)
+        if self.module is not None:
+            return getattr(self.module, '__file__', None)
+        try:
+            spec = importlib.util.find_spec(module_name)
+        except (ImportError, ValueError):
+            return None
+        return None if spec is None else spec.origin
+
+    def check(self) -> bool:
+        # runs again if the trader file changed since the last check
+        if self.path is None:
+            self.path = self.trader_path()
+            if self.path is None:
+                return False
+        try:
+            current = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return False
+        if current == self.mtime:
+            return False
+        self.mtime = current
+        self.run()
+        return True
+
+    def run(self) -> list[dict[str, Any]]:
+        global _server
+        with self.lock:
+            start = time.perf_counter()
+            try:
+                self.reload_trader()
+            except Exception:
+                traceback.print_exc()
+                print('Trader could not be imported, waiting for the next change')
+                return self.results
+            _server = self
+            if 'fork' in multiprocessing.get_all_start_methods() and len(self.jobs) > 1 and self.workers > 1:
+                with multiprocessing.get_context('fork').Pool(min(self.workers, len(self.jobs))) as pool:
+                    results = pool.map(_run_day, self.jobs)
+            else:
+                results = [_run_day(job) for job in self.jobs]
+            previous = { (result['round'], result['day']): result['total'] for result in self.results }
+            for result in results:
+                result['previous'] = previous.get((result['round'], result['day']))
+            self.results = results
+            print(diff_table(results))
+            print(f'Run took {time.perf_counter() - start:.2f}s')
+            return results
+
+    def watch(self, interval=POLL_INTERVAL):
+        # runs once, then again on every change of the trader file until interrupted
+        self.check()
+        print(f'Watching {self.path}')
+        while True:
+            time.sleep(interval)
+            self.check()
+
+    def serve(self, port=SERVER_PORT) -> ThreadingHTTPServer:
+        """
+        Answers on localhost:port in a background thread,
+        GET /run runs the days now and GET /results returns the last
+        results, both as json.
+        """
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == '/run':
+                    body = server.run()
+                elif self.path == '/results':
+                    body = server.results
+                else:
+                    self.send_error(404)
+                    return
+                data = json.dumps(body).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_POST = do_GET
+
+            def log_message(self, format, *args):
+                pass
+
+        http_server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        threading.Thread(target=http_server.serve_forever, daemon=True).start()
+        print(f'Listening on http://127.0.0.1:{port}/run')
+        return http_server
+
+
+# One line per day: total pnl, the one of the previous run and the difference
+def diff_table(results: list[dict[str, Any]]) -> str:
+    lines = [f'{"round":>5} {"day":>4} {"pnl":>12} {"previous":>12} {"diff":>12} {"seconds":>8}']
+    for result in results:
+        if result['error'] is not None:
+            lines.append(f'{result["round"]:>5} {result["day"]:>4} failed:\n{result["error"]}')
+            continue
+        previous = result['previous']
+        diff = '' if previous is None else f'{result["total"] - previous:+12.1f}'
+        previous = '' if previous is None else f'{previous:12.1f}'
+        lines.append(f'{result["round"]:>5} {result["day"]:>4} {result["total"]:12.1f} {previous:>12} {diff:>12} {result["seconds"]:8.2f}')
+    return '\n'.join(lines)
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description='Keep days loaded and rerun them whenever the trader changes.')
+    parser.add_argument('--trader', default=DEFAULT_TRADER, help='path/to/module.py:Class or module:Class (default: %(default)s)')
+    parser.add_argument('--rounds', type=int, nargs='+', required=True, help='rounds to run')
+    parser.add_argument('--days', type=int, nargs='+', help='days to run (default: all of the rounds with training data)')
+    parser.add_argument('--names', type=yes_no, default=True, help='with bot names y/n (default: y)')
+    parser.add_argument('--matching', choices=MATCHING_MODES, default=MATCH_EXACT, help='matching mode (default: %(default)s)')
+    parser.add_argument('--trade-share', type=float, default=TRADE_SHARE, help='share of crossing market trades with --matching trades (default: %(default)s)')
+    parser.add_argument('--time-limit', type=int, default=999900, help='last timestamp of every day (default: %(default)s)')
+    parser.add_argument('--workers', type=int, help='parallel days (default: number of cores)')
+    parser.add_argument('--port', type=int, default=SERVER_PORT, help='port of the http interface, 0 to turn it off (default: %(default)s)')
+    parser.add_argument('--interval', type=float, default=POLL_INTERVAL, help='seconds between checks of the trader file (default: %(default)s)')
+    args = parser.parse_args(argv)
+
+    jobs = [(round, day) for round, day in available_days() if round in args.rounds and (args.days is None or day in args.days)]
+    if not jobs:
+        parser.error('no training data for these rounds/days')
+    server = BacktestServer(args.trader, jobs, args.names, args.matching, args.time_limit, args.trade_share, args.workers)
+    server.load()
+    if args.port:
+        server.serve(args.port)
+    try:
+        server.watch(args.interval)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
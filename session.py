@@ -0,0 +1,165 @@
+from backtester import (
+    DAY_LENGTH, STREAMING_WINDOW, LogFileWriter, Trader, create_log_file, final_pnl, iter_trades_position_pnl,
+    load_day_data, load_trader_class, trades_position_pnl_run, yes_no,
+)
+from datamodel import TradingState
+from ledger import Ledger
+from market_data import DayData, DayStates
+from matching import MATCH_EXACT, MATCH_HALFWAY, MATCH_TRADES, MATCHING_MODES, TRADE_SHARE
+from collections.abc import Mapping
+from typing import Any, Callable
+import pandas as pd
+import argparse
+
+
+class SessionStates(Mapping):
+    """
+    The states of one day of a session. Timestamps after the last one of
+    the day lead to the first state of the next day, so the engine hands
+    the own trades and position of the last tick over to it. The next day
+    is only loaded when that happens.
+    """
+
+    def __init__(self, states: DayStates, load_next: Callable[[], DayStates]):
+        self.states = states
+        self.load_next = load_next
+        self.next: DayStates | None = None
+        self.last_time = int(states.day_data.timestamps[-1])
+
+    def next_states(self) -> DayStates:
+        if self.next is None:
+            self.next = self.load_next()
+        return self.next
+
+    def __getitem__(self, time: int) -> TradingState:
+        if time > self.last_time:
+            next_states = self.next_states()
+            return next_states[int(next_states.day_data.timestamps[0])]
+        return self.states[time]
+
+    def __iter__(self):
+        return iter(self.states)
+
+    def __len__(self) -> int:
+        return len(self.states)
+
+
+def simulate_session(
+        round: int,
+        days: list[int],
+        trader,
+        time_limit=999900,
+        names=True,
+        halfway=False,
+        streaming=False,
+        write_log=True,
+        matching: str | None = None,
+        compress_log=False,
+        trade_share=TRADE_SHARE,
+    ) -> list[dict[str, Any]]:
+    """
+    Runs the days of a round one after the other as one session: the same
+    trader and its positions carry over, the k-th day is shifted to start at
+    k * DAY_LENGTH and is loaded when the previous one finishes. Positions
+    are only liquidated at the end of the last day.
+    One log file per day, pnl in the logs is cumulative. Returns per day
+    its pnl (change over the day, marked at the mid price) and the
+    cumulative pnl, per symbol.
+    """
+    if matching is None:
+        matching = MATCH_HALFWAY if halfway else MATCH_EXACT
+
+    def load(k: int) -> DayStates:
+        day_data = load_day_data(round, days[k], names, time_limit).shifted(k * DAY_LENGTH)
+        return day_data.states(STREAMING_WINDOW if streaming else None)
+
+    results = []
+    cumulative: dict[str, float] = {}
+    carry = None
+    day_states = load(0)
+    for k, day in enumerate(days):
+        day_data: DayData = day_states.day_data
+        last_day = k == len(days) - 1
+        states: Mapping[int, TradingState] = day_states
+        if not last_day:
+            states = SessionStates(day_states, lambda k=k: load(k + 1))
+        max_time = int(day_data.timestamps[-1]) if last_day else None
+        ref_symbols = list(day_states[int(day_data.timestamps[0])].position.keys())
+        ledger = Ledger(ref_symbols, day_data.timestamps, keep_history=not streaming, carry=not last_day)
+        trade_book = day_data.trade_book() if matching == MATCH_TRADES else None
+        if carry is not None:
+            ledger.restore(0, carry)
+
+        if streaming:
+            ticks = iter_trades_position_pnl(
+                states, max_time, ledger, day_data.streaming_mids(), trader, round, matching, trade_book=trade_book, trade_share=trade_share)
+            if write_log:
+                with LogFileWriter(round, day, day_data, ref_symbols, trader, compress_log) as log_writer:
+                    for time, state in ticks:
+                        log_writer.write_tick(time, state, ledger.at(ledger.profits, time), ledger.at(ledger.balance, time))
+            else:
+                for _ in ticks:
+                    pass
+        else:
+            trades_position_pnl_run(
+                states, max_time, ledger, day_data.mid_index(), trader, round, matching, trade_book=trade_book, trade_share=trade_share)
+            if write_log:
+                create_log_file(round, day, day_data, ledger, trader, compress_log)
+
+        if last_day:
+            end = final_pnl(ledger.at(ledger.profits, max_time), ledger.at(ledger.balance, max_time))
+        else:
+            # the values the next day starts with, after the trades of the last tick
+            carry = ledger.snapshot(len(day_data))
+            end = dict(zip(ref_symbols, (carry['profits'] + carry['balance']).tolist()))
+            day_states = states.next_states()
+        results.append({
+            'day': day,
+            'pnl': { symbol: value - cumulative.get(symbol, 0.0) for symbol, value in end.items() },
+            'cumulative': end,
+        })
+        cumulative = end
+        print(f'Session day {day}: pnl {sum(results[-1]["pnl"].values())}, cumulative {sum(end.values())}')
+
+    if hasattr(trader, 'after_last_round'):
+        if callable(trader.after_last_round): #type: ignore
+            trader.after_last_round(ledger.series('profits'), ledger.series('balance')) #type: ignore
+    return results
+
+
+# One row per day with the pnl of every symbol, then the cumulative total
+def session_table(results: list[dict[str, Any]]) -> pd.DataFrame:
+    rows = []
+    for result in results:
+        row = { 'day': result['day'] }
+        row.update(result['pnl'])
+        row['total'] = sum(result['pnl'].values())
+        row['cumulative'] = sum(result['cumulative'].values())
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description='Run several days of a round as one session with the same trader.')
+    parser.add_argument('--round', type=int, required=True, help='round of the days')
+    parser.add_argument('--days', type=int, nargs='+', required=True, help='days in the order they are run')
+    parser.add_argument('--trader', help='module:Class or path/to/module.py:Class (default: the Trader imported by backtester.py)')
+    parser.add_argument('--names', type=yes_no, default=True, help='with bot names y/n (default: y)')
+    parser.add_argument('--halfway', type=yes_no, default=False, help='match orders halfway y/n (default: n)')
+    parser.add_argument('--time-limit', type=int, default=999900, help='max timestamp of every day (default: 999900)')
+    parser.add_argument('--matching', choices=MATCHING_MODES, help='matching mode, overrides --halfway')
+    parser.add_argument('--trade-share', type=float, default=TRADE_SHARE, help=f'share of crossing market trades with --matching trades (default: {TRADE_SHARE})')
+    parser.add_argument('--streaming', action='store_true', help='keep only a few states in memory')
+    parser.add_argument('--no-log', action='store_true', help="don't write log files")
+    parser.add_argument('--compress-logs', action='store_true', help='write the log files gzipped')
+    args = parser.parse_args(argv)
+
+    trader_class = load_trader_class(args.trader) if args.trader else Trader
+    results = simulate_session(
+        args.round, args.days, trader_class(), args.time_limit, args.names, args.halfway,
+        args.streaming, not args.no_log, args.matching, args.compress_logs, args.trade_share)
+    print(session_table(results).to_string())
+
+
+if __name__ == "__main__":
+    main()
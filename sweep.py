@@ -0,0 +1,254 @@
+from backtester import Trader, available_days, load_day_data, load_trader_class, simulate_alternative, yes_no
+from ledger import RunSeries
+from market_data import DayData
+from matching import MATCH_EXACT, MATCH_HALFWAY, MATCHING_MODES
+from results_store import ResultsStore, sandbox_logs, trader_identity
+from risk import STOP_RULES, RiskMetrics, parse_stop_rule
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Callable
+import numpy as np
+import pandas as pd
+import argparse
+import ast
+import contextlib
+import functools
+import itertools
+import os
+import random
+import time
+
+# A parameter is either a list of values or a (low, high) range.
+# Ranges can only be sampled (random/lhs), not put on a grid.
+ParamSpace = dict[str, list[Any] | tuple[float, float]]
+
+
+def grid(space: ParamSpace) -> list[dict[str, Any]]:
+    for name, values in space.items():
+        if isinstance(values, tuple):
+            raise ValueError(f'Parameter {name} is a range, a grid needs a list of values')
+    names = list(space.keys())
+    return [dict(zip(names, values)) for values in itertools.product(*space.values())]
+
+
+def random_samples(space: ParamSpace, n: int, seed: int | None = None) -> list[dict[str, Any]]:
+    rng = random.Random(seed)
+    samples = []
+    for _ in range(n):
+        sample = {}
+        for name, values in space.items():
+            if isinstance(values, tuple):
+                sample[name] = _from_range(values, rng.random())
+            else:
+                sample[name] = rng.choice(values)
+        samples.append(sample)
+    return samples
+
+
+def latin_hypercube(space: ParamSpace, n: int, seed: int | None = None) -> list[dict[str, Any]]:
+    # every parameter is split into n strata and every stratum is used exactly once
+    rng = np.random.default_rng(seed)
+    samples = [{} for _ in range(n)]
+    for name, values in space.items():
+        points = (rng.permutation(n) + rng.random(n)) / n
+        for sample, point in zip(samples, points.tolist()):
+            if isinstance(values, tuple):
+                sample[name] = _from_range(values, point)
+            else:
+                sample[name] = values[min(int(point * len(values)), len(values) - 1)]
+    return samples
+
+
+def _from_range(bounds: tuple[float, float], point: float):
+    low, high = bounds
+    value = low + point * (high - low)
+    if isinstance(low, int) and isinstance(high, int):
+        return min(int(value), high)
+    return value
+
+
+# Default trader factory, sets every parameter as attribute on a fresh trader.
+# Use functools.partial(with_params, YourTrader) as factory.
+def with_params(trader_class, **params):
+    trader = trader_class()
+    for name, value in params.items():
+        setattr(trader, name, value)
+    return trader
+
+
+# Days a worker process keeps loaded. Jobs are submitted day by day, so a
+# worker mostly needs the current day and at times the one before it.
+WORKER_DAYS = 2
+
+# Day data of the current worker process, shared by the configurations it runs
+@functools.lru_cache(maxsize=WORKER_DAYS)
+def _worker_day_data(round: int, day: int, names: bool, time_limit: int) -> DayData:
+    return load_day_data(round, day, names, time_limit)
+
+
+def run_config(trader_factory: Callable[..., Any], params: dict[str, Any], round: int, day: int, names=True, halfway=False, time_limit=999900, matching: str | None = None) -> dict[str, float]:
+    return _sweep_run(trader_factory, params, round, day, names, halfway, time_limit, matching)['pnl']
+
+
+# run_config with why the run was stopped and with record what
+# ResultsStore.add_run needs, the store itself stays in the main process
+def _sweep_run(
+        trader_factory: Callable[..., Any],
+        params: dict[str, Any],
+        round: int,
+        day: int,
+        names=True,
+        halfway=False,
+        time_limit=999900,
+        matching: str | None = None,
+        stop_rules: dict[str, float] | None = None,
+        record=False,
+    ) -> dict[str, Any]:
+    day_data = _worker_day_data(round, day, names, time_limit)
+    trader = trader_factory(**params)
+    risk = RiskMetrics(stop_rules) if stop_rules else None
+    series = RunSeries() if record else None
+    start = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        pnl = simulate_alternative(round, day, trader, time_limit, names, halfway, streaming=True, write_log=False, day_data=day_data, matching=matching, series=series, risk=risk)
+    result = { 'pnl': pnl, 'stopped': None if risk is None else risk.summary()['stopped'] }
+    if record:
+        result.update({
+            'seconds': time.perf_counter() - start,
+            'trader': trader_identity(trader),
+            'series': series,
+            'sandbox': sandbox_logs(trader, series),
+        })
+    return result
+
+
+def run_sweep(
+        trader_factory: Callable[..., Any],
+        configs: list[dict[str, Any]],
+        days: list[tuple[int, int]],
+        names=True,
+        halfway=False,
+        time_limit=999900,
+        max_workers: int | None = None,
+        matching: str | None = None,
+        store: ResultsStore | None = None,
+        stop_rules: dict[str, float] | None = None,
+    ) -> pd.DataFrame:
+    """
+    Runs every configuration on every (round, day) in parallel and returns
+    one row per configuration, ranked by total PnL over all days.
+    trader_factory(**params) has to return a fresh trader and be picklable.
+    With a store every run is added to it, with its series.
+    With stop_rules (see RiskMetrics) a run stops once it breaks one, the
+    days of that configuration that haven't started are skipped, it gets
+    no total and the reason in the stopped column.
+    """
+    pnl_by_config: list[dict[str, float]] = [{} for _ in configs]
+    errors: list[str | None] = [None for _ in configs]
+    stopped: list[str | None] = [None for _ in configs]
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {}
+        futures_by_config: list[list] = [[] for _ in configs]
+        # day major order, so each worker mostly keeps working on the same days
+        for round, day in days:
+            for i, params in enumerate(configs):
+                future = executor.submit(_sweep_run, trader_factory, params, round, day, names, halfway, time_limit, matching, stop_rules, store is not None)
+                futures[future] = (i, round, day)
+                futures_by_config[i].append(future)
+        for future in as_completed(futures):
+            i, round, day = futures[future]
+            if future.cancelled():
+                continue
+            try:
+                result = future.result()
+            except Exception as e:
+                errors[i] = repr(e)
+                continue
+            pnl = result['pnl']
+            if store is not None:
+                mode = matching or (MATCH_HALFWAY if halfway else MATCH_EXACT)
+                store.add_run(round, day, pnl, result['trader'], configs[i], names, mode, time_limit, result['seconds'], result['series'], result['sandbox'], result['stopped'])
+            if result['stopped'] is not None and stopped[i] is None:
+                stopped[i] = f"day_{round}_{day}: {result['stopped']}"
+                for other in futures_by_config[i]:
+                    other.cancel()
+            pnl_by_config[i][f'day_{round}_{day}'] = sum(pnl.values())
+            for symbol, value in pnl.items():
+                pnl_by_config[i][symbol] = pnl_by_config[i].get(symbol, 0.0) + value
+
+    day_columns = [f'day_{round}_{day}' for round, day in days]
+    rows = []
+    for params, pnl, error, reason in zip(configs, pnl_by_config, errors, stopped):
+        row = dict(params)
+        symbols = { key: value for key, value in pnl.items() if key not in day_columns }
+        row.update(symbols)
+        row.update({ column: pnl.get(column) for column in day_columns })
+        row['total'] = sum(symbols.values()) if error is None and reason is None else None
+        row['error'] = error
+        if stop_rules:
+            row['stopped'] = reason
+        rows.append(row)
+    df = pd.DataFrame(rows)
+    df = df.sort_values('total', ascending=False, na_position='last').reset_index(drop=True)
+    df.insert(0, 'rank', range(1, len(df) + 1))
+    return df
+
+
+def parse_param(text: str) -> tuple[str, list[Any] | tuple[float, float]]:
+    # name=1,2,3 is a list of values, name=0.5:2 a range
+    name, _, values = text.partition('=')
+    if ':' in values:
+        low, high = values.split(':')
+        return name, (ast.literal_eval(low), ast.literal_eval(high))
+    return name, [_literal(value) for value in values.split(',')]
+
+
+def _literal(value: str):
+    try:
+        return ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        return value
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description='Sweep trader parameters over rounds/days in parallel.')
+    parser.add_argument('--trader', help='module:Class or path/to/module.py:Class (default: the Trader imported by backtester.py)')
+    parser.add_argument('--param', action='append', default=[], help='name=v1,v2,... or name=low:high, sets trader.name')
+    parser.add_argument('--samples', choices=['grid', 'random', 'lhs'], default='grid', help='how configurations are drawn (default: grid)')
+    parser.add_argument('--n', type=int, default=20, help='number of configurations for random/lhs (default: 20)')
+    parser.add_argument('--seed', type=int, help='seed for random/lhs')
+    parser.add_argument('--rounds', type=int, nargs='+', help='rounds to run (default: all with training data)')
+    parser.add_argument('--days', type=int, nargs='+', help='days to run (default: all with training data)')
+    parser.add_argument('--names', type=yes_no, default=True, help='with bot names y/n (default: y)')
+    parser.add_argument('--halfway', type=yes_no, default=False, help='match orders halfway y/n (default: n)')
+    parser.add_argument('--time-limit', type=int, default=999900, help='max timestamp (default: 999900)')
+    parser.add_argument('--matching', choices=MATCHING_MODES, help='matching mode, overrides --halfway')
+    parser.add_argument('--workers', type=int, help='worker processes (default: number of cores)')
+    parser.add_argument('--out', help='write the ranked results as csv to this path')
+    parser.add_argument('--db', help='add every run to this results store (see results_store.py)')
+    parser.add_argument('--stop', type=parse_stop_rule, action='append', default=[], help=f'name=value, stops a run early when broken and skips the other days of its configuration, name is one of {", ".join(STOP_RULES)}')
+    args = parser.parse_args(argv)
+
+    space = dict(parse_param(param) for param in args.param)
+    if args.samples == 'grid':
+        configs = grid(space)
+    elif args.samples == 'random':
+        configs = random_samples(space, args.n, args.seed)
+    else:
+        configs = latin_hypercube(space, args.n, args.seed)
+    days = [
+        (round, day) for round, day in available_days()
+        if (args.rounds is None or round in args.rounds) and (args.days is None or day in args.days)
+    ]
+    trader_class = load_trader_class(args.trader) if args.trader else Trader
+    print(f'Running {len(configs)} configurations on {len(days)} days')
+    store = ResultsStore(args.db) if args.db else None
+    results = run_sweep(functools.partial(with_params, trader_class), configs, days, args.names, args.halfway, args.time_limit, args.workers, args.matching, store, dict(args.stop))
+    if store is not None:
+        store.close()
+    print(results.to_string())
+    if args.out:
+        results.to_csv(args.out, index=False)
+
+
+if __name__ == "__main__":
+    main()
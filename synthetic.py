@@ -0,0 +1,351 @@
+from backtester import SYMBOLS_BY_ROUND_POSITIONABLE, TIME_DELTA, load_day_data
+from market_data import ASK_PRICE_COLUMNS, ASK_VOLUME_COLUMNS, BID_PRICE_COLUMNS, BID_VOLUME_COLUMNS, PRICE_LEVELS, DayData
+from typing import Any
+import numpy as np
+import pandas as pd
+import argparse
+import os
+
+# Noise is filtered in blocks of this many ticks when the mid mean reverts
+AR_BLOCK = 256
+# Probabilities of the fitted distributions are sampled in steps of 1 / SAMPLE_RESOLUTION
+SAMPLE_RESOLUTION = 1 << 16
+
+
+def _distribution(values: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    # empirical distribution as (values, probabilities)
+    values, counts = np.unique(values, return_counts=True)
+    return values, counts / counts.sum()
+
+
+def _sample(rng: np.random.Generator, distribution: tuple[np.ndarray, np.ndarray], size: int) -> np.ndarray:
+    # Inverse of the cumulative distribution on SAMPLE_RESOLUTION equal
+    # bins, a lookup per sample instead of a search (or rng.choice with p)
+    values, probabilities = distribution
+    if len(values) == 0:
+        return np.zeros(size)
+    bins = (np.arange(SAMPLE_RESOLUTION) + 0.5) / SAMPLE_RESOLUTION
+    table = np.minimum(np.searchsorted(np.cumsum(probabilities), bins, side='right'), len(values) - 1)
+    return values[table[rng.integers(0, SAMPLE_RESOLUTION, size)]]
+
+
+class SymbolModel:
+    """
+    Simple model of one symbol fitted from day data:
+
+    * mid: AR(1) process around mean with factor phi (1 is a random walk)
+      and normal steps of std sigma, starting at start
+    * spreads: distribution of best ask - best bid
+    * levels: distribution of the number of price levels on a side
+    * gaps: distribution of the price difference between adjacent levels
+    * volumes: distribution of the volume per level
+    * trade_rate: market trades per tick, Poisson distributed
+    * trade_sizes, trade_offsets: quantity and price - mid of market trades
+    * counterparties: (buyer, seller) pairs of market trades
+
+    Symbols without a book (observations) only have the mid process.
+    """
+
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+        self.has_book = True
+        self.start = 0.0
+        self.mean = 0.0
+        self.phi = 1.0
+        self.sigma = 0.0
+        self.int_mid = False
+        self.spreads = _distribution(np.zeros(0))
+        self.levels = _distribution(np.zeros(0))
+        self.gaps = _distribution(np.zeros(0))
+        self.volumes = [_distribution(np.zeros(0)) for _ in range(PRICE_LEVELS)]
+        self.trade_rate = 0.0
+        self.trade_sizes = _distribution(np.zeros(0))
+        self.trade_offsets = _distribution(np.zeros(0))
+        self.counterparties: tuple[list[tuple[str, str]], np.ndarray] = ([], np.zeros(0))
+
+    def __repr__(self) -> str:
+        return (f'SymbolModel({self.symbol}, mid {self.start:.1f} mean {self.mean:.1f} phi {self.phi:.4f} sigma {self.sigma:.3f}, '
+                f'{self.trade_rate:.3f} trades/tick)')
+
+
+def fit_models(days: list[DayData]) -> dict[str, SymbolModel]:
+    """
+    Fits a SymbolModel for every symbol with prices in the given days,
+    the distributions are pooled over all days.
+    """
+    symbols = [symbol for symbol in days[0].symbols if any(symbol in day.symbols for day in days)]
+    models = {}
+    for symbol in symbols:
+        model = SymbolModel(symbol)
+        spreads, levels, gaps, trade_sizes, trade_offsets = [], [], [], [], []
+        volumes = [[] for _ in range(PRICE_LEVELS)]
+        previous, following, observed = [], [], []
+        pairs: dict[tuple[str, str], int] = {}
+        ticks = 0
+        trades = 0
+        for day in days:
+            if symbol not in day.symbols:
+                continue
+            j = day.symbols.index(symbol)
+            rows = int(day.row_start[-1])
+            mine = np.flatnonzero(day.row_symbol[:rows] == j)
+            ticks += len(day)
+            bids, asks = day.bid_prices[mine], day.ask_prices[mine]
+            # NaN > 0 is False, so missing levels don't count
+            bid_present, ask_present = bids > 0, asks > 0
+            if not bid_present.any() and not ask_present.any():
+                model.has_book = False
+                mids = day.mid_prices[mine]
+                mids = mids[~np.isnan(mids)]
+                model.int_mid = bool(np.all(mids == np.round(mids)))
+            else:
+                levels += [bid_present.sum(axis=1), ask_present.sum(axis=1)]
+                best_bid, best_ask = np.fmax.reduce(bids, axis=1), np.fmin.reduce(asks, axis=1)
+                valid = bid_present.any(axis=1) & ask_present.any(axis=1)
+                spreads.append(np.rint(best_ask[valid] - best_bid[valid]))
+                mids = ((best_bid + best_ask) / 2)[valid]
+                for level in range(1, PRICE_LEVELS):
+                    both = bid_present[:, level - 1] & bid_present[:, level]
+                    gaps.append(bids[both, level - 1] - bids[both, level])
+                    both = ask_present[:, level - 1] & ask_present[:, level]
+                    gaps.append(asks[both, level] - asks[both, level - 1])
+                for level in range(PRICE_LEVELS):
+                    volumes[level] += [
+                        np.abs(day.bid_volumes[mine, level][bid_present[:, level]]),
+                        np.abs(day.ask_volumes[mine, level][ask_present[:, level]]),
+                    ]
+            if len(mids) > 1:
+                previous.append(mids[:-1])
+                following.append(mids[1:])
+            if len(observed) == 0 and len(mids) > 0:
+                model.start = float(mids[0])
+            observed.append(mids)
+
+            end = int(day.trade_start[-1])
+            traded = np.flatnonzero(day.trade_symbol[:end] == j)
+            trades += len(traded)
+            if len(traded) > 0 and model.has_book:
+                tick = np.searchsorted(day.trade_start, traded, side='right') - 1
+                mid_index = day.mid_index()
+                mid = mid_index.mid[tick, j]
+                known = ~np.isnan(mid)
+                trade_sizes.append(day.trade_quantity[traded])
+                trade_offsets.append(np.round(2 * (day.trade_price[traded][known] - mid[known])) / 2)
+                for buyer, seller in zip(day.trade_buyer[traded].tolist(), day.trade_seller[traded].tolist()):
+                    pair = (day.names[buyer], day.names[seller])
+                    pairs[pair] = pairs.get(pair, 0) + 1
+
+        # AR(1) fitted on consecutive mids of the same day
+        if observed:
+            all_mids = np.concatenate(observed)
+            model.mean = float(all_mids.mean()) if len(all_mids) else 0.0
+        if previous:
+            x, y = np.concatenate(previous) - model.mean, np.concatenate(following) - model.mean
+            model.phi = float(np.clip((x * y).sum() / (x * x).sum(), 0.0, 1.0)) if (x * x).sum() > 0 else 1.0
+            model.sigma = float(np.std(y - model.phi * x))
+        if model.has_book:
+            model.spreads = _distribution(np.concatenate(spreads))
+            model.levels = _distribution(np.concatenate(levels))
+            model.gaps = _distribution(np.concatenate(gaps)) if gaps else _distribution(np.ones(1))
+            model.volumes = [_distribution(np.concatenate(level_volumes)) for level_volumes in volumes]
+            model.trade_rate = trades / ticks if ticks else 0.0
+            if trade_sizes:
+                model.trade_sizes = _distribution(np.concatenate(trade_sizes))
+                model.trade_offsets = _distribution(np.concatenate(trade_offsets))
+                model.counterparties = (list(pairs.keys()), np.array(list(pairs.values())) / sum(pairs.values()))
+        models[symbol] = model
+    return models
+
+
+def fit_round(round: int, days: list[int], names=True) -> dict[str, SymbolModel]:
+    return fit_models([load_day_data(round, day, names) for day in days])
+
+
+def _ar1(rng: np.random.Generator, model: SymbolModel, ticks: int) -> np.ndarray:
+    noise = rng.normal(0.0, model.sigma, ticks)
+    if model.phi >= 1.0:
+        return model.start + np.cumsum(noise)
+    # x_t = phi * x_t-1 + noise_t around the mean, x is the noise convolved
+    # with the powers of phi. If they vanish quickly that's one convolution,
+    # otherwise one per block.
+    deviation = model.start - model.mean
+    length = int(np.ceil(np.log(1e-12) / np.log(model.phi))) + 1 if model.phi > 0 else 1
+    if length <= AR_BLOCK:
+        decay = model.phi ** np.arange(1, ticks + 1)
+        return np.convolve(noise, model.phi ** np.arange(length))[:ticks] + decay * deviation + model.mean
+    path = np.empty(ticks)
+    powers = model.phi ** np.arange(AR_BLOCK + 1)
+    for start in range(0, ticks, AR_BLOCK):
+        block = noise[start:start + AR_BLOCK]
+        values = np.convolve(block, powers[:len(block)])[:len(block)] + powers[1:len(block) + 1] * deviation
+        path[start:start + AR_BLOCK] = values + model.mean
+        deviation = values[-1]
+    return path
+
+
+def _side(rng: np.random.Generator, model: SymbolModel, best: np.ndarray, sign: int) -> tuple[np.ndarray, np.ndarray]:
+    # prices move away from best by the gaps, levels beyond the sampled count are NaN.
+    # Volumes are positive on both sides like in the csv files, DayData signs the asks.
+    ticks = len(best)
+    gaps = _sample(rng, model.gaps, ticks * (PRICE_LEVELS - 1)).reshape(ticks, PRICE_LEVELS - 1)
+    prices = best[:, None] - sign * np.concatenate([np.zeros((ticks, 1)), np.cumsum(gaps, axis=1)], axis=1)
+    volumes = np.stack([_sample(rng, model.volumes[level], ticks) for level in range(PRICE_LEVELS)], axis=1)
+    count = _sample(rng, model.levels, ticks)
+    missing = np.arange(PRICE_LEVELS)[None, :] >= count[:, None]
+    prices[missing] = np.nan
+    volumes[missing] = np.nan
+    return prices, volumes
+
+
+def generate_columns(models: dict[str, SymbolModel], ticks: int, seed: int | None = None, names=True) -> tuple[dict[str, np.ndarray], dict[str, Any], dict[str, np.ndarray], dict[str, Any]]:
+    """
+    A synthetic day of `ticks` ticks in the columnar format of price_columns
+    and trade_columns, every symbol has a row at every tick.
+    Without names the counterparties are left empty like in the _nn files.
+    """
+    rng = np.random.default_rng(seed)
+    symbols = list(models.keys())
+    n_symbols = len(symbols)
+    shape = (ticks, n_symbols, PRICE_LEVELS)
+    bid_prices, bid_volumes = np.full(shape, np.nan), np.full(shape, np.nan)
+    ask_prices, ask_volumes = np.full(shape, np.nan), np.full(shape, np.nan)
+    mid_prices = np.full((ticks, n_symbols), np.nan)
+    trade_ticks, trade_symbols, trade_prices, trade_quantities, trade_pairs = [], [], [], [], []
+    pair_names: list[tuple[str, str]] = []
+
+    for s, model in enumerate(models.values()):
+        mid = _ar1(rng, model, ticks)
+        if not model.has_book:
+            mid_prices[:, s] = np.round(mid) if model.int_mid else mid
+            continue
+        spread = _sample(rng, model.spreads, ticks)
+        best_bid = np.rint(mid - spread / 2)
+        best_ask = best_bid + spread
+        bid_prices[:, s], bid_volumes[:, s] = _side(rng, model, best_bid, 1)
+        ask_prices[:, s], ask_volumes[:, s] = _side(rng, model, best_ask, -1)
+        mid_prices[:, s] = (best_bid + best_ask) / 2
+
+        count = rng.poisson(model.trade_rate, ticks)
+        total = int(count.sum())
+        if total == 0 or len(model.trade_sizes[0]) == 0:
+            continue
+        tick = np.repeat(np.arange(ticks), count)
+        trade_ticks.append(tick)
+        trade_symbols.append(np.full(total, s, dtype=np.int32))
+        trade_prices.append(mid_prices[tick, s] + _sample(rng, model.trade_offsets, total))
+        trade_quantities.append(_sample(rng, model.trade_sizes, total).astype(np.int64))
+        pairs, probabilities = model.counterparties
+        trade_pairs.append(len(pair_names) + _sample(rng, (np.arange(len(pairs)), probabilities), total))
+        pair_names += pairs
+
+    timestamps = np.arange(ticks, dtype=np.int64) * TIME_DELTA
+    prices = {
+        'timestamps': timestamps,
+        'row_start': np.arange(ticks + 1, dtype=np.int64) * n_symbols,
+        'row_symbol': np.tile(np.arange(n_symbols, dtype=np.int32), ticks),
+        'bid_prices': bid_prices.reshape(-1, PRICE_LEVELS),
+        'bid_volumes': bid_volumes.reshape(-1, PRICE_LEVELS),
+        'ask_prices': ask_prices.reshape(-1, PRICE_LEVELS),
+        'ask_volumes': ask_volumes.reshape(-1, PRICE_LEVELS),
+        'mid_prices': mid_prices.ravel(),
+    }
+    # like pandas: a column without gaps is read as int
+    no_gaps = lambda columns: [bool(not np.isnan(columns[:, level]).any()) for level in range(PRICE_LEVELS)]
+    prices_meta = {
+        'symbols': symbols,
+        'int_columns': {
+            'bid_price': no_gaps(prices['bid_prices']),
+            'ask_price': no_gaps(prices['ask_prices']),
+            'mid_price': [bool(np.all(prices['mid_prices'] == np.round(prices['mid_prices'])))],
+        },
+    }
+
+    tick = np.concatenate(trade_ticks) if trade_ticks else np.zeros(0, dtype=np.int64)
+    order = np.argsort(tick, kind='stable')
+    pair = np.concatenate(trade_pairs)[order] if trade_pairs else np.zeros(0, dtype=np.int64)
+    participants = sorted({ name for pair_name in pair_names for name in pair_name if name != 'nan' }) if names else []
+    participant_names = participants + ['nan']
+    code = { name: k for k, name in enumerate(participant_names) }
+    nan = len(participant_names) - 1
+    buyer_of_pair = np.array([code.get(buyer, nan) if names else nan for buyer, _ in pair_names], dtype=np.int32)
+    seller_of_pair = np.array([code.get(seller, nan) if names else nan for _, seller in pair_names], dtype=np.int32)
+    trades = {
+        'timestamps': timestamps[tick[order]],
+        'symbol': np.concatenate(trade_symbols)[order] if trade_symbols else np.zeros(0, dtype=np.int32),
+        'price': np.concatenate(trade_prices)[order] if trade_prices else np.zeros(0),
+        'quantity': np.concatenate(trade_quantities)[order] if trade_quantities else np.zeros(0, dtype=np.int64),
+        'buyer': buyer_of_pair[pair] if len(pair_names) else np.zeros(0, dtype=np.int32),
+        'seller': seller_of_pair[pair] if len(pair_names) else np.zeros(0, dtype=np.int32),
+    }
+    trades_meta = { 'symbols': symbols, 'names': participant_names, 'int_columns': { 'trade_price': [False] } }
+    return prices, prices_meta, trades, trades_meta
+
+
+def generate_day_data(models: dict[str, SymbolModel], ticks: int, round: int, seed: int | None = None, names=True) -> DayData:
+    # straight into the engine, pass it as simulate_alternative(..., day_data=..., time_limit=...)
+    prices, prices_meta, trades, trades_meta = generate_columns(models, ticks, seed, names)
+    return DayData.from_columns(prices, prices_meta, trades, trades_meta, SYMBOLS_BY_ROUND_POSITIONABLE[round], ticks * TIME_DELTA)
+
+
+def _int_or_empty(values: np.ndarray) -> pd.Series:
+    # whole numbers are written without .0, NaN as an empty field
+    return pd.Series(values).astype('Int64')
+
+
+def write_prices_csv(prices: dict[str, np.ndarray], prices_meta: dict[str, Any], day: int, path: str):
+    # same schema as the prices files in training/
+    rows = len(prices['row_symbol'])
+    columns: dict[str, Any] = {
+        'day': np.full(rows, day),
+        'timestamp': np.repeat(prices['timestamps'], np.diff(prices['row_start'])),
+        'product': np.array(prices_meta['symbols'], dtype=object)[prices['row_symbol']],
+    }
+    for side, price_columns, volume_columns in [('bid', BID_PRICE_COLUMNS, BID_VOLUME_COLUMNS), ('ask', ASK_PRICE_COLUMNS, ASK_VOLUME_COLUMNS)]:
+        for level in range(PRICE_LEVELS):
+            columns[price_columns[level]] = _int_or_empty(prices[f'{side}_prices'][:, level])
+            columns[volume_columns[level]] = _int_or_empty(prices[f'{side}_volumes'][:, level])
+    columns['mid_price'] = prices['mid_prices']
+    columns['profit_and_loss'] = np.zeros(rows)
+    pd.DataFrame(columns).to_csv(path, sep=';', index=False)
+
+
+def write_trades_csv(trades: dict[str, np.ndarray], trades_meta: dict[str, Any], path: str, names=True):
+    # same schema as the trades files in training/, without names like the _nn files
+    participant_names = np.array([name if name != 'nan' and names else '' for name in trades_meta['names']], dtype=object)
+    pd.DataFrame({
+        'timestamp': trades['timestamps'],
+        'buyer': participant_names[trades['buyer']],
+        'seller': participant_names[trades['seller']],
+        'symbol': np.array(trades_meta['symbols'], dtype=object)[trades['symbol']],
+        'currency': 'SEASHELLS',
+        'price': trades['price'],
+        'quantity': trades['quantity'],
+    }).to_csv(path, sep=';', index=False)
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description='Write synthetic days fitted on the training data of a round.')
+    parser.add_argument('--round', type=int, required=True, help='round whose training days the models are fitted on')
+    parser.add_argument('--fit-days', type=int, nargs='+', required=True, help='training days to fit on')
+    parser.add_argument('--days', type=int, nargs='+', required=True, help='day numbers of the written files')
+    parser.add_argument('--ticks', type=int, default=10000, help='ticks per day (default: 10000)')
+    parser.add_argument('--seed', type=int, help='seed of the first day, the following days use the next seeds')
+    parser.add_argument('--out', default='synthetic', help='directory of the written files (default: synthetic)')
+    args = parser.parse_args(argv)
+
+    models = fit_round(args.round, args.fit_days)
+    for model in models.values():
+        print(model)
+    os.makedirs(args.out, exist_ok=True)
+    for k, day in enumerate(args.days):
+        seed = None if args.seed is None else args.seed + k
+        prices, prices_meta, trades, trades_meta = generate_columns(models, args.ticks, seed)
+        prices_path = os.path.join(args.out, f'prices_round_{args.round}_day_{day}.csv')
+        write_prices_csv(prices, prices_meta, day, prices_path)
+        write_trades_csv(trades, trades_meta, os.path.join(args.out, f'trades_round_{args.round}_day_{day}_wn.csv'))
+        write_trades_csv(trades, trades_meta, os.path.join(args.out, f'trades_round_{args.round}_day_{day}_nn.csv'), names=False)
+        print(f'Wrote {prices_path} with {args.ticks} ticks and {len(trades["timestamps"])} trades')
+
+
+if __name__ == "__main__":
+    main()
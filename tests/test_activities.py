@@ -0,0 +1,127 @@
+import contextlib
+import gzip
+import io
+import itertools
+import os
+import statistics
+import tracemalloc
+import numpy as np
+import backtester
+from activities import activity_lines
+from datamodel import Order
+
+
+class MarketMaker:
+    # quotes one tick inside the book, so the pnl changes all day
+    def run(self, state):
+        orders = {}
+        for symbol, depth in state.order_depths.items():
+            if depth.buy_orders and depth.sell_orders:
+                orders[symbol] = [Order(symbol, max(depth.buy_orders) + 1, 2), Order(symbol, min(depth.sell_orders) - 1, -2)]
+        return orders
+
+
+def _log_paths(monkeypatch, tmp_path) -> list[str]:
+    paths = []
+    counter = itertools.count()
+
+    def new_log_path(compress=False):
+        paths.append(str(tmp_path / f'{next(counter)}.log'))
+        return paths[-1]
+    monkeypatch.setattr(backtester, 'new_log_path', new_log_path)
+    return paths
+
+
+def test_activity_lines_of_chunks_add_up_to_the_day():
+    day_data = backtester.load_day_data(2, 1)
+    symbols = ['PEARLS', 'COCONUTS', 'PINA_COLADAS', 'DOLPHIN_SIGHTINGS']
+    pnl = np.random.default_rng(0).normal(size=(len(day_data), 2))
+    whole = activity_lines(day_data, 1, symbols, ['COCONUTS', 'PINA_COLADAS'], pnl)
+    bounds = [0, 1, 777, 4096, 5000, len(day_data)]
+    chunks = [
+        line
+        for start, end in zip(bounds[:-1], bounds[1:])
+        for line in activity_lines(day_data, 1, symbols, ['COCONUTS', 'PINA_COLADAS'], pnl[start:end], start, end)
+    ]
+    assert chunks == whole
+    assert len(whole) == len(day_data) * len(symbols)
+
+
+def test_streaming_log_equals_the_log_written_at_the_end(monkeypatch, tmp_path):
+    paths = _log_paths(monkeypatch, tmp_path)
+    day_data = backtester.load_day_data(2, -1)
+    outputs = []
+    for streaming in [False, True]:
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            backtester.simulate_alternative(2, -1, MarketMaker(), day_data=day_data, streaming=streaming)
+        outputs.append(output.getvalue())
+    logs = [open(path).read() for path in paths]
+    assert logs[0] == logs[1]
+    assert outputs[0] == outputs[1]
+    assert 'Final profit for COCONUTS' in outputs[0]
+    assert logs[0].count('\n-1;') == len(day_data) * len(backtester.SYMBOLS_BY_ROUND[2])
+
+
+def test_streaming_log_memory_does_not_grow_with_the_day(monkeypatch, tmp_path):
+    _log_paths(monkeypatch, tmp_path)
+    peaks = []
+    # both runs are longer than one chunk of activities
+    for time_limit in [450000, 999900]:
+        day_data = backtester.load_day_data(1, 0, time_limit=time_limit)
+        tracemalloc.start()
+        try:
+            # the limit warnings of the trader would pile up in a StringIO
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                backtester.simulate_alternative(1, 0, MarketMaker(), time_limit, day_data=day_data, streaming=True)
+            peaks.append(tracemalloc.get_traced_memory()[1])
+        finally:
+            tracemalloc.stop()
+    assert peaks[1] < peaks[0] * 1.1
+
+
+# write_activity_rows as it was before the bulk writer, from the order depths of one state
+def _baseline_rows(round: int, day: int, time: int, state, profits: dict[str, float]) -> str:
+    f = io.StringIO()
+    for symbol in backtester.SYMBOLS_BY_ROUND[round]:
+        f.write(f'{day};{time};{symbol};')
+        for orders in [state.order_depths[symbol].buy_orders, state.order_depths[symbol].sell_orders]:
+            levels = list(orders.items())[:3]
+            f.write(''.join(f'{price};{volume};' for price, volume in levels) + ';;' * (3 - len(levels)))
+        bids_prices = list(state.order_depths[symbol].buy_orders.keys())
+        asks_prices = list(state.order_depths[symbol].sell_orders.keys())
+        if len(asks_prices) == 0 or max(bids_prices) == 0:
+            if symbol == 'DOLPHIN_SIGHTINGS':
+                f.write(f"{state.observations['DOLPHIN_SIGHTINGS']};{0.0}\n")
+            else:
+                f.write(f'{0};{0.0}\n')
+        else:
+            actual_profit = 0.0
+            if symbol in backtester.SYMBOLS_BY_ROUND_POSITIONABLE[round]:
+                actual_profit = profits[symbol] + 0.0
+            f.write(f'{statistics.median([min(asks_prices), max(bids_prices)])};{actual_profit}\n')
+    return f.getvalue()
+
+
+def test_activity_lines_equal_the_rows_written_from_the_states():
+    for round, day in [(1, 0), (2, 1)]:
+        day_data = backtester.load_day_data(round, day, time_limit=200000)
+        symbols = backtester.SYMBOLS_BY_ROUND[round]
+        pnl_symbols = backtester.SYMBOLS_BY_ROUND_POSITIONABLE[round]
+        pnl = np.random.default_rng(round).normal(size=(len(day_data), len(pnl_symbols))) * 1000
+        lines = activity_lines(day_data, day, symbols, pnl_symbols, pnl)
+        expected = ''.join(
+            _baseline_rows(round, day, time, day_data.state_at(i), dict(zip(pnl_symbols, pnl[i].tolist())))
+            for i, time in enumerate(day_data.timestamps.tolist())
+        )
+        assert ''.join(lines) == expected
+
+
+def test_compressed_log_has_the_same_content(monkeypatch, tmp_path):
+    counter = itertools.count()
+    monkeypatch.setattr(backtester, 'new_log_path', lambda compress=False: str(tmp_path / f'{next(counter)}.log') + ('.gz' if compress else ''))
+    for compress_log in [False, True]:
+        with contextlib.redirect_stdout(io.StringIO()):
+            backtester.simulate_alternative(1, 0, MarketMaker(), 100000, compress_log=compress_log)
+    with open(tmp_path / '0.log') as plain, gzip.open(tmp_path / '1.log.gz', 'rt') as compressed:
+        assert compressed.read() == plain.read()
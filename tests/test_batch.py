@@ -0,0 +1,58 @@
+import contextlib
+import io
+import itertools
+import backtester
+import batch
+from datamodel import Order
+
+
+class MarketMaker:
+    def run(self, state):
+        orders = {}
+        for symbol, depth in state.order_depths.items():
+            if depth.buy_orders and depth.sell_orders:
+                orders[symbol] = [Order(symbol, max(depth.buy_orders) + 1, 2), Order(symbol, min(depth.sell_orders) - 1, -2)]
+        return orders
+
+
+class Failing:
+    def run(self, state):
+        raise ValueError('broken trader')
+
+
+def _log_paths(monkeypatch, tmp_path):
+    # forked workers inherit the patched function
+    counter = itertools.count()
+    monkeypatch.setattr(backtester, 'new_log_path', lambda compress=False: str(tmp_path / f'{next(counter)}.log'))
+
+
+def test_job_matrix_only_has_days_with_data():
+    jobs = batch.job_matrix(rounds=[1], names=[True, False], matching=['depth'])
+    assert sorted((job.round, job.day, job.names) for job in jobs) == \
+        sorted((1, day, names) for day in [-2, -1, 0] for names in [True, False])
+    assert batch.job_matrix(rounds=[9]) == []
+
+
+def test_batch_results_equal_single_runs(monkeypatch, tmp_path):
+    _log_paths(monkeypatch, tmp_path)
+    jobs = [batch.BatchJob(1, 0, time_limit=30000, matching='depth'), batch.BatchJob(2, -1, time_limit=30000, matching='depth')]
+    results = batch.run_batch(jobs, MarketMaker, max_workers=2)
+    by_day = { (result['round'], result['day']): result for result in results }
+    for job in jobs:
+        with contextlib.redirect_stdout(io.StringIO()):
+            pnl = backtester.simulate_alternative(job.round, job.day, MarketMaker(), job.time_limit, matching='depth')
+        assert by_day[(job.round, job.day)]['pnl'] == pnl
+        assert by_day[(job.round, job.day)]['run_max_ms'] is not None
+    table = batch.summary_table(results)
+    assert table['round'].tolist() == [1, 2]
+    assert table.columns[-1] == 'total'
+    assert table['total'].tolist() == [sum(by_day[(job.round, job.day)]['pnl'].values()) for job in jobs]
+
+
+def test_failed_jobs_get_an_error_row(monkeypatch, tmp_path):
+    _log_paths(monkeypatch, tmp_path)
+    with contextlib.redirect_stdout(io.StringIO()) as output:
+        results = batch.run_batch([batch.BatchJob(1, 0, time_limit=1000)], Failing, max_workers=1)
+    assert 'broken trader' in results[0]['error'] and results[0]['pnl'] == {}
+    assert 'failed' in output.getvalue()
+    assert batch.summary_table(results)['total'].tolist() == [0]
@@ -0,0 +1,32 @@
+import itertools
+import backtester
+import bench
+
+
+def test_bench_jobs_only_repeat_trader_stages_per_trader():
+    jobs = bench.bench_jobs(['load', 'pnl'], [(1, 0)], ['noop', 'busy'])
+    assert jobs == [('load', 1, 0, None), ('pnl', 1, 0, 'noop'), ('pnl', 1, 0, 'busy')]
+
+
+def test_every_stage_runs_on_a_day(monkeypatch, tmp_path):
+    counter = itertools.count()
+    monkeypatch.setattr(backtester, 'new_log_path', lambda compress=False: str(tmp_path / f'{next(counter)}.log'))
+    for stage, (_, uses_trader) in bench.STAGES.items():
+        result = bench.run_stage(stage, 1, 0, 'busy' if uses_trader else None, 1)
+        assert result['ticks'] == 10000
+        assert result['seconds'] > 0 and result['peak_rss_mb'] > 0
+    # the log stage removes its file again
+    assert list(tmp_path.iterdir()) == []
+
+
+def _result(stage: str, ticks_per_second: float, peak_rss_mb: float) -> dict:
+    return { 'stage': stage, 'round': 1, 'day': 0, 'trader': 'noop', 'ticks_per_second': ticks_per_second, 'peak_rss_mb': peak_rss_mb }
+
+
+def test_compare_flags_slower_and_bigger_stages():
+    baseline = [_result('load', 1000, 100), _result('pnl', 1000, 100), _result('log', 1000, 100)]
+    results = [_result('load', 900, 110), _result('pnl', 700, 100), _result('log', 1000, 130), _result('monkeys', 5, 5)]
+    table = bench.compare(results, baseline, 0.2)
+    assert table['regressed'].tolist() == [False, True, True, False]
+    assert table['speed_change'].round(2).tolist()[:3] == [-0.1, -0.3, 0.0]
+    assert table['rss_change'].isna().tolist() == [False, False, False, True]
@@ -0,0 +1,88 @@
+import os
+import numpy as np
+import backtester
+import market_data
+from market_data import DayData, cached_columns, price_columns, read_prices_csv
+
+
+def _copy_day(tmp_path) -> str:
+    # a short copy of a prices file, so rewriting it is cheap
+    prices_path, _ = backtester.day_file_paths(1, 0)
+    path = str(tmp_path / 'prices_round_1_day_0.csv')
+    with open(prices_path) as source, open(path, 'w') as copy:
+        copy.writelines(line for _, line in zip(range(401), source))
+    return path
+
+
+def _fails_to_parse(monkeypatch):
+    def read_prices_csv(path):
+        raise AssertionError('cache entry was rebuilt')
+    monkeypatch.setattr(market_data, 'read_prices_csv', read_prices_csv)
+
+
+def _equal(arrays: dict[str, np.ndarray], expected: dict[str, np.ndarray]) -> bool:
+    return arrays.keys() == expected.keys() and all(np.array_equal(arrays[name], expected[name], equal_nan=arrays[name].dtype.kind == 'f') for name in arrays)
+
+
+def test_cached_columns_equal_the_parsed_csv(tmp_path, monkeypatch):
+    path = _copy_day(tmp_path)
+    cache_dir = str(tmp_path / 'cache')
+    expected, expected_meta = price_columns(read_prices_csv(path))
+    arrays, meta = cached_columns(path, 'prices', cache_dir)
+    assert _equal(arrays, expected) and meta == expected_meta
+
+    _fails_to_parse(monkeypatch)
+    arrays, meta = cached_columns(path, 'prices', cache_dir)
+    assert _equal(arrays, expected) and meta == expected_meta
+
+
+def test_touched_file_with_the_same_content_keeps_its_entry(tmp_path, monkeypatch):
+    path = _copy_day(tmp_path)
+    cache_dir = str(tmp_path / 'cache')
+    cached_columns(path, 'prices', cache_dir)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    _fails_to_parse(monkeypatch)
+    cached_columns(path, 'prices', cache_dir)
+    entry = market_data._read_cache_meta(os.path.join(cache_dir, 'prices_round_1_day_0'))
+    assert entry['key']['mtime_ns'] == os.stat(path).st_mtime_ns
+
+
+def test_changed_content_rebuilds_the_entry(tmp_path):
+    path = _copy_day(tmp_path)
+    cache_dir = str(tmp_path / 'cache')
+    original, _ = cached_columns(path, 'prices', cache_dir)
+    stat = os.stat(path)
+    with open(path) as f:
+        text = f.read()
+    # same size and mtime, only the hash can tell
+    first_bid = text.split('\n')[1].split(';')[3]
+    changed = text.replace(f';{first_bid};', f';{int(first_bid) + 1};', 1)
+    assert len(changed) == len(text)
+    with open(path, 'w') as f:
+        f.write(changed)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    arrays, _ = cached_columns(path, 'prices', cache_dir)
+    assert not _equal(arrays, original)
+    assert _equal(arrays, price_columns(read_prices_csv(path))[0])
+
+    # one row less
+    with open(path, 'w') as f:
+        f.write(changed[:changed.rindex('\n', 0, -1) + 1])
+    arrays, _ = cached_columns(path, 'prices', cache_dir)
+    assert _equal(arrays, price_columns(read_prices_csv(path))[0])
+
+
+def test_day_from_the_cache_equals_the_day_from_csv(tmp_path):
+    prices_path, trades_path = backtester.day_file_paths(2, 0)
+    positionable = backtester.SYMBOLS_BY_ROUND_POSITIONABLE[2]
+    from_csv = DayData.from_csv(prices_path, trades_path, positionable, 50000)
+    for _ in range(2):
+        from_cache = DayData.from_cache(prices_path, trades_path, positionable, 50000, str(tmp_path / 'cache'))
+        assert np.array_equal(from_cache.timestamps, from_csv.timestamps)
+        for i in range(len(from_csv)):
+            a, b = from_cache.state_at(i), from_csv.state_at(i)
+            assert { s: (d.buy_orders, d.sell_orders) for s, d in a.order_depths.items() } == { s: (d.buy_orders, d.sell_orders) for s, d in b.order_depths.items() }
+            assert a.market_trades.keys() == b.market_trades.keys()
+            assert [[(t.price, t.quantity, t.buyer, t.seller) for t in trades] for trades in a.market_trades.values()] == \
+                [[(t.price, t.quantity, t.buyer, t.seller) for t in trades] for trades in b.market_trades.values()]
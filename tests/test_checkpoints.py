@@ -0,0 +1,74 @@
+import contextlib
+import functools
+import io
+import itertools
+import backtester
+from checkpoints import Checkpoints
+from datamodel import Order
+from ledger import RunSeries
+
+
+class CountingTrader:
+    # the orders depend on the ticks it has seen, so its own state has to be restored too
+    def __init__(self):
+        self.ticks = 0
+
+    def run(self, state):
+        self.ticks += 1
+        orders = {}
+        for symbol, depth in state.order_depths.items():
+            if not depth.buy_orders or not depth.sell_orders:
+                continue
+            if self.ticks % 7 < 4:
+                orders[symbol] = [Order(symbol, min(depth.sell_orders), 1)]
+            else:
+                orders[symbol] = [Order(symbol, max(depth.buy_orders), -1)]
+        return orders
+
+
+def _run(streaming: bool, start_time=0) -> tuple[dict[str, float], RunSeries]:
+    series = RunSeries()
+    with contextlib.redirect_stdout(io.StringIO()):
+        pnl = backtester.simulate_alternative(1, 0, CountingTrader(), time_limit=50000, matching='depth', streaming=streaming,
+                                              checkpoint_every=10000, start_time=start_time, series=series)
+    return pnl, series
+
+
+def _activities(path: str, from_time: int) -> list[str]:
+    with open(path) as f:
+        lines = f.read().split('\n\n\nActivities log:\n')[1].splitlines()[1:]
+    return [line for line in lines if int(line.split(';')[1]) >= from_time]
+
+
+def test_resumed_run_equals_the_full_run(monkeypatch, tmp_path):
+    monkeypatch.setattr(backtester, 'Checkpoints', functools.partial(Checkpoints, prefix=str(tmp_path / 'checkpoints')))
+    paths = []
+    counter = itertools.count()
+    def new_log_path(compress=False):
+        paths.append(str(tmp_path / f'{next(counter)}.log'))
+        return paths[-1]
+    monkeypatch.setattr(backtester, 'new_log_path', new_log_path)
+
+    for streaming in [False, True]:
+        full_pnl, full = _run(streaming)
+        # resumes from the checkpoint at 20000
+        resumed_pnl, resumed = _run(streaming, 25000)
+        start = resumed.start
+        assert int(full.timestamps[start]) == 20000
+        assert resumed_pnl == full_pnl
+        assert (resumed.pnl[start:resumed.end] == full.pnl[start:full.end]).all()
+        assert (resumed.positions[start:resumed.end] == full.positions[start:full.end]).all()
+        rows = _activities(paths[-2], 20000)
+        assert len(rows) == 301 * 2
+        assert _activities(paths[-1], 20000) == rows
+    assert Checkpoints(1, 0, True, 'depth', prefix=str(tmp_path / 'checkpoints')).times() == [0, 10000, 20000, 30000, 40000, 50000]
+
+
+def test_missing_checkpoint_starts_at_the_beginning(monkeypatch, tmp_path):
+    monkeypatch.setattr(backtester, 'Checkpoints', functools.partial(Checkpoints, prefix=str(tmp_path)))
+    series = RunSeries()
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        backtester.simulate_alternative(1, 0, CountingTrader(), time_limit=5000, write_log=False, start_time=3000, series=series)
+    assert 'No checkpoint at or before 3000' in output.getvalue()
+    assert series.start == 0
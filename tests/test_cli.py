@@ -0,0 +1,77 @@
+import contextlib
+import csv
+import io
+import sys
+import pytest
+import backtester
+
+TRADER_SOURCE = '''
+from datamodel import Order
+
+
+class Buyer:
+    def run(self, state):
+        return { symbol: [Order(symbol, min(depth.sell_orders), 1)] for symbol, depth in state.order_depths.items() if depth.sell_orders }
+
+
+class Trader(Buyer):
+    pass
+'''
+
+
+@pytest.fixture
+def trader_path(tmp_path, monkeypatch):
+    # load_trader_class puts the file's directory on sys.path
+    monkeypatch.setattr(sys, 'path', list(sys.path))
+    path = tmp_path / 'cli_test_trader.py'
+    path.write_text(TRADER_SOURCE)
+    yield str(path)
+    sys.modules.pop('cli_test_trader', None)
+
+
+def test_trader_is_loaded_from_a_path_or_a_module(trader_path):
+    assert backtester.load_trader_class(f'{trader_path}:Buyer').__name__ == 'Buyer'
+    assert backtester.load_trader_class(trader_path).__name__ == 'Trader'
+    assert backtester.load_trader_class('cli_test_trader:Buyer') is backtester.load_trader_class(f'{trader_path}:Buyer')
+
+
+def _main(argv: list[str]) -> str:
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        backtester.main(argv)
+    return output.getvalue()
+
+
+def test_main_runs_the_chosen_days_and_writes_the_pnl(trader_path, tmp_path):
+    out = tmp_path / 'pnl.csv'
+    _main(['--trader', f'{trader_path}:Buyer', '--rounds', '1', '--days', '-1', '0', '--time-limit', '3000', '--names', 'n',
+           '--matching', 'depth', '--no-log', '--out', str(out)])
+    with open(out, newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert [(row['round'], row['day']) for row in rows] == [('1', '-1'), ('1', '0')]
+    Buyer = backtester.load_trader_class(f'{trader_path}:Buyer')
+    for row in rows:
+        with contextlib.redirect_stdout(io.StringIO()):
+            pnl = backtester.simulate_alternative(1, int(row['day']), Buyer(), 3000, False, matching='depth', write_log=False)
+        assert { symbol: float(row[symbol]) for symbol in pnl } == pnl
+        assert float(row['total']) == sum(pnl.values())
+
+
+def test_stop_rules_are_parsed_and_stop_the_day(trader_path, tmp_path):
+    out = tmp_path / 'pnl.csv'
+    _main(['--trader', trader_path, '--rounds', '1', '--days', '0', '--time-limit', '50000', '--no-log',
+           '--stop', 'rejected=0', '--out', str(out)])
+    with open(out, newline='') as f:
+        row = next(csv.DictReader(f))
+    # buying one per tick reaches the limit of 20 long before the end
+    reason, _, stopped_at = row['stopped'].rpartition(' at ')
+    assert reason.startswith('rejected') and int(stopped_at) < 50000
+
+
+def test_bad_arguments_exit_with_a_usage_error(trader_path, capsys):
+    for argv in [['--days', '0'], ['--rounds', '1', '--stop', 'nonsense=1'], ['--rounds', '1', '--matching', 'nonsense'],
+                 ['--trader', trader_path, '--rounds', '99']]:
+        with pytest.raises(SystemExit) as exit:
+            backtester.main(argv)
+        assert exit.value.code == 2
+    assert 'no training data for these rounds/days' in capsys.readouterr().err
@@ -0,0 +1,56 @@
+import copy
+import json
+import pickle
+import pytest
+import backtester
+from datamodel import Listing, Order, OrderDepth, ProsperityEncoder, Trade, TradingState
+from market_data import RowOrderDepth
+
+
+def _state() -> TradingState:
+    depth = OrderDepth()
+    depth.buy_orders = { 10: 5 }
+    depth.sell_orders = { 12: -3 }
+    return TradingState(100, { 'A': Listing('A', 'A', '1') }, { 'A': depth }, { 'A': [] }, { 'A': [Trade('A', 11, 2, 'x', 'y', 100)] }, { 'A': 0 }, {})
+
+
+def test_slotted_classes_keep_their_fields_in_dict():
+    order = Order('A', 10, 1)
+    assert vars(order) == { 'symbol': 'A', 'price': 10, 'quantity': 1 }
+    with pytest.raises(AttributeError):
+        order.note = 'no new attributes'
+    state = _state()
+    state.features = { 'A': { 'mid': 11.0 } }
+    # features aren't a field of the platform state
+    assert json.loads(state.toJSON()) == {
+        'timestamp': 100,
+        'listings': { 'A': { 'symbol': 'A', 'product': 'A', 'denomination': '1' } },
+        'order_depths': { 'A': { 'buy_orders': { '10': 5 }, 'sell_orders': { '12': -3 } } },
+        'own_trades': { 'A': [] },
+        'market_trades': { 'A': [{ 'symbol': 'A', 'price': 11, 'quantity': 2, 'buyer': 'x', 'seller': 'y', 'timestamp': 100 }] },
+        'position': { 'A': 0 },
+        'observations': {},
+    }
+    assert json.dumps(state, cls=ProsperityEncoder, sort_keys=True) == state.toJSON()
+
+
+def test_slotted_classes_copy_and_pickle():
+    state = _state()
+    for other in [copy.deepcopy(state), pickle.loads(pickle.dumps(state))]:
+        assert other.toJSON() == state.toJSON()
+        assert other.order_depths['A'].buy_orders is not state.order_depths['A'].buy_orders
+
+
+def test_row_order_depths_are_built_when_used_and_pickle_as_order_depths():
+    day_data = backtester.load_day_data(1, 0, time_limit=1000)
+    depth = day_data.state_at(0).order_depths['PEARLS']
+    assert isinstance(depth, RowOrderDepth)
+    assert depth._buy_orders is None and depth._sell_orders is None
+    assert depth.buy_orders == day_data.buy_orders(depth.row)
+    assert depth._sell_orders is None
+    copied = pickle.loads(pickle.dumps(depth))
+    assert type(copied) is OrderDepth
+    assert (copied.buy_orders, copied.sell_orders) == (depth.buy_orders, depth.sell_orders)
+    depth.sell_orders = {}
+    assert depth.sell_orders == {}
+    assert vars(depth) == { 'buy_orders': depth.buy_orders, 'sell_orders': {} }
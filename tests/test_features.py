@@ -0,0 +1,47 @@
+import copy
+import numpy as np
+import backtester
+from features import FeatureSet
+
+
+def _values(rows: list[dict[str, dict[str, float]]]) -> np.ndarray:
+    return np.array([[value for group in row.values() for value in group.values()] for row in rows])
+
+
+def _day_with_gaps(round: int, day: int, seed=0):
+    # empty book sides, so the EMAs have to carry their value over NaN mids
+    day_data = copy.copy(backtester.load_day_data(round, day, time_limit=100000))
+    rng = np.random.default_rng(seed)
+    day_data.bid_prices = day_data.bid_prices.copy()
+    day_data.ask_prices = day_data.ask_prices.copy()
+    rows = len(day_data.row_symbol)
+    day_data.bid_prices[rng.random(rows) < 0.2] = np.nan
+    day_data.ask_prices[rng.random(rows) < 0.2] = np.nan
+    day_data.bid_prices[:int(day_data.row_start[5])] = np.nan
+    day_data._mid_index = None
+    return day_data
+
+
+def test_table_equals_the_incremental_features():
+    feature_set = FeatureSet(['best_bid', 'best_ask', 'mid', 'spread', 'imbalance', 'vwap_1', 'vwap_20', 'ema_1', 'ema_10', 'ema_50'])
+    for day_data in [backtester.load_day_data(2, 0), _day_with_gaps(1, 0), _day_with_gaps(2, -1, seed=1)]:
+        table = feature_set.table(day_data)
+        incremental = feature_set.incremental(day_data)
+        rows = [incremental.row(i, day_data.state_at(i)) for i in range(len(day_data))]
+        assert table.columns == incremental.columns
+        assert np.array_equal(table.values, _values(rows), equal_nan=True)
+        assert table.row(len(day_data) - 1, None).keys() == rows[-1].keys()
+
+
+def test_ema_keeps_its_value_over_missing_mids():
+    day_data = _day_with_gaps(1, 0)
+    table = FeatureSet(['mid', 'ema_10']).table(day_data)
+    mid = table.values[:, table.columns.index(('PEARLS', 'mid'))]
+    ema = table.values[:, table.columns.index(('PEARLS', 'ema_10'))]
+    # no mid before the first bid
+    first = int(np.flatnonzero(~np.isnan(mid))[0])
+    assert first > 0 and np.isnan(ema[:first]).all()
+    assert ema[first] == mid[first]
+    gaps = np.flatnonzero(np.isnan(mid[first + 1:])) + first + 1
+    assert len(gaps) > 0
+    assert (ema[gaps] == ema[gaps - 1]).all()
@@ -0,0 +1,52 @@
+import time
+from datamodel import TradingState
+from instrumentation import RunStats
+
+STATE = TradingState(0, {}, {}, {}, {}, {}, {})
+
+
+class Allocating:
+    def __init__(self):
+        time.sleep(0.02)
+
+    def run(self, state):
+        return [0] * 1_000_000
+
+
+class Worker:
+    # stands in for a TraderProcess
+    peak_rss_mb = 42.3
+
+    def run(self, state):
+        return {}
+
+
+def fields(line: str) -> dict[str, str]:
+    return dict(field.split(': ', 1) for field in line.rstrip('\n').split('\t'))
+
+
+def test_report_line_leaves_out_what_was_not_measured():
+    run_stats = RunStats()
+    run_stats.run(Allocating(), STATE)
+    report = fields(run_stats.report_line('abc'))
+    assert report['REPORT RequestId'] == 'abc'
+    assert 'Max Memory Used' not in report
+    assert 'Init Duration' not in report
+
+
+def test_report_line_has_the_memory_and_init_of_the_trader():
+    run_stats = RunStats(trace_memory=True)
+    trader = run_stats.create(Allocating)
+    run_stats.start()
+    run_stats.run(trader, STATE)
+    run_stats.stop()
+    report = fields(run_stats.report_line('abc'))
+    # the list of a million references, not the memory of the whole process
+    assert report['Max Memory Used'] in ('8 MB', '9 MB')
+    assert float(report['Init Duration'].removesuffix(' ms')) >= 20
+
+
+def test_report_line_prefers_the_worker_rss():
+    run_stats = RunStats(trace_memory=True)
+    run_stats.run(Worker(), STATE)
+    assert fields(run_stats.report_line('abc'))['Max Memory Used'] == '43 MB'
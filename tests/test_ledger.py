@@ -0,0 +1,85 @@
+import contextlib
+import io
+import numpy as np
+import pytest
+import backtester
+from datamodel import Order
+from ledger import Ledger
+
+TIMESTAMPS = np.array([0, 100, 200, 300])
+# (position the tick starts with, mid, trades as (price, quantity))
+TICKS = [
+    (0, 10.0, [(10, 2)]),
+    (2, 12.0, [(13, -2)]),
+    (0, 11.0, [(11, 1)]),
+    (1, 15.0, []),
+]
+
+
+def _run(keep_history: bool) -> tuple[Ledger, list[float]]:
+    # calls the ledger like the engine does, trades are booked on the next row
+    ledger = Ledger(['A'], TIMESTAMPS, keep_history)
+    totals = []
+    for i, (position, mid, trades) in enumerate(TICKS):
+        last = i == len(TICKS) - 1
+        target = i if last else i + 1
+        ledger.open_tick(i, { 'A': position }, { 'A': mid }, last)
+        for price, quantity in trades:
+            ledger.fill(target, 'A', price, quantity)
+            position += quantity
+        ledger.close_tick(i, target, { 'A': position }, { 'A': mid }, last)
+        totals.append(ledger.total(target))
+    return ledger, totals
+
+
+def test_ledger_books_realized_and_liquidated_pnl():
+    ledger, totals = _run(True)
+    # bought 2 at 10 (worth 20 at the mid), sold them at 13, bought 1 at 11
+    # and had it liquidated at 15
+    assert totals == [0.0, 6.0, 6.0, 10.0]
+    assert ledger.profits[:, 0].tolist() == [0.0, 0.0, 6.0, 10.0]
+    assert ledger.balance[:, 0].tolist() == [0.0, 0.0, 0.0, 0.0]
+    assert ledger.positions[:, 0].tolist() == [0, 2, 0, 1]
+    assert dict(ledger.series('profits')) == { 0: { 'A': 0.0 }, 100: { 'A': 0.0 }, 200: { 'A': 6.0 }, 300: { 'A': 10.0 } }
+
+
+def test_ledger_without_history_has_the_same_values():
+    with_history, totals = _run(True)
+    without_history, streamed = _run(False)
+    assert streamed == totals
+    assert len(without_history.profits) == 2
+    assert dict(without_history.series('profits')) == { 300: { 'A': 10.0 } }
+    assert without_history.series('balance')[300] == with_history.series('balance')[300]
+    with pytest.raises(KeyError):
+        without_history.series('profits')[200]
+
+
+class MarketMaker:
+    def __init__(self):
+        self.profits = None
+
+    def run(self, state):
+        orders = {}
+        for symbol, depth in state.order_depths.items():
+            if depth.buy_orders and depth.sell_orders:
+                orders[symbol] = [Order(symbol, max(depth.buy_orders) + 1, 3), Order(symbol, min(depth.sell_orders) - 1, -1)]
+        return orders
+
+    def after_last_round(self, profits, balance):
+        self.profits = dict(profits)
+        self.balance = dict(balance)
+
+
+def test_streaming_run_ends_with_the_same_pnl():
+    traders = []
+    results = []
+    for streaming in [False, True]:
+        traders.append(MarketMaker())
+        with contextlib.redirect_stdout(io.StringIO()):
+            results.append(backtester.simulate_alternative(1, 0, traders[-1], 200000, matching='depth', streaming=streaming, write_log=False))
+    assert results[0] == results[1]
+    last = max(traders[0].profits)
+    assert len(traders[0].profits) == 2001
+    assert traders[1].profits == { last: traders[0].profits[last] }
+    assert traders[1].balance == { last: traders[0].balance[last] }
+    assert any(value != 0 for value in results[0].values())
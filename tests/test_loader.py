@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import backtester
+from datamodel import Listing, OrderDepth, Trade, TradingState
+
+
+# process_prices / process_trades as they were before the columnar loader
+def _baseline_states(round: int, day: int, names: bool, time_limit: int) -> dict[int, TradingState]:
+    prices_path, trades_path = backtester.day_file_paths(round, day, names)
+    states = {}
+    for _, row in pd.read_csv(prices_path, sep=';').iterrows():
+        time = int(row['timestamp'])
+        if time > time_limit:
+            break
+        product = row['product']
+        if states.get(time) is None:
+            states[time] = TradingState(time, {}, {}, {}, {}, {}, {})
+        if product not in states[time].position and product in backtester.SYMBOLS_BY_ROUND_POSITIONABLE[round]:
+            states[time].position[product] = 0
+            states[time].own_trades[product] = []
+            states[time].market_trades[product] = []
+        states[time].listings[product] = Listing(product, product, '1')
+        if product == 'DOLPHIN_SIGHTINGS':
+            states[time].observations['DOLPHIN_SIGHTINGS'] = row['mid_price']
+        depth = OrderDepth()
+        for level in [1, 2, 3]:
+            if row[f'bid_price_{level}'] > 0:
+                depth.buy_orders[row[f'bid_price_{level}']] = int(row[f'bid_volume_{level}'])
+        for level in [1, 2, 3]:
+            if row[f'ask_price_{level}'] > 0:
+                depth.sell_orders[row[f'ask_price_{level}']] = -int(row[f'ask_volume_{level}'])
+        states[time].order_depths[product] = depth
+    for _, trade in pd.read_csv(trades_path, sep=';', dtype={ 'seller': str, 'buyer': str }).iterrows():
+        time = trade['timestamp']
+        if time > time_limit:
+            break
+        symbol = trade['symbol']
+        if symbol not in states[time].market_trades:
+            states[time].market_trades[symbol] = []
+        states[time].market_trades[symbol].append(Trade(symbol, trade['price'], trade['quantity'], str(trade['buyer']), str(trade['seller']), time))
+    return states
+
+
+def _number(value) -> tuple[type, float]:
+    # int and float keys are different order depth keys in the log
+    return (int if isinstance(value, (int, np.integer)) else float, value)
+
+
+def _plain(state: TradingState) -> tuple:
+    return (
+        state.timestamp,
+        [(symbol, listing.symbol, listing.product, listing.denomination) for symbol, listing in state.listings.items()],
+        [(symbol, [(_number(price), volume) for price, volume in depth.buy_orders.items()], [(_number(price), volume) for price, volume in depth.sell_orders.items()])
+         for symbol, depth in state.order_depths.items()],
+        [(symbol, [(t.symbol, _number(t.price), t.quantity, t.buyer, t.seller, t.timestamp) for t in trades]) for symbol, trades in state.market_trades.items()],
+        list(state.own_trades.items()),
+        list(state.position.items()),
+        list(state.observations.items()),
+    )
+
+
+def test_states_equal_the_row_by_row_loader(monkeypatch):
+    monkeypatch.setattr(backtester, 'CACHE_DATA_PREFIX', None)
+    for round, day, names in [(1, 0, True), (1, -1, False), (2, 1, True)]:
+        baseline = _baseline_states(round, day, names, 50000)
+        day_data = backtester.load_day_data(round, day, names, 50000)
+        assert day_data.timestamps.tolist() == list(baseline)
+        for i, state in enumerate(baseline.values()):
+            assert _plain(day_data.state_at(i)) == _plain(state)
+
+
+def test_day_states_build_every_state_once():
+    states = backtester.load_day_data(1, 0, time_limit=20000).states()
+    assert list(states) == list(range(0, 20100, 100))
+    assert states[500] is states[500]
+    assert 20100 not in states
@@ -0,0 +1,62 @@
+import copy
+import io
+import contextlib
+import tracemalloc
+import numpy as np
+import backtester
+from market_data import StreamingMids
+
+
+class IdleTrader:
+    def run(self, state):
+        return {}
+
+
+def _day_with_gaps(round: int, day: int, seed=0):
+    # a training day with random empty book sides, the first ticks have no bids at all
+    day_data = copy.copy(backtester.load_day_data(round, day, time_limit=50000))
+    rng = np.random.default_rng(seed)
+    day_data.bid_prices = day_data.bid_prices.copy()
+    day_data.ask_prices = day_data.ask_prices.copy()
+    rows = len(day_data.row_symbol)
+    day_data.bid_prices[rng.random(rows) < 0.15] = np.nan
+    day_data.ask_prices[rng.random(rows) < 0.15] = np.nan
+    day_data.bid_prices[:int(day_data.row_start[3])] = np.nan
+    day_data._mid_index = None
+    return day_data
+
+
+def test_streaming_mids_match_the_day_table():
+    for round, day in [(1, 0), (2, 1)]:
+        day_data = _day_with_gaps(round, day)
+        symbols = backtester.SYMBOLS_BY_ROUND_POSITIONABLE[round]
+        expected = day_data.mid_index().fallback_mids(symbols)
+        for window in [1, 7, 4096]:
+            mids = StreamingMids(day_data, window)
+            assert np.array_equal(np.array([mids.mids_at(symbols, i) for i in range(len(day_data))]), expected, equal_nan=True)
+
+
+def test_streaming_mids_of_a_shifted_day_look_forward_at_its_start():
+    day_data = _day_with_gaps(1, 0).shifted(3 * backtester.DAY_LENGTH)
+    symbols = backtester.SYMBOLS_BY_ROUND_POSITIONABLE[1]
+    mids = StreamingMids(day_data, 5)
+    assert mids.mids_at(symbols, 0) == day_data.mid_index().mids_at(symbols, 0)
+    assert not np.isnan(mids.mids_at(symbols, 0)).any()
+
+
+def _streaming_peak_mb(time_limit: int) -> float:
+    day_data = backtester.load_day_data(1, 0, time_limit=time_limit)
+    tracemalloc.start()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            backtester.simulate_alternative(1, 0, IdleTrader(), time_limit, day_data=day_data, streaming=True, write_log=False)
+        return tracemalloc.get_traced_memory()[1] / 2**20
+    finally:
+        tracemalloc.stop()
+
+
+def test_streaming_memory_does_not_grow_with_the_day():
+    # both runs are longer than one window of mids
+    short = _streaming_peak_mb(450000)
+    full = _streaming_peak_mb(999900)
+    assert full < short * 1.1
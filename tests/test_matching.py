@@ -0,0 +1,129 @@
+import contextlib
+import copy
+import io
+import random
+import statistics
+from datamodel import Order, OrderDepth, Trade
+from matching import MATCH_DEPTH, MATCH_EXACT, MATCH_HALFWAY, match_orders, match_trades
+
+
+class FollowingTrades:
+    # the part of TradeBook match_trades uses: market trades of the tick after 100
+    def __init__(self, levels: dict[int, int]):
+        self.levels = levels
+        self.next_time = { 100: 200 }
+
+    def following(self, time: int, symbol: str) -> dict[int, int]:
+        return self.levels if time == 100 else {}
+
+
+def _empty_book() -> dict[str, OrderDepth]:
+    depth = OrderDepth()
+    depth.buy_orders = {}
+    depth.sell_orders = {}
+    return { 'PEARLS': depth }
+
+
+def _fills(orders: list[Order], levels: dict[int, int]) -> list[tuple[int, int, int]]:
+    with contextlib.redirect_stdout(io.StringIO()):
+        trades = match_trades('PEARLS', orders, _empty_book(), 100, FollowingTrades(levels), share=1.0)
+    return [(trade.price, trade.quantity, trade.timestamp) for trade in trades]
+
+
+def test_resting_buys_use_the_lowest_crossing_trades_first():
+    orders = [Order('PEARLS', 12, 4), Order('PEARLS', 10, 4)]
+    # the trade book keeps the prices in file order, the fills don't depend on it
+    for levels in [{ 12: 4, 10: 4 }, { 10: 4, 12: 4 }]:
+        assert _fills(orders, levels) == [(12, 4, 200)]
+    assert _fills(orders, { 12: 4, 10: 6 }) == [(12, 4, 200), (10, 2, 200)]
+
+
+def test_resting_sells_use_the_highest_crossing_trades_first():
+    orders = [Order('PEARLS', 10, -4), Order('PEARLS', 12, -4)]
+    for levels in [{ 10: 4, 12: 4 }, { 12: 4, 10: 4 }]:
+        assert _fills(orders, levels) == [(10, -4, 200)]
+    assert _fills(orders, { 10: 4, 12: 6 }) == [(10, -4, 200), (12, -2, 200)]
+
+
+# clear_order_book as it was before the matching modes, exact and halfway
+def _baseline_clear_order_book(trader_orders: dict[str, list[Order]], order_depth: dict[str, OrderDepth], time: int, halfway: bool) -> list[Trade]:
+    trades = []
+    for symbol in trader_orders.keys():
+        if order_depth.get(symbol) is None:
+            continue
+        depth = copy.deepcopy(order_depth[symbol])
+        orders = []
+        for order_1 in trader_orders[symbol]:
+            final_order = copy.copy(order_1)
+            for order_2 in trader_orders[symbol]:
+                if order_1.price == order_2.price and order_1.quantity == order_2.quantity:
+                    continue
+                if order_1.price == order_2.price:
+                    final_order.quantity += order_2.quantity
+            orders.append(final_order)
+        for order in orders:
+            if order.quantity == 0:
+                continue
+            side = depth.buy_orders if order.quantity < 0 else depth.sell_orders
+            if halfway:
+                mid = statistics.median([max(depth.buy_orders), min(depth.sell_orders)])
+                if (order.price <= mid) if order.quantity < 0 else (order.price >= mid):
+                    trades.append(Trade(symbol, order.price, order.quantity, *(('BOT', 'YOU') if order.quantity < 0 else ('YOU', 'BOT')), time))
+                    continue
+            elif order.price in side:
+                volume = side[order.price]
+                if order.quantity < 0:
+                    trades.append(Trade(symbol, order.price, order.quantity if abs(volume) > abs(order.quantity) else -volume, 'BOT', 'YOU', time))
+                else:
+                    trades.append(Trade(symbol, order.price, order.quantity if abs(volume) > abs(order.quantity) else abs(volume), 'YOU', 'BOT', time))
+                continue
+            print(f'No matches for order {order} at time {time}')
+            print(f'Order depth is {order_depth[order.symbol].__dict__}')
+    return trades
+
+
+def _book(buy_orders: dict[int, int], sell_orders: dict[int, int]) -> dict[str, OrderDepth]:
+    depth = OrderDepth()
+    depth.buy_orders = buy_orders
+    depth.sell_orders = sell_orders
+    return { 'PEARLS': depth }
+
+
+def _trades(trades: list[Trade]) -> list[tuple]:
+    return [(t.symbol, t.price, t.quantity, t.buyer, t.seller, t.timestamp) for t in trades]
+
+
+def test_exact_and_halfway_matching_equal_the_old_order_book():
+    rng = random.Random(0)
+    for _ in range(300):
+        bids = rng.sample(range(95, 100), rng.randint(1, 3))
+        asks = rng.sample(range(101, 106), rng.randint(1, 3))
+        book = _book({ price: rng.randint(1, 10) for price in bids }, { price: -rng.randint(1, 10) for price in asks })
+        orders = [Order('PEARLS', rng.randint(94, 106), rng.choice([-4, -2, -1, 1, 2, 4])) for _ in range(rng.randint(1, 4))]
+        for mode, halfway in [(MATCH_EXACT, False), (MATCH_HALFWAY, True)]:
+            outputs = []
+            results = []
+            for match in [lambda: match_orders({ 'PEARLS': orders }, book, 100, mode), lambda: _baseline_clear_order_book({ 'PEARLS': orders }, book, 100, halfway)]:
+                with contextlib.redirect_stdout(io.StringIO()) as output:
+                    results.append(_trades(match()))
+                outputs.append(output.getvalue())
+            assert results[0] == results[1]
+            assert outputs[0] == outputs[1]
+
+
+def test_depth_matching_walks_the_book_and_uses_up_its_volume():
+    book = _book({ 99: 4, 98: 10 }, { 101: -3, 102: -5 })
+    orders = [Order('PEARLS', 102, 6), Order('PEARLS', 102, 4), Order('PEARLS', 100, 2), Order('PEARLS', 98, -6)]
+    with contextlib.redirect_stdout(io.StringIO()) as output:
+        trades = match_orders({ 'PEARLS': orders }, book, 100, MATCH_DEPTH)
+    assert _trades(trades) == [
+        ('PEARLS', 101, 3, 'YOU', 'BOT', 100),
+        ('PEARLS', 102, 3, 'YOU', 'BOT', 100),
+        ('PEARLS', 102, 2, 'YOU', 'BOT', 100),
+        ('PEARLS', 99, -4, 'BOT', 'YOU', 100),
+        ('PEARLS', 98, -2, 'BOT', 'YOU', 100),
+    ]
+    # the buy at 100 crosses nothing
+    assert output.getvalue().count('No matches') == 1
+    # the book itself is left alone
+    assert book['PEARLS'].sell_orders == { 101: -3, 102: -5 }
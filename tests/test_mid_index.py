@@ -0,0 +1,69 @@
+import copy
+import statistics
+import numpy as np
+import backtester
+from market_data import MidIndex
+
+
+# calc_mid as it was before the mid index, a backward (forward at time 0)
+# scan over the states that continues from where the previous symbol ended
+def _baseline_mids(states, symbols: list[str], time: int, max_time: int) -> list[float]:
+    mids = []
+    non_empty_time = time
+    for symbol in symbols:
+        hitted_zero = False
+        while len(states[non_empty_time].order_depths[symbol].sell_orders.keys()) == 0 or len(states[non_empty_time].order_depths[symbol].buy_orders.keys()) == 0:
+            if time == 0 or hitted_zero and time != max_time:
+                hitted_zero = True
+                non_empty_time += backtester.TIME_DELTA
+            else:
+                non_empty_time -= backtester.TIME_DELTA
+        mids.append(statistics.median([min(states[non_empty_time].order_depths[symbol].sell_orders.keys()), max(states[non_empty_time].order_depths[symbol].buy_orders.keys())]))
+    return mids
+
+
+def _day_with_gaps(round: int, day: int, seed: int):
+    day_data = copy.copy(backtester.load_day_data(round, day, time_limit=30000))
+    rng = np.random.default_rng(seed)
+    day_data.bid_prices = day_data.bid_prices.copy()
+    day_data.ask_prices = day_data.ask_prices.copy()
+    rows = len(day_data.row_symbol)
+    day_data.bid_prices[rng.random(rows) < 0.3] = np.nan
+    day_data.ask_prices[rng.random(rows) < 0.3] = np.nan
+    day_data._mid_index = None
+    return day_data
+
+
+def test_fallback_mids_equal_the_backward_scan():
+    for round, day, seed in [(1, 0, 0), (2, -1, 1), (2, 1, 2)]:
+        day_data = _day_with_gaps(round, day, seed)
+        symbols = backtester.SYMBOLS_BY_ROUND_POSITIONABLE[round]
+        states = day_data.states()
+        table = MidIndex(day_data).fallback_mids(symbols)
+        max_time = int(day_data.timestamps[-1])
+        found = 0
+        for i, time in enumerate(day_data.timestamps.tolist()):
+            try:
+                expected = _baseline_mids(states, symbols, time, max_time)
+            except KeyError:
+                # the scan ran off the day, the table has no mid for a symbol
+                assert np.isnan(table[i]).any()
+                continue
+            assert table[i].tolist() == expected
+            found += 1
+        assert found > len(day_data) // 2
+
+
+def test_best_prices_ignore_missing_levels():
+    day_data = _day_with_gaps(1, 0, 3)
+    mid_index = MidIndex(day_data)
+    states = day_data.states()
+    for i, time in enumerate(day_data.timestamps.tolist()):
+        for symbol, depth in states[time].order_depths.items():
+            j = mid_index.column[symbol]
+            assert mid_index.valid[i, j] == bool(depth.buy_orders and depth.sell_orders)
+            if depth.buy_orders:
+                assert mid_index.best_bid[i, j] == max(depth.buy_orders)
+            if mid_index.valid[i, j]:
+                assert mid_index.mid[i, j] == statistics.median([max(depth.buy_orders), min(depth.sell_orders)])
+                assert mid_index.last_valid[i, j] == i == mid_index.next_valid[i, j]
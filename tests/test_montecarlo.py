@@ -0,0 +1,63 @@
+import contextlib
+import io
+import numpy as np
+from datamodel import Order
+from montecarlo import _within_limits, pnl_distribution, simulate_monte_carlo
+
+
+def _accepted_per_seed(fills: np.ndarray, ticks: np.ndarray, limit: int) -> np.ndarray:
+    # the engine, one seed at a time: a fill past the limit drops the rest of the symbol's tick
+    accepted = np.zeros_like(fills)
+    for seed in range(fills.shape[1]):
+        position = 0
+        failed_tick = None
+        for j, fill in enumerate(fills[:, seed].tolist()):
+            if failed_tick == ticks[j]:
+                continue
+            if abs(position + fill) > limit:
+                failed_tick = ticks[j]
+                continue
+            accepted[j, seed] = fill
+            position += fill
+    return accepted
+
+
+def test_within_limits_equals_the_fills_accepted_seed_by_seed():
+    rng = np.random.default_rng(0)
+    for _ in range(50):
+        orders = int(rng.integers(1, 40))
+        ticks = np.sort(rng.integers(0, 10, orders))
+        fills = (rng.integers(-6, 7, (orders, 8)) * (rng.random((orders, 8)) < 0.7)).astype(np.int32)
+        limit = int(rng.integers(3, 20))
+        assert (_within_limits(fills, ticks, limit) == _accepted_per_seed(fills, ticks, limit)).all()
+
+
+class Quoting:
+    # rests one below the best ask and one above the best bid
+    def run(self, state):
+        orders = {}
+        for symbol, depth in state.order_depths.items():
+            if depth.buy_orders and depth.sell_orders:
+                orders[symbol] = [Order(symbol, max(depth.buy_orders) - 1, 2), Order(symbol, min(depth.sell_orders) + 1, -2)]
+        return orders
+
+
+def _pnl(seed=1, **kwargs) -> dict[str, np.ndarray]:
+    with contextlib.redirect_stdout(io.StringIO()):
+        return simulate_monte_carlo(1, 0, Quoting(), seeds=300, seed=seed, time_limit=50000, **kwargs)
+
+
+def test_seeds_are_reproducible_and_vary():
+    pnl = _pnl()
+    assert pnl.keys() == {'PEARLS', 'BANANAS'}
+    assert all((pnl[symbol] == values).all() for symbol, values in _pnl().items())
+    assert pnl['PEARLS'].std() > 0
+    table = pnl_distribution(pnl)
+    assert list(table.index) == ['PEARLS', 'BANANAS', 'total']
+    assert np.isclose(table.loc['total', 'mean'], (pnl['PEARLS'] + pnl['BANANAS']).mean())
+
+
+def test_orders_that_cannot_fill_leave_every_seed_at_zero():
+    # resting orders only fill by chance, without any chance nothing happens
+    pnl = _pnl(queue_fill=0.0, trade_share=0.0)
+    assert all((values == 0).all() for values in pnl.values())
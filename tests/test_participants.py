@@ -0,0 +1,69 @@
+import contextlib
+import io
+import numpy as np
+import backtester
+from participants import ParticipantPnL
+
+
+class IdleTrader:
+    def run(self, state):
+        return {}
+
+
+def _from_states(day_data, symbols: list[str], names: list[str]) -> tuple[np.ndarray, np.ndarray]:
+    # position and cash of every participant after every tick, trade by trade
+    positions = np.zeros((len(names), len(day_data), len(symbols)), dtype=np.int64)
+    cash = np.zeros(positions.shape)
+    position = np.zeros((len(names), len(symbols)), dtype=np.int64)
+    spent = np.zeros(position.shape)
+    for i in range(len(day_data)):
+        for symbol, trades in day_data.state_at(i).market_trades.items():
+            if symbol not in symbols:
+                continue
+            for trade in trades:
+                for name, sign in [(trade.buyer, 1), (trade.seller, -1)]:
+                    if name in names:
+                        position[names.index(name), symbols.index(symbol)] += sign * trade.quantity
+                        spent[names.index(name), symbols.index(symbol)] -= sign * trade.price * trade.quantity
+        positions[:, i] = position
+        cash[:, i] = spent
+    return positions, cash
+
+
+def test_positions_and_pnl_follow_the_market_trades():
+    for round, day in [(1, 0), (2, -1)]:
+        day_data = backtester.load_day_data(round, day, time_limit=300000)
+        symbols = backtester.SYMBOLS_BY_ROUND_POSITIONABLE[round]
+        mids = day_data.mid_index().fallback_mids(symbols)
+        participants = ParticipantPnL(day_data, symbols, mids=mids)
+        positions, cash = _from_states(day_data, symbols, participants.names)
+        assert len(participants.names) > 1
+        assert (participants.positions == positions).all()
+        # profits + balance is always the cash plus the position at the mid
+        assert np.allclose(participants.pnl, cash + mids[None] * positions)
+        # and everything is liquidated at the last tick
+        assert np.allclose(participants.profits[:, -1], cash[:, -1] + mids[-1] * positions[:, -1])
+        assert (participants.balance[:, -1] == 0).all()
+
+
+def test_profits_only_change_when_a_position_closes():
+    day_data = backtester.load_day_data(1, -1, time_limit=300000)
+    participants = ParticipantPnL(day_data, ['PEARLS', 'BANANAS'])
+    # closes compare with the position two ticks back, like the old monkey loop
+    before = np.zeros(participants.positions.shape, dtype=np.int64)
+    before[:, 2:] = participants.positions[:, :-2]
+    closed = (participants.positions == 0) & (before != 0)
+    changed = np.diff(participants.profits[:, :-1], axis=1, prepend=0.0) != 0
+    assert closed.any()
+    assert not (changed & ~closed[:, :-1]).any()
+
+
+def test_monkeys_print_their_final_pnl_and_trades():
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        backtester.simulate_alternative(1, 0, IdleTrader(), 20000, monkeys=True, write_log=False, monkey_names=['Caesar', 'Paris'])
+    lines = output.getvalue().splitlines()
+    assert 'End of monkey simulation reached.' in lines
+    pnl = next(line for line in lines if line.startswith('PNL + BALANCE monkeys'))
+    assert "'Caesar'" in pnl and "'Paris'" in pnl
+    assert any(line.startswith('Trades monkeys') for line in lines)
@@ -0,0 +1,73 @@
+import contextlib
+import io
+import itertools
+import backtester
+import results_store
+from datamodel import Order
+from ledger import RunSeries
+from results_store import ResultsStore, sandbox_logs, trader_identity
+
+
+class MarketMaker:
+    def run(self, state):
+        orders = {}
+        for symbol, depth in state.order_depths.items():
+            if depth.buy_orders and depth.sell_orders:
+                orders[symbol] = [Order(symbol, max(depth.buy_orders) + 1, 2), Order(symbol, min(depth.sell_orders) - 1, -2)]
+        return orders
+
+
+def _log_paths(monkeypatch, tmp_path) -> list[str]:
+    paths = []
+    counter = itertools.count()
+
+    def new_log_path(compress=False):
+        paths.append(str(tmp_path / f'{next(counter)}.log'))
+        return paths[-1]
+    monkeypatch.setattr(backtester, 'new_log_path', new_log_path)
+    monkeypatch.setattr(results_store, 'new_log_path', new_log_path)
+    return paths
+
+
+def _add(store: ResultsStore, day: int, total: float, params: dict, trader=('traders:Trader', 'abc')) -> int:
+    return store.add_run(1, day, {'PEARLS': total / 2, 'BANANAS': total / 2}, trader, params)
+
+
+def test_best_ranks_by_the_mean_pnl_per_day(tmp_path):
+    with ResultsStore(str(tmp_path / 'results.db')) as store:
+        # more days, bigger sum, smaller mean
+        for day in [-2, -1, 0]:
+            _add(store, day, 100.0, {'spread': 1})
+        for day in [-2, -1]:
+            _add(store, day, 120.0, {'spread': 2})
+        best = store.best(round=1)
+        assert [(row['params'], row['days'], row['mean_pnl'], row['pnl']) for row in best] == \
+            [('{"spread": 2}', 2, 120.0, 240.0), ('{"spread": 1}', 3, 100.0, 300.0)]
+        assert [row['days'] for row in store.best(round=1, symbol='PEARLS')] == [2, 3]
+
+
+def test_best_counts_the_latest_run_of_a_day_and_skips_stopped_runs(tmp_path):
+    with ResultsStore(str(tmp_path / 'results.db')) as store:
+        _add(store, 0, 500.0, {'spread': 1})
+        _add(store, 0, 10.0, {'spread': 1})
+        _add(store, 0, 50.0, {'spread': 2})
+        store.add_run(1, -1, {'PEARLS': 1000.0}, ('traders:Trader', 'abc'), {'spread': 3}, stopped='drawdown')
+        assert [(row['params'], row['pnl']) for row in store.best()] == [('{"spread": 2}', 50.0), ('{"spread": 1}', 10.0)]
+        assert store.best(trader='other:Trader') == []
+
+
+def test_exported_log_equals_the_log_of_the_run(monkeypatch, tmp_path):
+    paths = _log_paths(monkeypatch, tmp_path)
+    trader = MarketMaker()
+    series = RunSeries()
+    with contextlib.redirect_stdout(io.StringIO()):
+        pnl = backtester.simulate_alternative(1, 0, trader, time_limit=100000, matching='depth', series=series)
+    with ResultsStore(str(tmp_path / 'results.db')) as store:
+        run_id = store.add_run(1, 0, pnl, trader_identity(trader), matching='depth', time_limit=100000, series=series, sandbox=sandbox_logs(trader, series))
+        with contextlib.redirect_stdout(io.StringIO()):
+            exported = store.export_log(run_id)
+        stored = store.series(run_id)
+    assert exported == paths[1]
+    assert open(paths[1]).read() == open(paths[0]).read()
+    assert stored.symbols == series.symbols
+    assert (stored.pnl == series.pnl).all() and (stored.positions == series.positions).all()
@@ -0,0 +1,41 @@
+import functools
+import numpy as np
+import backtester
+from checkpoints import Checkpoints
+from datamodel import Order
+from ledger import RunSeries
+from risk import RiskMetrics
+
+
+class BuyingTrader:
+    # buys one more of every symbol at the best ask every tick
+    def run(self, state):
+        orders = {}
+        for symbol, depth in state.order_depths.items():
+            if depth.sell_orders:
+                orders[symbol] = [Order(symbol, min(depth.sell_orders), 1)]
+        return orders
+
+
+def _run(start_time=0):
+    series = RunSeries()
+    # a window longer than the run keeps all pnl changes
+    risk = RiskMetrics(window=1000)
+    backtester.simulate_alternative(1, 0, BuyingTrader(), time_limit=20000, write_log=False,
+                                    checkpoint_every=10000, start_time=start_time, series=series, risk=risk)
+    return series, risk
+
+
+def test_resumed_run_starts_from_the_pnl_of_its_checkpoint(tmp_path, monkeypatch):
+    monkeypatch.setattr(backtester, 'Checkpoints', functools.partial(Checkpoints, prefix=str(tmp_path)))
+    full, _ = _run()
+    resumed, risk = _run(10000)
+    start = resumed.start
+    assert start > 0
+
+    # the ledger of the checkpoint already holds the pnl of its tick
+    tail = full.pnl.sum(axis=1)[start:]
+    assert tail[0] < 0
+    assert risk.pnl == tail[-1]
+    assert np.isclose(risk.max_drawdown, (np.maximum.accumulate(tail) - tail).max())
+    assert np.allclose(list(risk.changes), np.diff(tail, prepend=tail[0]))
@@ -0,0 +1,28 @@
+import os
+from server import BacktestServer
+
+BROKEN = 'class Trader:\n    def run(self, state):\n        return {\n'
+FIXED = 'class Trader:\n    def run(self, state):\n        return {}\n'
+
+
+def _write(path, text: str, mtime_ns: int):
+    path.write_text(text)
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_watch_recovers_from_a_trader_that_never_imported(tmp_path):
+    trader = tmp_path / 'watched_broken_trader.py'
+    _write(trader, BROKEN, 1_000_000_000)
+    server = BacktestServer(f'{trader}:Trader', [(1, 0)], time_limit=1000, workers=1)
+    server.load()
+
+    assert server.check()
+    assert server.module is None
+    assert server.results == []
+    assert server.path == str(trader)
+
+    assert not server.check()
+    _write(trader, FIXED, 2_000_000_000)
+    assert server.check()
+    assert server.module is not None
+    assert [(result['round'], result['day'], result['error']) for result in server.results] == [(1, 0, None)]
@@ -0,0 +1,54 @@
+import contextlib
+import io
+import backtester
+from datamodel import Order
+from session import session_table, simulate_session
+
+
+class RecordingTrader:
+    # buys for a while, then sells, and keeps every timestamp and position it was shown
+    def __init__(self):
+        self.seen = []
+
+    def run(self, state):
+        self.seen.append((state.timestamp, dict(state.position)))
+        orders = {}
+        for symbol, depth in state.order_depths.items():
+            if depth.buy_orders and depth.sell_orders:
+                if len(self.seen) % 40 < 25:
+                    orders[symbol] = [Order(symbol, min(depth.sell_orders), 1)]
+                else:
+                    orders[symbol] = [Order(symbol, max(depth.buy_orders), -1)]
+        return orders
+
+
+def _session(days: list[int], streaming=False, trader=None) -> list[dict]:
+    with contextlib.redirect_stdout(io.StringIO()):
+        return simulate_session(1, days, trader or RecordingTrader(), time_limit=30000, matching='depth', streaming=streaming, write_log=False)
+
+
+def test_session_of_one_day_equals_a_single_run():
+    with contextlib.redirect_stdout(io.StringIO()):
+        pnl = backtester.simulate_alternative(1, 0, RecordingTrader(), 30000, matching='depth', write_log=False)
+    results = _session([0])
+    assert results[0]['pnl'] == pnl == results[0]['cumulative']
+
+
+def test_trader_and_position_carry_over_to_the_next_day():
+    trader = RecordingTrader()
+    results = _session([-1, 0], trader=trader)
+    # the second day is shifted behind the first and the same trader goes on
+    times = [time for time, _ in trader.seen]
+    assert times == list(range(0, 30100, 100)) + list(range(backtester.DAY_LENGTH, backtester.DAY_LENGTH + 30100, 100))
+    # positions aren't liquidated at the end of the first day, they move by
+    # at most the one bought or sold per tick, also into the next day
+    assert all(abs(position) > 1 for position in trader.seen[301][1].values())
+    for (_, before), (_, after) in zip(trader.seen, trader.seen[1:]):
+        assert all(abs(after[symbol] - before[symbol]) <= 1 for symbol in before)
+    assert results[1]['cumulative'] == { symbol: results[0]['cumulative'][symbol] + results[1]['pnl'][symbol] for symbol in results[1]['pnl'] }
+    table = session_table(results)
+    assert table['cumulative'].iloc[-1] == sum(results[1]['cumulative'].values())
+
+
+def test_streaming_session_equals_the_session():
+    assert _session([-2, -1, 0], streaming=True) == _session([-2, -1, 0])
@@ -0,0 +1,54 @@
+import contextlib
+import functools
+import io
+import backtester
+import sweep
+from datamodel import Order
+
+
+class MarketMaker:
+    size = 2
+
+    def run(self, state):
+        orders = {}
+        for symbol, depth in state.order_depths.items():
+            if self.size and depth.buy_orders and depth.sell_orders:
+                orders[symbol] = [Order(symbol, max(depth.buy_orders) + 1, self.size), Order(symbol, min(depth.sell_orders) - 1, -self.size)]
+        return orders
+
+
+def test_samples_cover_the_space():
+    assert sweep.grid({'a': [1, 2], 'b': ['x']}) == [{'a': 1, 'b': 'x'}, {'a': 2, 'b': 'x'}]
+    samples = sweep.latin_hypercube({'a': (0, 10), 'b': [1, 2, 3, 4, 5]}, 5, seed=1)
+    # one sample per stratum of every parameter
+    assert sorted(sample['a'] // 2 for sample in samples) == [0, 1, 2, 3, 4]
+    assert sorted(sample['b'] for sample in samples) == [1, 2, 3, 4, 5]
+    assert sweep.random_samples({'a': (0.5, 1.0)}, 3, seed=2) == sweep.random_samples({'a': (0.5, 1.0)}, 3, seed=2)
+    assert sweep.parse_param('a=1,x,2.5') == ('a', [1, 'x', 2.5])
+    assert sweep.parse_param('a=0.5:2') == ('a', (0.5, 2))
+
+
+def test_run_sweep_ranks_the_configs_by_their_total():
+    days = [(1, -1), (1, 0)]
+    results = sweep.run_sweep(functools.partial(sweep.with_params, MarketMaker), [{'size': 0}, {'size': 2}], days, time_limit=50000, max_workers=1, matching='depth')
+    expected = {}
+    for size in [0, 2]:
+        with contextlib.redirect_stdout(io.StringIO()):
+            pnl = [backtester.simulate_alternative(round, day, sweep.with_params(MarketMaker, size=size), 50000, matching='depth', write_log=False) for round, day in days]
+        expected[size] = sum(sum(day_pnl.values()) for day_pnl in pnl)
+    assert expected[2] != 0 and expected[0] == 0
+    ranked = sorted(expected, key=expected.get, reverse=True)
+    assert results['size'].tolist() == ranked
+    assert results['total'].tolist() == [expected[size] for size in ranked]
+    assert results['rank'].tolist() == [1, 2]
+    assert set(results.columns) >= {'day_1_-1', 'day_1_0', 'PEARLS', 'BANANAS', 'error'}
+
+
+def test_worker_keeps_a_bounded_number_of_days():
+    sweep._worker_day_data.cache_clear()
+    for day in [-2, -1, 0, -1]:
+        sweep._worker_day_data(1, day, True, 10000)
+    info = sweep._worker_day_data.cache_info()
+    assert info.currsize == sweep.WORKER_DAYS
+    assert info.hits == 1
+    sweep._worker_day_data.cache_clear()
@@ -0,0 +1,31 @@
+from datamodel import Order
+from matching import MATCH_DEPTH, match_orders
+from synthetic import fit_round, generate_columns, generate_day_data
+
+
+def test_generated_book_has_negative_sell_volumes():
+    models = fit_round(1, [0])
+    day_data = generate_day_data(models, 200, 1, seed=1)
+    checked = 0
+    for i in range(len(day_data)):
+        for depth in day_data.state_at(i).order_depths.values():
+            assert all(volume < 0 for volume in depth.sell_orders.values())
+            assert all(volume > 0 for volume in depth.buy_orders.values())
+            checked += len(depth.sell_orders)
+    assert checked > 0
+
+
+def test_generated_csv_volumes_are_positive():
+    prices, _, _, _ = generate_columns(fit_round(1, [0]), 100, seed=2)
+    for side in ['bid_volumes', 'ask_volumes']:
+        volumes = prices[side]
+        assert (volumes[volumes == volumes] > 0).all()
+
+
+def test_depth_matching_fills_buys_on_generated_days():
+    day_data = generate_day_data(fit_round(1, [0]), 50, 1, seed=3)
+    state = day_data.state_at(10)
+    symbol, depth = next((symbol, depth) for symbol, depth in state.order_depths.items() if depth.sell_orders)
+    best_ask = min(depth.sell_orders)
+    trades = match_orders({ symbol: [Order(symbol, best_ask, 1)] }, state.order_depths, state.timestamp, MATCH_DEPTH)
+    assert sum(trade.quantity for trade in trades) == 1
@@ -0,0 +1,17 @@
+import os
+from trader_logging import SPILL_COMPACT_BYTES, LocalLogs
+
+
+def test_spill_file_stays_bounded_when_days_overwrite_the_logs():
+    logs = LocalLogs(max_in_memory=10)
+    log = 'x' * 1000
+    for day in range(20):
+        for time in range(0, 100000, 100):
+            logs[time] = f'{day} {time} {log}'
+    assert len(logs) == 1000
+    assert os.fstat(logs.file.fileno()).st_size <= 2 * logs.live + SPILL_COMPACT_BYTES + len(log) * 2
+    assert logs[0] == f'19 0 {log}'
+    assert [logs[time] for time in logs] == [f'19 {time} {log}' for time in range(0, 100000, 100)]
+
+    logs.clear()
+    assert logs.file is None and len(logs) == 0
@@ -0,0 +1,55 @@
+import importlib
+import sys
+import time
+import pytest
+from datamodel import TradingState
+from trader_process import TraderMemoryError, TraderProcess
+
+# allocates just over the 128 MB limit in touched chunks and would then sleep for a long time
+HOG = '''import time
+
+class Trader:
+    def run(self, state):
+        chunks = []
+        for _ in range(14):
+            chunks.append(b'x' * 10_000_000)
+        time.sleep(30)
+        return {}
+'''
+
+
+@pytest.mark.skipif(not sys.platform.startswith('linux'), reason='RSS is only polled through /proc')
+def test_memory_limit_kills_the_worker_during_the_call(tmp_path, monkeypatch):
+    (tmp_path / 'memory_hog_trader.py').write_text(HOG)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    trader_class = importlib.import_module('memory_hog_trader').Trader
+
+    with TraderProcess(trader_class, timeout_ms=60_000, memory_limit_mb=128) as trader:
+        start = time.perf_counter()
+        with pytest.raises(TraderMemoryError, match='during the call'):
+            trader.run(TradingState(0, {}, {}, {}, {}, {}, {}))
+        assert time.perf_counter() - start < 10
+        assert trader.process is None
+
+
+
+# echoes the position it was shown as the price of an order
+ECHO = '''from datamodel import Order
+
+class Trader:
+    def run(self, state):
+        return {symbol: [Order(symbol, position, 1)] for symbol, position in state.position.items()}
+'''
+
+
+def test_worker_gets_the_position_when_it_changes(tmp_path, monkeypatch):
+    (tmp_path / 'echo_trader.py').write_text(ECHO)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    trader_class = importlib.import_module('echo_trader').Trader
+
+    positions = [{'PEARLS': 0}, {'PEARLS': 0}, {'PEARLS': 3}, {'PEARLS': 3, 'BANANAS': -2}, {'PEARLS': 3, 'BANANAS': -2}, {}]
+    with TraderProcess(trader_class) as trader:
+        for timestamp, position in enumerate(positions):
+            orders = trader.run(TradingState(timestamp * 100, {}, {}, {}, {}, position, {}))
+            assert { symbol: [(o.symbol, o.price, o.quantity) for o in symbol_orders] for symbol, symbol_orders in orders.items() } == \
+                { symbol: [(symbol, quantity, 1)] for symbol, quantity in position.items() }
@@ -0,0 +1,153 @@
+from datamodel import *
+from collections.abc import MutableMapping
+from typing import Any
+import tempfile
+
+# Same settings as the Logger of jmerle's visualizer
+_encoder = ProsperityEncoder(separators=(",", ":"), sort_keys=True)
+# Dead bytes the spill file of LocalLogs may hold before it is compacted
+SPILL_COMPACT_BYTES = 1 << 20
+
+
+def plain_trades(trades: Dict[Symbol, List[Trade]]) -> dict[str, list[dict[str, Any]]]:
+    return {
+        symbol: [
+            {
+                'symbol': trade.symbol,
+                'price': trade.price,
+                'quantity': trade.quantity,
+                'buyer': trade.buyer,
+                'seller': trade.seller,
+                'timestamp': trade.timestamp,
+            } for trade in symbol_trades
+        ] for symbol, symbol_trades in trades.items()
+    }
+
+
+def plain_orders(orders: Dict[Symbol, List[Order]]) -> dict[str, list[dict[str, Any]]]:
+    return {
+        symbol: [{ 'symbol': order.symbol, 'price': order.price, 'quantity': order.quantity } for order in symbol_orders]
+        for symbol, symbol_orders in orders.items()
+    }
+
+
+def plain_state(state: TradingState) -> dict[str, Any]:
+    """
+    The TradingState as the dicts and lists ProsperityEncoder turns it into,
+    so json can encode it without calling back into python for every object.
+    """
+    return {
+        'timestamp': state.timestamp,
+        'listings': {
+            symbol: { 'symbol': listing.symbol, 'product': listing.product, 'denomination': listing.denomination }
+            for symbol, listing in state.listings.items()
+        },
+        'order_depths': {
+            symbol: { 'buy_orders': depth.buy_orders, 'sell_orders': depth.sell_orders }
+            for symbol, depth in state.order_depths.items()
+        },
+        'own_trades': plain_trades(state.own_trades),
+        'market_trades': plain_trades(state.market_trades),
+        'position': state.position,
+        'observations': state.observations,
+    }
+
+
+def flush_json(state: TradingState, orders: Dict[Symbol, List[Order]], logs: str) -> str:
+    """
+    Same string as
+    json.dumps({"state": state, "orders": orders, "logs": logs}, cls=ProsperityEncoder, separators=(",", ":"), sort_keys=True)
+    """
+    return _encoder.encode({
+        'state': plain_state(state),
+        'orders': plain_orders(orders),
+        'logs': logs,
+    })
+
+
+class LocalLogs(MutableMapping):
+    """
+    `dict[int, str]` for Logger.local_logs that keeps at most max_in_memory
+    logs in memory, older ones are moved to a temporary file and read back
+    from there (in order, when the log file is written).
+
+    Logs that are overwritten (the same timestamps on the next day) or
+    deleted leave dead bytes in the file. Once there are more of them than
+    live ones (and more than SPILL_COMPACT_BYTES) the live logs are copied
+    to a new file, so it stays below twice the size of the logs it holds
+    plus SPILL_COMPACT_BYTES. clear() deletes the file.
+    """
+
+    def __init__(self, max_in_memory=1000):
+        self.max_in_memory = max_in_memory
+        self.memory: dict[int, str] = {}
+        # timestamp -> (offset, length) in the spill file
+        self.spilled: dict[int, tuple[int, int]] = {}
+        self.file = None
+        self.size = 0
+        self.live = 0
+
+    def __setitem__(self, time: int, log: str):
+        if time in self.spilled:
+            self._drop(time)
+        self.memory.pop(time, None)
+        self.memory[time] = log
+        while len(self.memory) > self.max_in_memory:
+            oldest = next(iter(self.memory))
+            self._spill(oldest, self.memory.pop(oldest))
+
+    def _spill(self, time: int, log: str):
+        if self.file is None:
+            self.file = tempfile.TemporaryFile()
+        elif self.size - self.live > max(self.live, SPILL_COMPACT_BYTES):
+            self._compact()
+        data = log.encode('utf-8')
+        self.file.seek(self.size)
+        self.file.write(data)
+        self.spilled[time] = (self.size, len(data))
+        self.size += len(data)
+        self.live += len(data)
+
+    def _drop(self, time: int):
+        self.live -= self.spilled.pop(time)[1]
+
+    def _compact(self):
+        old = self.file
+        self.file = tempfile.TemporaryFile()
+        offset = 0
+        for time, (old_offset, length) in self.spilled.items():
+            old.seek(old_offset)
+            self.file.write(old.read(length))
+            self.spilled[time] = (offset, length)
+            offset += length
+        old.close()
+        self.size = offset
+
+    def __getitem__(self, time: int) -> str:
+        if time in self.memory:
+            return self.memory[time]
+        offset, length = self.spilled[time]
+        self.file.seek(offset)
+        return self.file.read(length).decode('utf-8')
+
+    def __delitem__(self, time: int):
+        if time in self.memory:
+            del self.memory[time]
+        else:
+            self._drop(time)
+
+    def __iter__(self):
+        yield from list(self.spilled)
+        yield from list(self.memory)
+
+    def __len__(self) -> int:
+        return len(self.memory) + len(self.spilled)
+
+    def clear(self):
+        self.memory.clear()
+        self.spilled.clear()
+        self.size = 0
+        self.live = 0
+        if self.file is not None:
+            self.file.close()
+            self.file = None
@@ -0,0 +1,395 @@
+from datamodel import Listing, Order, OrderDepth, Trade, TradingState
+from typing import Any, Callable
+import os
+import pickle
+import resource
+import select
+import struct
+import subprocess
+import sys
+import time
+
+# Limits of the platform, a call may take RUN_TIMEOUT_MS and the process
+# may use TRADER_MEMORY_MB at most
+RUN_TIMEOUT_MS = 900.0
+TRADER_MEMORY_MB = 128.0
+# Time the worker gets to import the trader and answer the first message
+START_TIMEOUT_S = 30.0
+# How often the RSS of a busy worker is checked against the memory limit
+MEMORY_POLL_S = 0.005
+PAGE_MB = resource.getpagesize() / (1 << 20)
+
+_length = struct.Struct('<I')
+
+
+class TraderError(Exception):
+    pass
+
+
+class TraderTimeout(TraderError):
+    pass
+
+
+class TraderMemoryError(TraderError):
+    pass
+
+
+# States and orders cross the pipe as pickled tuples of builtins, so the
+# worker only needs datamodel and the trader itself
+def encode_trades(trades: dict[str, list[Trade]]) -> dict[str, list[tuple]]:
+    return {
+        symbol: [(t.symbol, t.price, t.quantity, t.buyer, t.seller, t.timestamp) for t in symbol_trades]
+        for symbol, symbol_trades in trades.items()
+    }
+
+
+def decode_trades(trades: dict[str, list[tuple]]) -> dict[str, list[Trade]]:
+    return { symbol: [Trade(*t) for t in symbol_trades] for symbol, symbol_trades in trades.items() }
+
+
+# Listings and position are None when the worker already has them
+def encode_state(state: TradingState, with_listings=True, with_position=True) -> tuple:
+    listings = None
+    if with_listings:
+        listings = [(l.symbol, l.product, l.denomination) for l in state.listings.values()]
+    return (
+        state.timestamp,
+        listings,
+        { symbol: (depth.buy_orders, depth.sell_orders) for symbol, depth in state.order_depths.items() },
+        encode_trades(state.own_trades),
+        encode_trades(state.market_trades),
+        state.position if with_position else None,
+        state.observations,
+        state.features,
+    )
+
+
+def decode_state(data: tuple, listings: dict[str, Listing], position: dict[str, int]) -> TradingState:
+    timestamp, _, depths, own_trades, market_trades, _, observations, features = data
+    order_depths = {}
+    for symbol, (buy_orders, sell_orders) in depths.items():
+        depth = OrderDepth()
+        depth.buy_orders = buy_orders
+        depth.sell_orders = sell_orders
+        order_depths[symbol] = depth
+    state = TradingState(timestamp, listings, order_depths, decode_trades(own_trades), decode_trades(market_trades), dict(position), observations)
+    state.features = features
+    return state
+
+
+def _send(fd: int, message: Any):
+    data = pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL)
+    data = _length.pack(len(data)) + data
+    while data:
+        data = data[os.write(fd, data):]
+
+
+class _Reader:
+    """
+    Reads as much as the pipe holds at once, most messages need one read.
+    On a non-blocking fd the read is tried first and select only waits when
+    the reply isn't there yet, fast calls don't pay for it.
+    """
+
+    def __init__(self, fd: int):
+        self.fd = fd
+        self.buffer = bytearray()
+
+    # poll is called every MEMORY_POLL_S while waiting and may raise
+    def _fill(self, size: int, deadline: float | None, poll: Callable[[], None] | None):
+        while len(self.buffer) < size:
+            try:
+                chunk = os.read(self.fd, max(size - len(self.buffer), 1 << 16))
+            except BlockingIOError:
+                remaining = None if deadline is None else deadline - time.perf_counter()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError
+                wait = remaining
+                if poll is not None and (wait is None or wait > MEMORY_POLL_S):
+                    wait = MEMORY_POLL_S
+                if not select.select([self.fd], [], [], wait)[0] and poll is not None:
+                    poll()
+                continue
+            if not chunk:
+                raise EOFError
+            self.buffer += chunk
+
+    def receive(self, deadline: float | None = None, poll: Callable[[], None] | None = None) -> Any:
+        self._fill(_length.size, deadline, poll)
+        size = _length.size + _length.unpack_from(self.buffer)[0]
+        self._fill(size, deadline, poll)
+        message = pickle.loads(memoryview(self.buffer)[_length.size:size])
+        del self.buffer[:size]
+        return message
+
+
+class _PeakRss:
+    """
+    Peak RSS of this program in MB. VmHWM belongs to this program only,
+    ru_maxrss can still hold the peak of the process that started it.
+    RSS can only grow through page faults, so VmHWM is only read again
+    when their count changed.
+    """
+
+    def __init__(self):
+        self.faults = -1
+        self.peak_mb = 0.0
+        try:
+            self.status = open('/proc/self/status', 'rb')
+        except OSError:
+            self.status = None
+
+    def __call__(self) -> float:
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        if self.status is None:
+            # ru_maxrss is in KB on linux
+            return usage.ru_maxrss / 1024
+        faults = usage.ru_minflt + usage.ru_majflt
+        if faults != self.faults:
+            self.faults = faults
+            self.status.seek(0)
+            status = self.status.read()
+            start = status.index(b'VmHWM:') + len(b'VmHWM:')
+            self.peak_mb = int(status[start:status.index(b'kB', start)]) / 1024
+        return self.peak_mb
+
+
+class _Rss:
+    # current RSS of another process in MB, None without /proc
+    def __init__(self, pid: int):
+        try:
+            self.statm = open(f'/proc/{pid}/statm', 'rb')
+        except OSError:
+            self.statm = None
+
+    def __call__(self) -> float | None:
+        if self.statm is None:
+            return None
+        self.statm.seek(0)
+        try:
+            return int(self.statm.read().split()[1]) * PAGE_MB
+        except (OSError, IndexError, ValueError):
+            return None
+
+    def close(self):
+        if self.statm is not None:
+            self.statm.close()
+
+
+class TraderProcess:
+    """
+    Runs a trader in a worker process and can be passed to
+    simulate_alternative (or batch/sweep factories) instead of the trader.
+
+    Every run sends the state to the worker and waits at most timeout_ms
+    for the orders. A worker that takes longer, uses more than
+    memory_limit_mb or crashes is killed and TraderTimeout,
+    TraderMemoryError or TraderError is raised. With skip_failures the tick
+    gets no orders instead, a killed worker is replaced by a new one with a
+    fresh trader on the next call.
+
+    The RSS of the worker is checked every MEMORY_POLL_S while a call runs,
+    so a trader that allocates too much is stopped during the call (on
+    linux, elsewhere only the peak RSS after every call is compared).
+    The worker stays alive between calls and days, reset() replaces its
+    trader without restarting the process. trader_factory has to be
+    picklable and importable, e.g. the Trader class.
+    """
+
+    def __init__(self, trader_factory: Callable[[], Any], timeout_ms=RUN_TIMEOUT_MS, memory_limit_mb=TRADER_MEMORY_MB, skip_failures=False):
+        self.trader_factory = trader_factory
+        self.timeout_ms = timeout_ms
+        self.memory_limit_mb = memory_limit_mb
+        self.skip_failures = skip_failures
+        self.process: subprocess.Popen | None = None
+        self.peak_rss_mb = 0.0
+        self.failures = 0
+        self._listings = None
+        self._position = None
+
+    def start(self):
+        parent_read, child_write = os.pipe()
+        child_read, parent_write = os.pipe()
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(path for path in sys.path if path))
+        self.process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), str(child_read), str(child_write)],
+            pass_fds=(child_read, child_write),
+            env=env,
+        )
+        os.close(child_read)
+        os.close(child_write)
+        os.set_blocking(parent_read, False)
+        self.read_fd = parent_read
+        self.write_fd = parent_write
+        self.reader = _Reader(parent_read)
+        self.rss = _Rss(self.process.pid)
+        self._listings = None
+        self._position = None
+        reply = self._request(('start', self.trader_factory), START_TIMEOUT_S)
+        self.has_logger = reply
+        if self.has_logger:
+            from trader_logging import LocalLogs
+            self.logger = _Logs(LocalLogs())
+
+    def stop(self):
+        if self.process is None:
+            return
+        if self.process.poll() is None:
+            try:
+                _send(self.write_fd, ('stop',))
+                self.process.wait(timeout=1)
+            except (OSError, subprocess.TimeoutExpired):
+                self.process.kill()
+                self.process.wait()
+        os.close(self.read_fd)
+        os.close(self.write_fd)
+        self.rss.close()
+        self.process = None
+
+    def __enter__(self):
+        if self.process is None:
+            self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def __del__(self):
+        try:
+            self.stop()
+        except Exception:
+            pass
+
+    def _request(self, message: tuple, timeout_s: float | None) -> Any:
+        if self.process is None:
+            self.start()
+        deadline = None if timeout_s is None else time.perf_counter() + timeout_s
+        try:
+            _send(self.write_fd, message)
+            status, result, peak_rss_mb = self.reader.receive(deadline, self._check_memory)
+        except TraderMemoryError:
+            self._kill()
+            raise
+        except TimeoutError:
+            self._kill()
+            raise TraderTimeout(f'{message[0]} took longer than {timeout_s * 1000:.0f} ms')
+        except (EOFError, OSError) as e:
+            self._kill()
+            raise TraderError(f'trader process died during {message[0]}: {e!r}')
+        self.peak_rss_mb = max(self.peak_rss_mb, peak_rss_mb)
+        if status == 'error':
+            raise TraderError(result)
+        # fallback for allocations between two polls and systems without /proc
+        if peak_rss_mb > self.memory_limit_mb:
+            self._kill()
+            raise TraderMemoryError(f'trader process used {peak_rss_mb:.1f} MB, more than {self.memory_limit_mb} MB')
+        return result
+
+    def _check_memory(self):
+        rss_mb = self.rss()
+        if rss_mb is None:
+            return
+        self.peak_rss_mb = max(self.peak_rss_mb, rss_mb)
+        if rss_mb > self.memory_limit_mb:
+            raise TraderMemoryError(f'trader process used {rss_mb:.1f} MB during the call, more than {self.memory_limit_mb} MB')
+
+    def _kill(self):
+        if self.process is not None:
+            self.process.kill()
+            self.process.wait()
+            os.close(self.read_fd)
+            os.close(self.write_fd)
+            self.rss.close()
+            self.process = None
+
+    def run(self, state: TradingState) -> dict[str, list[Order]]:
+        if self.process is None:
+            self.start()
+        # listings are shared by all states of a day and the position rarely
+        # changes, both are only sent when they change
+        with_listings = state.listings is not self._listings
+        with_position = state.position != self._position
+        try:
+            orders, log = self._request(('run', encode_state(state, with_listings, with_position)), self.timeout_ms / 1000)
+        except TraderError as e:
+            if not self.skip_failures:
+                raise
+            self.failures += 1
+            print(f'{state.timestamp} {e}, no orders')
+            return {}
+        self._listings = state.listings
+        self._position = dict(state.position)
+        if log is not None:
+            self.logger.local_logs[state.timestamp] = log
+        return { symbol: [Order(*order) for order in symbol_orders] for symbol, symbol_orders in orders.items() }
+
+    def reset(self):
+        # fresh trader in the same worker, e.g. for the next day
+        self._request(('reset',), START_TIMEOUT_S)
+        if self.has_logger:
+            self.logger.local_logs.clear()
+
+    def after_last_round(self, profits_by_symbol, balance_by_symbol):
+        profits = { time: profits_by_symbol[time] for time in profits_by_symbol }
+        balance = { time: balance_by_symbol[time] for time in balance_by_symbol }
+        self._request(('after_last_round', profits, balance), None)
+
+
+class _Logs:
+    # stands in for trader.logger, the engine only reads local_logs
+    def __init__(self, local_logs):
+        self.local_logs = local_logs
+
+
+def _worker(read_fd: int, write_fd: int):
+    trader_factory = None
+    trader = None
+    listings: dict[str, Listing] = {}
+    position: dict[str, int] = {}
+    reader = _Reader(read_fd)
+    peak_rss_mb = _PeakRss()
+    while True:
+        try:
+            message = reader.receive()
+        except EOFError:
+            return
+        command = message[0]
+        if command == 'stop':
+            return
+        try:
+            if command == 'start':
+                trader_factory = message[1]
+                trader = trader_factory()
+                result = hasattr(trader, 'logger') and hasattr(trader.logger, 'local_logs')
+            elif command == 'reset':
+                trader = trader_factory()
+                if hasattr(trader, 'logger') and hasattr(trader.logger, 'local_logs'):
+                    trader.logger.local_logs.clear()
+                result = None
+            elif command == 'run':
+                data = message[1]
+                if data[1] is not None:
+                    listings = { symbol: Listing(symbol, product, denomination) for symbol, product, denomination in data[1] }
+                if data[5] is not None:
+                    position = data[5]
+                state = decode_state(data, listings, position)
+                orders = trader.run(state)
+                log = None
+                if hasattr(trader, 'logger') and hasattr(trader.logger, 'local_logs'):
+                    # handed to the engine, so the worker doesn't keep them
+                    log = trader.logger.local_logs.pop(state.timestamp, None)
+                result = ({ symbol: [(o.symbol, o.price, o.quantity) for o in symbol_orders] for symbol, symbol_orders in orders.items() }, log)
+            elif command == 'after_last_round':
+                if callable(getattr(trader, 'after_last_round', None)):
+                    trader.after_last_round(message[1], message[2])
+                result = None
+            else:
+                raise ValueError(f'Unknown command {command}')
+            reply = ('ok', result, peak_rss_mb())
+        except Exception as e:
+            reply = ('error', repr(e), peak_rss_mb())
+        _send(write_fd, reply)
+
+
+if __name__ == "__main__":
+    _worker(int(sys.argv[1]), int(sys.argv[2]))